@@ -19,11 +19,22 @@ def create_app(config_name='default'):
     # Initialize JWT
     jwt = JWTManager(app)
 
+    # Compression settings for large text fields, applied before any model writes
+    from utils.compression import configure_compression
+    configure_compression(app.config['TEXT_COMPRESSION_THRESHOLD'], app.config['TEXT_COMPRESSION_CODEC'])
+
     # Initialize MongoDB
     global mongo_client
     mongo_client = MongoClient(app.config['MONGO_URI'])
     app.db = mongo_client.get_default_database() # Assumes database name is in MONGO_URI
 
+    # Ensure indexes used by queries and background jobs
+    from models.indexes import ensure_indexes
+    try:
+        ensure_indexes(app.db)
+    except Exception as e:
+        app.logger.error(f"Error ensuring MongoDB indexes: {e}")
+
     # Initialize APScheduler
     scheduler = BackgroundScheduler()
     app.scheduler = scheduler
@@ -64,6 +75,8 @@ def create_app(config_name='default'):
     from routes.dashboard_routes import dashboard_bp
     from routes.notification_routes import notification_bp
     from routes.admin_routes import admin_bp
+    from routes.search_routes import search_bp
+    from routes.file_routes import file_bp
 
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(client_bp, url_prefix='/api/clients')
@@ -76,10 +89,22 @@ def create_app(config_name='default'):
     app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
     app.register_blueprint(notification_bp, url_prefix='/api/notifications')
     app.register_blueprint(admin_bp, url_prefix='/api/admin')
+    app.register_blueprint(search_bp, url_prefix='/api/search')
+    app.register_blueprint(file_bp, url_prefix='/api/files')
+
+    # Register CLI commands (e.g., `flask migrate-dates`)
+    from commands.migrations import register_migration_commands
+    register_migration_commands(app)
+    from commands.payments import register_payment_commands
+    register_payment_commands(app)
+    from commands.assets import register_asset_commands
+    register_asset_commands(app)
 
     # Schedule Cron Jobs
     from cron.daily_jobs import schedule_daily_jobs
-    schedule_daily_jobs(scheduler)
+    from cron.background_jobs import schedule_background_jobs
+    schedule_daily_jobs(scheduler, app)
+    schedule_background_jobs(scheduler, app)
 
     # Start the scheduler
     if not scheduler.running:
@@ -0,0 +1,66 @@
+import click
+from datetime import datetime
+from flask import current_app
+from services.asset_gc_service import collect_orphaned_assets
+from services.storage_service import get_asset_collection, asset_owner, claim_assets
+
+@click.command('gc-assets')
+@click.option('--dry-run', is_flag=True, help='Only report what would be deleted.')
+@click.option('--limit', type=int, help='Assets to process (default: ASSET_GC_BATCH_SIZE).')
+@click.option('--grace-hours', type=float, help='Overrides ASSET_GC_GRACE_HOURS.')
+def gc_assets_command(dry_run, limit, grace_hours):
+    """Deletes stored files (PDFs, logos) that no record references any more."""
+    summary = collect_orphaned_assets(dry_run=dry_run, limit=limit, grace_hours=grace_hours)
+    for asset in summary['sample']:
+        click.echo(f"  {asset['backend']}:{asset['key']} ({asset['size']} bytes, orphaned since {asset['orphaned_at']})")
+    if summary['candidates'] > len(summary['sample']):
+        click.echo(f"  ... and {summary['candidates'] - len(summary['sample'])} more")
+    if dry_run:
+        click.echo(f"dry run: {summary['candidates']} orphaned assets ({summary['bytes']} bytes) would be deleted")
+    else:
+        click.echo(
+            f"orphaned: {summary['candidates']}, deleted: {summary['deleted']}, failed: {summary['failed']}, "
+            f"skipped: {summary['skipped']}, bytes: {summary['bytes']}"
+        )
+
+def _logo_urls(business_settings):
+    logo = business_settings.get('logo') or {}
+    urls = [business_settings.get('logo_url'), logo.get('original_url')]
+    urls += [variant.get('url') for variant in (logo.get('variants') or {}).values()]
+    return [url for url in urls if url]
+
+@click.command('backfill-asset-refs')
+def backfill_asset_refs_command():
+    """
+    Records which documents, invoices and users reference each stored asset
+    (for assets stored before references were tracked), then marks the
+    assets nobody references as orphaned so the asset GC can collect them.
+    """
+    db = current_app.db
+    assets = get_asset_collection()
+    asset_ids = {a['url']: a['_id'] for a in assets.find({}, {"url": 1})}
+    stats = {"owners": 0, "refs": 0}
+
+    def claim(owner, urls):
+        ids = [asset_ids[url] for url in urls if url in asset_ids]
+        if ids:
+            claim_assets(owner, ids)
+            stats["owners"] += 1
+            stats["refs"] += len(ids)
+
+    for kind, collection in (("document", db.documents), ("invoice", db.invoices)):
+        for record in collection.find({"pdf_url": {"$ne": None}}, {"pdf_url": 1}):
+            claim(asset_owner(kind, record['_id']), [record['pdf_url']])
+    for user in db.users.find({"business_settings.logo_url": {"$ne": None}}, {"business_settings": 1}):
+        claim(asset_owner("logo", user['_id']), _logo_urls(user['business_settings']))
+
+    result = assets.update_many(
+        {"refs": {"$exists": False}},
+        {"$set": {"refs": [], "orphaned_at": datetime.utcnow()}}
+    )
+    click.echo(f"owners: {stats['owners']}, references: {stats['refs']}, unreferenced assets: {result.modified_count}")
+
+def register_asset_commands(app):
+    """Registers the stored asset maintenance commands on the Flask CLI."""
+    app.cli.add_command(gc_assets_command)
+    app.cli.add_command(backfill_asset_refs_command)
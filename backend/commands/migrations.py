@@ -0,0 +1,222 @@
+import click
+from flask import current_app
+from pymongo import UpdateOne
+from datetime import datetime
+from models.invoice_model import Invoice
+from models.project_model import Project, Milestone
+from models.event_model import Event
+from models.document_model import Document, make_excerpt
+from utils.compression import decompress_text
+from utils.date_utils import parse_datetime
+from services.reminder_service import REMINDER_STATUSES, compute_next_reminder_at, get_reminder_schedule
+from services.payment_service import build_payment, payment_upsert
+
+def get_migration_state_collection():
+    return current_app.db.migration_state
+
+def run_batched_migration(name, collection, query, transform, projection=None, batch_size=500, reset=False):
+    """
+    Applies `transform` to every document matching `query`, in _id order.
+    Each batch is committed with a single bulk_write and the last processed _id
+    is checkpointed under `name`, so an interrupted run resumes where it stopped.
+    `transform` returns a MongoDB update document, or None to skip the row.
+    """
+    state = get_migration_state_collection()
+    if reset:
+        state.delete_one({"_id": name})
+
+    checkpoint = state.find_one({"_id": name}) or {}
+    last_id = checkpoint.get('last_id')
+    stats = {"scanned": 0, "updated": 0, "failed": 0}
+
+    while True:
+        batch_query = query if last_id is None else {"$and": [query, {"_id": {"$gt": last_id}}]}
+        batch = list(collection.find(batch_query, projection).sort("_id", 1).limit(batch_size))
+        if not batch:
+            break
+
+        operations = []
+        for doc in batch:
+            try:
+                update = transform(doc)
+            except Exception as e:
+                stats['failed'] += 1
+                current_app.logger.warning(f"Migration {name}: skipping {collection.name} {doc['_id']}: {e}")
+                continue
+            if update:
+                operations.append(UpdateOne({"_id": doc['_id']}, update))
+
+        if operations:
+            result = collection.bulk_write(operations, ordered=False)
+            stats['updated'] += result.modified_count
+
+        stats['scanned'] += len(batch)
+        last_id = batch[-1]['_id']
+        state.update_one(
+            {"_id": name},
+            {"$set": {"last_id": last_id, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+    state.update_one(
+        {"_id": name},
+        {"$set": {"completed_at": datetime.utcnow()}},
+        upsert=True
+    )
+    return stats
+
+# --- Date normalization ---
+
+DATE_MIGRATION_TARGETS = (
+    ("invoices", Invoice.DATE_FIELDS),
+    ("projects", Project.DATE_FIELDS),
+    ("milestones", Milestone.DATE_FIELDS),
+    ("events", Event.DATE_FIELDS),
+)
+
+def _date_fields_transform(fields):
+    def transform(doc):
+        update = {}
+        for field in fields:
+            if isinstance(doc.get(field), str):
+                update[field] = parse_datetime(doc[field])
+        return {"$set": update} if update else None
+    return transform
+
+@click.command('migrate-dates')
+@click.option('--batch-size', default=500, show_default=True, help='Documents per bulk_write batch.')
+@click.option('--reset', is_flag=True, help='Ignore saved checkpoints and start from the beginning.')
+def migrate_dates_command(batch_size, reset):
+    """Converts string date fields to native BSON dates."""
+    db = current_app.db
+    for collection_name, fields in DATE_MIGRATION_TARGETS:
+        query = {"$or": [{field: {"$type": "string"}} for field in fields]}
+        projection = {field: 1 for field in fields}
+        stats = run_batched_migration(
+            f"migrate_dates:{collection_name}",
+            db[collection_name],
+            query,
+            _date_fields_transform(fields),
+            projection=projection,
+            batch_size=batch_size,
+            reset=reset
+        )
+        click.echo(f"{collection_name}: scanned {stats['scanned']}, updated {stats['updated']}, unparseable {stats['failed']}")
+
+# --- Reminder schedule backfill ---
+
+def _reminder_transform(doc):
+    next_reminder_at = compute_next_reminder_at(doc.get('due_date'), get_reminder_schedule(doc['user_id']))
+    return {"$set": {"next_reminder_at": next_reminder_at}}
+
+@click.command('schedule-reminders')
+@click.option('--batch-size', default=500, show_default=True, help='Documents per bulk_write batch.')
+@click.option('--reset', is_flag=True, help='Ignore saved checkpoints and start from the beginning.')
+def schedule_reminders_command(batch_size, reset):
+    """Computes next_reminder_at for open invoices created before reminder schedules existed."""
+    stats = run_batched_migration(
+        "schedule_reminders:invoices",
+        current_app.db.invoices,
+        {"status": {"$in": REMINDER_STATUSES}, "next_reminder_at": {"$exists": False}},
+        _reminder_transform,
+        projection={"user_id": 1, "due_date": 1},
+        batch_size=batch_size,
+        reset=reset
+    )
+    click.echo(f"invoices: scanned {stats['scanned']}, updated {stats['updated']}, failed {stats['failed']}")
+
+# --- Payments ledger backfill ---
+
+@click.command('backfill-payments')
+@click.option('--batch-size', default=500, show_default=True, help='Invoices per batch.')
+def backfill_payments_command(batch_size):
+    """Creates ledger entries for invoices marked Paid before the payments ledger existed."""
+    db = current_app.db
+    last_id = None
+    stats = {"scanned": 0, "created": 0}
+
+    while True:
+        query = {"status": "Paid"}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = list(db.invoices.find(
+            query,
+            {"user_id": 1, "client_id": 1, "invoice_number": 1, "total_amount": 1, "currency": 1, "updated_at": 1}
+        ).sort("_id", 1).limit(batch_size))
+        if not batch:
+            break
+
+        # Invoices already in the ledger (paid through Stripe or re-run) are skipped
+        recorded = set(db.payments.distinct("invoice_id", {"invoice_id": {"$in": [i['_id'] for i in batch]}}))
+        operations = []
+        for invoice in batch:
+            if invoice['_id'] in recorded:
+                continue
+            payment = build_payment(
+                invoice,
+                amount=invoice.get('total_amount') or 0,
+                currency=invoice.get('currency'),
+                method='unknown',
+                source='backfill',
+                reference=str(invoice['_id']),
+                # The old history used updated_at as the payment date; it is the best estimate available
+                paid_at=invoice.get('updated_at')
+            )
+            operations.append(payment_upsert(payment))
+
+        if operations:
+            result = db.payments.bulk_write(operations, ordered=False)
+            stats['created'] += result.upserted_count
+
+        stats['scanned'] += len(batch)
+        last_id = batch[-1]['_id']
+
+    click.echo(f"invoices: scanned {stats['scanned']}, payments created {stats['created']}")
+
+# --- Document excerpts ---
+
+@click.command('backfill-document-excerpts')
+@click.option('--batch-size', default=500, show_default=True, help='Documents per bulk_write batch.')
+@click.option('--reset', is_flag=True, help='Ignore saved checkpoints and start from the beginning.')
+def backfill_document_excerpts_command(batch_size, reset):
+    """Stores the list-view excerpt for documents created before excerpts existed."""
+    stats = run_batched_migration(
+        "backfill_document_excerpts:documents",
+        current_app.db.documents,
+        {"excerpt": {"$exists": False}},
+        lambda doc: {"$set": {"excerpt": make_excerpt(decompress_text(doc.get('content')))}},
+        projection={"content": 1},
+        batch_size=batch_size,
+        reset=reset
+    )
+    click.echo(f"documents: scanned {stats['scanned']}, updated {stats['updated']}, failed {stats['failed']}")
+
+# --- Document content compression ---
+
+@click.command('compress-documents')
+@click.option('--batch-size', default=200, show_default=True, help='Documents per bulk_write batch.')
+@click.option('--reset', is_flag=True, help='Ignore saved checkpoints and start from the beginning.')
+def compress_documents_command(batch_size, reset):
+    """Compresses the stored content of documents over TEXT_COMPRESSION_THRESHOLD characters."""
+    threshold = current_app.config['TEXT_COMPRESSION_THRESHOLD']
+    stats = run_batched_migration(
+        "compress_documents:documents",
+        current_app.db.documents,
+        # Only plain-string content long enough to qualify ($strLenCP fails on the binary, compressed rows)
+        {"content": {"$type": "string"}, "$expr": {"$gte": [
+            {"$strLenCP": {"$cond": [{"$eq": [{"$type": "$content"}, "string"]}, "$content", ""]}}, threshold
+        ]}},
+        lambda doc: {"$set": Document.content_fields(doc['content'])},
+        projection={"content": 1},
+        batch_size=batch_size,
+        reset=reset
+    )
+    click.echo(f"documents: scanned {stats['scanned']}, compressed {stats['updated']}, failed {stats['failed']}")
+
+def register_migration_commands(app):
+    """Registers the data migration commands on the Flask CLI."""
+    app.cli.add_command(migrate_dates_command)
+    app.cli.add_command(schedule_reminders_command)
+    app.cli.add_command(backfill_payments_command)
+    app.cli.add_command(backfill_document_excerpts_command)
+    app.cli.add_command(compress_documents_command)
@@ -0,0 +1,23 @@
+import click
+from services.checkout_sources import get_checkout_source
+from services.reconciliation_service import reconcile_stripe_payments, get_job_state_collection, JOB_NAME
+
+@click.command('reconcile-payments')
+@click.option('--source', type=click.Choice(['stripe', 'fixture']), help='Overrides STRIPE_RECONCILE_SOURCE.')
+@click.option('--fixture', type=click.Path(exists=True, dir_okay=False), help='JSON file of checkout sessions (fixture source).')
+@click.option('--reset-watermark', is_flag=True, help='Rescan the full lookback window instead of resuming.')
+def reconcile_payments_command(source, fixture, reset_watermark):
+    """Records Stripe payments whose webhook was missed and marks their invoices Paid."""
+    if fixture and not source:
+        source = 'fixture'
+    if reset_watermark:
+        get_job_state_collection().update_one({"_id": JOB_NAME}, {"$unset": {"watermark": ""}})
+    summary = reconcile_stripe_payments(source=get_checkout_source(source, fixture))
+    click.echo(
+        f"sessions: {summary['sessions']}, unmatched: {summary['unmatched']}, "
+        f"payments recorded: {summary['payments_recorded']}, invoices marked Paid: {summary['invoices_marked_paid']}"
+    )
+
+def register_payment_commands(app):
+    """Registers the payment maintenance commands on the Flask CLI."""
+    app.cli.add_command(reconcile_payments_command)
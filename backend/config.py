@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -18,12 +19,72 @@ class Config:
     # External API Keys
     STRIPE_SECRET_KEY = os.environ.get('STRIPE_SECRET_KEY')
     STRIPE_WEBHOOK_SECRET = os.environ.get('STRIPE_WEBHOOK_SECRET')
+    STRIPE_API_BASE = os.environ.get('STRIPE_API_BASE') # Override for a local fake Stripe server
+    # Client-side limit; Stripe allows 100 req/s in live mode and 25 req/s in test mode
+    STRIPE_MAX_REQUESTS_PER_SECOND = float(os.environ.get('STRIPE_MAX_REQUESTS_PER_SECOND', 20))
+    STRIPE_BATCH_WORKERS = int(os.environ.get('STRIPE_BATCH_WORKERS', 8))
+    STRIPE_BATCH_MAX_INVOICES = int(os.environ.get('STRIPE_BATCH_MAX_INVOICES', 200))
+    STRIPE_EVENT_INTERVAL_SECONDS = int(os.environ.get('STRIPE_EVENT_INTERVAL_SECONDS', 5))
+    STRIPE_EVENT_BATCH_SIZE = int(os.environ.get('STRIPE_EVENT_BATCH_SIZE', 100))
+    STRIPE_EVENT_MAX_ATTEMPTS = int(os.environ.get('STRIPE_EVENT_MAX_ATTEMPTS', 5))
+    # Reconciliation sweep for payments whose webhook was lost
+    STRIPE_RECONCILE_SOURCE = os.environ.get('STRIPE_RECONCILE_SOURCE', 'stripe') # 'stripe' or 'fixture'
+    STRIPE_RECONCILE_FIXTURE = os.environ.get('STRIPE_RECONCILE_FIXTURE') # JSON file of checkout sessions
+    STRIPE_RECONCILE_INTERVAL_MINUTES = int(os.environ.get('STRIPE_RECONCILE_INTERVAL_MINUTES', 30))
+    STRIPE_RECONCILE_BATCH_SIZE = int(os.environ.get('STRIPE_RECONCILE_BATCH_SIZE', 100))
+    STRIPE_RECONCILE_LOOKBACK_DAYS = int(os.environ.get('STRIPE_RECONCILE_LOOKBACK_DAYS', 30)) # First run only
+    STRIPE_RECONCILE_OVERLAP_HOURS = int(os.environ.get('STRIPE_RECONCILE_OVERLAP_HOURS', 24))
     
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
+    OPENAI_BASE_URL = os.environ.get('OPENAI_BASE_URL') # e.g., a local OpenAI-compatible server
+    OPENAI_CONNECT_TIMEOUT = float(os.environ.get('OPENAI_CONNECT_TIMEOUT', 5))
+    OPENAI_READ_TIMEOUT = float(os.environ.get('OPENAI_READ_TIMEOUT', 120))
+    OPENAI_MAX_RETRIES = int(os.environ.get('OPENAI_MAX_RETRIES', 2))
+    # Generations in flight per process; excess requests queue, and get 429 once the queue is full
+    OPENAI_MAX_CONCURRENT = int(os.environ.get('OPENAI_MAX_CONCURRENT', 4))
+    OPENAI_MAX_QUEUED = int(os.environ.get('OPENAI_MAX_QUEUED', 8))
+    OPENAI_QUEUE_TIMEOUT = float(os.environ.get('OPENAI_QUEUE_TIMEOUT', 30))
+    OPENAI_RETRY_AFTER_SECONDS = int(os.environ.get('OPENAI_RETRY_AFTER_SECONDS', 10))
+    # Completion cache keyed on the normalized prompt (see services/llm_cache.py)
+    LLM_CACHE_ENABLED = os.environ.get('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+    LLM_CACHE_TTL_SECONDS = int(os.environ.get('LLM_CACHE_TTL_SECONDS', 7 * 24 * 3600))
+    LLM_CACHE_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', 5000))
     
     CLOUDINARY_CLOUD_NAME = os.environ.get('CLOUDINARY_CLOUD_NAME')
     CLOUDINARY_API_KEY = os.environ.get('CLOUDINARY_API_KEY')
     CLOUDINARY_API_SECRET = os.environ.get('CLOUDINARY_API_SECRET')
+    CLOUDINARY_UPLOAD_PREFIX = os.environ.get('CLOUDINARY_UPLOAD_PREFIX') # e.g., a local fake Cloudinary server
+    # Files above the threshold are uploaded in parts (Cloudinary requires parts of at least 5 MB)
+    CLOUDINARY_CHUNK_THRESHOLD = int(os.environ.get('CLOUDINARY_CHUNK_THRESHOLD', 20 * 1024 * 1024))
+    CLOUDINARY_CHUNK_SIZE = int(os.environ.get('CLOUDINARY_CHUNK_SIZE', 6 * 1024 * 1024))
+    CLOUDINARY_UPLOAD_RETRIES = int(os.environ.get('CLOUDINARY_UPLOAD_RETRIES', 3))
+    CLOUDINARY_RETRY_BASE_SECONDS = float(os.environ.get('CLOUDINARY_RETRY_BASE_SECONDS', 0.5))
+    CLOUDINARY_UPLOAD_TIMEOUT = float(os.environ.get('CLOUDINARY_UPLOAD_TIMEOUT', 60))
+
+    # File storage for generated PDFs and logos: 'cloudinary', 'local' or 's3' (any S3-compatible store).
+    # Files are stored once per SHA-256; re-uploading the same bytes returns the stored URL.
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'cloudinary')
+    STORAGE_UPLOAD_WORKERS = int(os.environ.get('STORAGE_UPLOAD_WORKERS', 4)) # Parallel uploads per process
+    STORAGE_LOCAL_DIR = os.environ.get('STORAGE_LOCAL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'storage'))
+    STORAGE_PUBLIC_BASE_URL = os.environ.get('STORAGE_PUBLIC_BASE_URL') # URL prefix for stored files (local and s3)
+    # Local copies of cloudinary/s3 files: logos embedded in PDFs, PDFs served by the download endpoints
+    STORAGE_CACHE_DIR = os.environ.get('STORAGE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'storage_cache'))
+    STORAGE_CACHE_MAX_BYTES = int(os.environ.get('STORAGE_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+    S3_BUCKET = os.environ.get('S3_BUCKET')
+    S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL') # e.g., a MinIO server; None = AWS
+    S3_REGION = os.environ.get('S3_REGION', 'us-east-1')
+    S3_ACCESS_KEY_ID = os.environ.get('S3_ACCESS_KEY_ID')
+    S3_SECRET_ACCESS_KEY = os.environ.get('S3_SECRET_ACCESS_KEY')
+
+    # Asset GC: files nobody references are deleted after the grace period, in paced batches
+    ASSET_GC_INTERVAL_MINUTES = int(os.environ.get('ASSET_GC_INTERVAL_MINUTES', 60))
+    ASSET_GC_GRACE_HOURS = float(os.environ.get('ASSET_GC_GRACE_HOURS', 24))
+    ASSET_GC_BATCH_SIZE = int(os.environ.get('ASSET_GC_BATCH_SIZE', 200)) # Deletions per run
+    ASSET_GC_DELETES_PER_SECOND = float(os.environ.get('ASSET_GC_DELETES_PER_SECOND', 5))
+
+    # Logo uploads: larger files or images are rejected before any variant is generated
+    LOGO_MAX_UPLOAD_BYTES = int(os.environ.get('LOGO_MAX_UPLOAD_BYTES', 10 * 1024 * 1024))
+    LOGO_MAX_PIXELS = int(os.environ.get('LOGO_MAX_PIXELS', 40_000_000))
     
     # Google API Credentials (for Calendar and Gmail)
     # These will typically be file paths or base64 encoded strings in a real app
@@ -34,7 +95,51 @@ class Config:
     
     # Email Configuration (for Gmail API)
     SENDER_EMAIL = os.environ.get('SENDER_EMAIL')
+    EMAIL_TRANSPORT = os.environ.get('EMAIL_TRANSPORT', 'gmail') # 'gmail' or 'smtp'
+    SMTP_HOST = os.environ.get('SMTP_HOST', 'localhost')
+    SMTP_PORT = int(os.environ.get('SMTP_PORT', 1025))
+    SMTP_USERNAME = os.environ.get('SMTP_USERNAME')
+    SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD')
+    SMTP_USE_TLS = os.environ.get('SMTP_USE_TLS', 'false').lower() == 'true'
+    SMTP_TIMEOUT = 10
+
+    # Email Outbox (drained by a background sender job)
+    EMAIL_OUTBOX_INTERVAL_SECONDS = int(os.environ.get('EMAIL_OUTBOX_INTERVAL_SECONDS', 30))
+    EMAIL_OUTBOX_BATCH_SIZE = int(os.environ.get('EMAIL_OUTBOX_BATCH_SIZE', 50))
+    EMAIL_RATE_LIMIT_PER_MINUTE = int(os.environ.get('EMAIL_RATE_LIMIT_PER_MINUTE', 20)) # Per sending account
+    EMAIL_MAX_ATTEMPTS = int(os.environ.get('EMAIL_MAX_ATTEMPTS', 5))
+    EMAIL_RETRY_BASE_SECONDS = int(os.environ.get('EMAIL_RETRY_BASE_SECONDS', 60))
+    EMAIL_RETRY_MAX_SECONDS = int(os.environ.get('EMAIL_RETRY_MAX_SECONDS', 3600))
     
+    # Documents whose background PDF render is still pending after this long are queued again
+    DOCUMENT_PDF_STALE_MINUTES = int(os.environ.get('DOCUMENT_PDF_STALE_MINUTES', 10))
+
+    # Process-local cache for user profile and business-settings reads
+    USER_PROFILE_CACHE_SIZE = int(os.environ.get('USER_PROFILE_CACHE_SIZE', 2048))
+    USER_PROFILE_CACHE_TTL = int(os.environ.get('USER_PROFILE_CACHE_TTL', 300)) # Seconds
+
+    # Large text fields (document content) are stored compressed; 'zstd' needs the zstandard package
+    TEXT_COMPRESSION_THRESHOLD = int(os.environ.get('TEXT_COMPRESSION_THRESHOLD', 2048)) # Characters
+    TEXT_COMPRESSION_CODEC = os.environ.get('TEXT_COMPRESSION_CODEC', 'zlib')
+
+    # Document revisions: every Nth archived revision is a full snapshot, capping delta chains at N - 1
+    DOCUMENT_SNAPSHOT_INTERVAL = int(os.environ.get('DOCUMENT_SNAPSHOT_INTERVAL', 10))
+
+    # Batch document jobs: drafting threads (each still takes a generation slot) and PDF render processes
+    DOCUMENT_BATCH_MAX_ITEMS = int(os.environ.get('DOCUMENT_BATCH_MAX_ITEMS', 100))
+    DOCUMENT_BATCH_DRAFT_WORKERS = int(os.environ.get('DOCUMENT_BATCH_DRAFT_WORKERS', max(OPENAI_MAX_CONCURRENT // 2, 1)))
+    DOCUMENT_BATCH_PDF_PROCESSES = int(os.environ.get('DOCUMENT_BATCH_PDF_PROCESSES', 2))
+    DOCUMENT_BATCH_BUSY_RETRIES = int(os.environ.get('DOCUMENT_BATCH_BUSY_RETRIES', 5))
+    # A queued job not started, or a running job without progress, for this long is queued again
+    DOCUMENT_JOB_STALE_MINUTES = int(os.environ.get('DOCUMENT_JOB_STALE_MINUTES', 15))
+
+    # Search: results per page, and how deep pagination may go (each page re-reads earlier hits)
+    SEARCH_PAGE_SIZE = int(os.environ.get('SEARCH_PAGE_SIZE', 20))
+    SEARCH_MAX_RESULTS = int(os.environ.get('SEARCH_MAX_RESULTS', 200))
+
+    # Project detail page: most milestones/documents/invoices listed (the response also carries the totals)
+    PROJECT_DETAIL_CHILD_LIMIT = int(os.environ.get('PROJECT_DETAIL_CHILD_LIMIT', 100))
+
     # APScheduler Configuration
     SCHEDULER_API_ENABLED = True
     
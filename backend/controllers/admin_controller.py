@@ -3,6 +3,9 @@ from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from bson.objectid import ObjectId
 from models.user_model import User
 from models.tool_model import Tool
+from utils.cache import get_cache_stats
+from services.llm_cache import get_llm_cache_summary
+from services.system_settings_service import SETTINGS_ID, DEFAULT_SYSTEM_SETTINGS, invalidate_system_settings
 from datetime import datetime
 
 def admin_required():
@@ -271,18 +274,12 @@ def get_system_settings():
     """Fetches system-wide settings (e.g., global tax rate, default currency)."""
     # System settings are typically stored in a dedicated collection or a single document
     # For simplicity, we'll use a single document in a 'system_settings' collection
-    settings = current_app.db.system_settings.find_one({"_id": "global_settings"})
+    settings = current_app.db.system_settings.find_one({"_id": SETTINGS_ID})
     
     if not settings:
         # Return default settings if none exist
-        settings = {
-            "default_currency": "USD",
-            "global_tax_rate": 0.08,
-            "openai_model": "gemini-2.5-flash",
-            "frontend_version": "1.0.0",
-            "backend_version": "1.0.0"
-        }
-        current_app.db.system_settings.insert_one({"_id": "global_settings", **settings})
+        settings = dict(DEFAULT_SYSTEM_SETTINGS)
+        current_app.db.system_settings.insert_one({"_id": SETTINGS_ID, **settings})
         
     # Remove _id for cleaner API response
     settings.pop('_id', None)
@@ -297,13 +294,28 @@ def update_system_settings():
         update_data = {k: v for k, v in data.items()}
         
         current_app.db.system_settings.update_one(
-            {"_id": "global_settings"},
+            {"_id": SETTINGS_ID},
             {"$set": update_data},
             upsert=True
         )
+        invalidate_system_settings()
         
         return jsonify({"message": "System settings updated successfully"}), 200
         
     except Exception as e:
         current_app.logger.error(f"Error updating system settings: {e}")
         return jsonify({"message": "Server error"}), 500
+
+# --- Admin Diagnostics ---
+
+@admin_required()
+def get_cache_statistics():
+    """
+    Returns hit/miss counters of the process-local caches of this worker, plus
+    totals of the shared LLM response cache in MongoDB.
+    """
+    try:
+        return jsonify({**get_cache_stats(), "llm_cache_store": get_llm_cache_summary()}), 200
+    except Exception as e:
+        current_app.logger.error(f"Error fetching cache statistics: {e}")
+        return jsonify({"message": "Error fetching cache statistics"}), 500
@@ -3,6 +3,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from bson.objectid import ObjectId
 from models.event_model import Event
 from services.google_calendar_service import create_calendar_event, delete_calendar_event, get_calendar_events # Placeholder
+from utils.date_utils import parse_datetime, normalize_date_fields
 from datetime import datetime
 
 def get_event_collection():
@@ -36,6 +37,8 @@ def create_event():
             "message": "Event created successfully",
             "event": new_event.to_dict()
         }), 201
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error creating event: {e}")
         return jsonify({"message": "Error creating event"}), 500
@@ -52,7 +55,8 @@ def get_events():
         # 1. Fetch local events
         query = {"user_id": ObjectId(user_id)}
         if time_min and time_max:
-            query["start_time"] = {"$gte": time_min, "$lte": time_max}
+            # start_time is a BSON date, so this is an indexed range scan
+            query["start_time"] = {"$gte": parse_datetime(time_min), "$lte": parse_datetime(time_max)}
             
         local_events_data = get_event_collection().find(query).sort("start_time", 1)
         local_events = [Event.from_dict(e).to_dict() for e in local_events_data]
@@ -63,6 +67,8 @@ def get_events():
         
         return jsonify(local_events), 200
         
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error fetching events: {e}")
         return jsonify({"message": "Error fetching events"}), 500
@@ -74,6 +80,7 @@ def update_event(event_id):
     
     try:
         update_data = {k: v for k, v in data.items() if k in Event.__init__.__code__.co_varnames and k not in ['_id', 'user_id', 'created_at']}
+        normalize_date_fields(update_data, Event.DATE_FIELDS)
         update_data['updated_at'] = datetime.utcnow()
         
         result = get_event_collection().update_one(
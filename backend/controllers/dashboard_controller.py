@@ -12,6 +12,9 @@ def get_project_collection():
 def get_invoice_collection():
     return current_app.db.invoices
 
+def get_payment_collection():
+    return current_app.db.payments
+
 @jwt_required()
 def get_dashboard_summary():
     user_id = get_jwt_identity()
@@ -41,25 +44,24 @@ def get_dashboard_summary():
             if item['_id'] in status_summary:
                 status_summary[item['_id']] = item['count']
         
-        # 4. Revenue Chart Data (Last 90 days)
+        # 4. Revenue Chart Data (Last 90 days), from the payments ledger
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=90)
         
         revenue_pipeline = [
             {"$match": {
                 "user_id": ObjectId(user_id),
-                "status": "Paid",
-                "updated_at": {"$gte": start_date}
+                "paid_at": {"$gte": start_date}
             }},
             {"$group": {
                 "_id": {
-                    "$dateToString": {"format": "%Y-%m-%d", "date": "$updated_at"}
+                    "$dateToString": {"format": "%Y-%m-%d", "date": "$paid_at"}
                 },
-                "total_revenue": {"$sum": "$total_amount"}
+                "total_revenue": {"$sum": "$amount"}
             }},
             {"$sort": {"_id": 1}}
         ]
-        revenue_data = list(get_invoice_collection().aggregate(revenue_pipeline))
+        revenue_data = list(get_payment_collection().aggregate(revenue_pipeline))
         
         # Format for frontend chart (e.g., array of {date: "YYYY-MM-DD", revenue: 123.45})
         chart_data = [{"date": item['_id'], "revenue": item['total_revenue']} for item in revenue_data]
@@ -1,13 +1,22 @@
-from flask import current_app, jsonify, request
+from flask import current_app, jsonify, request, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from bson.objectid import ObjectId
 from models.document_model import Document
 from models.client_model import Client
 from models.project_model import Project
-from services.openai_service import generate_document_draft
+from services.openai_service import generate_document_draft, open_document_draft_stream, GenerationBusyError
 from services.pdf_service import generate_document_pdf
-from services.cloudinary_service import upload_file
+from services.storage_service import upload_file, asset_owner, release_assets, send_stored_file, StoredFileUnavailableError
+from services.user_profile_service import get_business_settings
+from services.document_pdf_service import queue_document_pdf
+from services.document_revision_service import (
+    save_new_revision, list_revisions, get_revision_content, delete_revisions, RevisionConflictError
+)
+from services.document_batch_service import create_document_job, get_job_collection, queue_document_job
+from models.document_job_model import DocumentJob
+from utils.compression import decompress_text
 from datetime import datetime
+import json
 import os
 
 def get_document_collection():
@@ -29,6 +38,7 @@ def create_document():
     project_id = data.get('project_id')
     title = data.get('title')
     custom_details = data.get('custom_details', '')
+    no_cache = data.get('no_cache', False) # Force a fresh draft instead of a cached one
     
     if not all([doc_type, client_id, title]):
         return jsonify({"message": "Missing required fields: doc_type, client_id, title"}), 400
@@ -48,7 +58,10 @@ def create_document():
             project = Project.from_dict(project_data).to_dict()
 
         # 2. Generate AI Draft Text
-        draft_content = generate_document_draft(doc_type, client, project, custom_details)
+        try:
+            draft_content = generate_document_draft(doc_type, client, project, custom_details, get_business_settings(user_id), use_cache=not no_cache)
+        except GenerationBusyError as e:
+            return _busy_response(e)
         
         # 3. Create Document Model
         new_document = Document(
@@ -62,14 +75,14 @@ def create_document():
         )
         
         # 4. Save initial document to get an ID
-        result = get_document_collection().insert_one(new_document.__dict__)
+        result = get_document_collection().insert_one(new_document.to_mongo())
         new_document._id = result.inserted_id
         
         # 5. Generate PDF
         pdf_path = generate_document_pdf(new_document)
         
         # 6. Upload to Cloudinary
-        cloudinary_url = upload_file(pdf_path, folder="documents")
+        cloudinary_url = upload_file(pdf_path, folder="documents", owner=asset_owner("document", new_document._id))
         
         # 7. Update document with PDF URL
         get_document_collection().update_one(
@@ -91,11 +104,164 @@ def create_document():
         current_app.logger.error(f"Error creating document: {e}")
         return jsonify({"message": "Error creating document"}), 500
 
+def _busy_response(error):
+    """429 with Retry-After when every generation slot is taken and the queue is full."""
+    response = jsonify({"message": "Too many documents are being generated right now. Please retry shortly."})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 429
+
+def _sse(event, data):
+    """Formats one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@jwt_required()
+def stream_document():
+    """
+    Drafts a document and relays the model output over Server-Sent Events as it
+    is generated ('token' events), then saves the draft and sends a 'done' event
+    with the document. The PDF is rendered in the background (pdf_status goes
+    from 'pending' to 'ready'); clients poll the document for pdf_url.
+    """
+    user_id = get_jwt_identity()
+    data = request.get_json() or {}
+    
+    doc_type = data.get('doc_type')
+    client_id = data.get('client_id')
+    project_id = data.get('project_id')
+    title = data.get('title')
+    custom_details = data.get('custom_details', '')
+    no_cache = data.get('no_cache', False) # Force a fresh draft instead of a cached one
+    
+    if not all([doc_type, client_id, title]):
+        return jsonify({"message": "Missing required fields: doc_type, client_id, title"}), 400
+
+    try:
+        # Validate everything before the stream starts, while errors can still be HTTP status codes
+        client_data = get_client_collection().find_one({"_id": ObjectId(client_id), "user_id": ObjectId(user_id)})
+        if not client_data:
+            return jsonify({"message": "Client not found"}), 404
+        client = Client.from_dict(client_data).to_dict()
+        
+        project = {}
+        if project_id:
+            project_data = get_project_collection().find_one({"_id": ObjectId(project_id), "user_id": ObjectId(user_id)})
+            if not project_data:
+                return jsonify({"message": "Project not found"}), 404
+            project = Project.from_dict(project_data).to_dict()
+        
+        business_settings = get_business_settings(user_id)
+    except Exception as e:
+        current_app.logger.error(f"Error preparing document stream: {e}")
+        return jsonify({"message": "Invalid client or project ID"}), 400
+    
+    try:
+        draft = open_document_draft_stream(doc_type, client, project, custom_details, business_settings, use_cache=not no_cache)
+    except GenerationBusyError as e:
+        return _busy_response(e)
+    except Exception as e:
+        current_app.logger.error(f"OpenAI API error: {e}")
+        return jsonify({"message": "Error generating document draft"}), 502
+    
+    def generate():
+        parts = []
+        try:
+            for text in draft:
+                parts.append(text)
+                yield _sse("token", {"text": text})
+        except Exception as e:
+            current_app.logger.error(f"OpenAI streaming error: {e}")
+            yield _sse("error", {"message": "Error generating document draft"})
+            return
+        
+        try:
+            new_document = Document(
+                user_id=user_id,
+                client_id=client_id,
+                project_id=project_id,
+                doc_type=doc_type,
+                title=title,
+                content="".join(parts),
+                pdf_url=None,
+                pdf_status="pending"
+            )
+            get_document_collection().insert_one(new_document.to_mongo())
+            queue_document_pdf(new_document._id)
+            yield _sse("done", {"document": new_document.to_dict()})
+        except Exception as e:
+            current_app.logger.error(f"Error saving streamed document: {e}")
+            yield _sse("error", {"message": "Error saving document"})
+    
+    response = Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no" # Stop reverse proxies (nginx) from buffering the stream
+        }
+    )
+    # Frees the generation slot even if the client disconnects before the stream is consumed
+    response.call_on_close(draft.close)
+    return response
+
+@jwt_required()
+def create_document_batch():
+    """Queues one document per client/project pair; progress is polled via get_document_batch."""
+    user_id = get_jwt_identity()
+    data = request.get_json() or {}
+    
+    doc_type = data.get('doc_type')
+    items = data.get('items') or []
+    if not doc_type or not items:
+        return jsonify({"message": "Missing required fields: doc_type, items"}), 400
+    max_items = current_app.config['DOCUMENT_BATCH_MAX_ITEMS']
+    if len(items) > max_items:
+        return jsonify({"message": f"A batch can contain at most {max_items} documents"}), 400
+    
+    try:
+        items = [{"client_id": ObjectId(item['client_id']),
+                  "project_id": ObjectId(item['project_id']) if item.get('project_id') else None} for item in items]
+    except Exception:
+        return jsonify({"message": "Each item needs a valid client_id (and optional project_id)"}), 400
+    
+    try:
+        client_ids = list({item['client_id'] for item in items})
+        found = get_client_collection().count_documents({"_id": {"$in": client_ids}, "user_id": ObjectId(user_id)})
+        if found != len(client_ids):
+            return jsonify({"message": "One or more clients not found"}), 404
+        
+        job = create_document_job(user_id, doc_type, data.get('title') or doc_type, data.get('custom_details', ''), items)
+        queue_document_job(job._id)
+        
+        return jsonify({
+            "message": "Batch document job queued",
+            "job": job.to_dict()
+        }), 202
+        
+    except Exception as e:
+        current_app.logger.error(f"Error creating document batch: {e}")
+        return jsonify({"message": "Error creating document batch"}), 500
+
+@jwt_required()
+def get_document_batch(job_id):
+    user_id = get_jwt_identity()
+    
+    try:
+        job_data = get_job_collection().find_one({"_id": ObjectId(job_id), "user_id": ObjectId(user_id)})
+        if not job_data:
+            return jsonify({"message": "Batch job not found"}), 404
+        
+        return jsonify(DocumentJob.from_dict(job_data).to_dict()), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Error fetching document batch: {e}")
+        return jsonify({"message": "Invalid job ID or server error"}), 400
+
 @jwt_required()
 def get_all_documents():
     user_id = get_jwt_identity()
-    documents_data = get_document_collection().find({"user_id": ObjectId(user_id)}).sort("created_at", -1)
-    documents = [Document.from_dict(d).to_dict() for d in documents_data]
+    # Lists show title, type and excerpt; the full content is only sent by get_document_detail
+    documents_data = get_document_collection().find({"user_id": ObjectId(user_id)}, Document.SUMMARY_PROJECTION).sort("created_at", -1)
+    documents = [Document.from_dict(d).to_summary_dict() for d in documents_data]
     
     return jsonify(documents), 200
 
@@ -116,6 +282,153 @@ def get_document_detail(document_id):
         current_app.logger.error(f"Error fetching document detail: {e}")
         return jsonify({"message": "Invalid document ID or server error"}), 400
 
+@jwt_required()
+def update_document(document_id):
+    """Updates the title and/or content. A content change becomes a new revision and re-renders the PDF."""
+    user_id = get_jwt_identity()
+    data = request.get_json() or {}
+    
+    try:
+        document_data = get_document_collection().find_one({"_id": ObjectId(document_id), "user_id": ObjectId(user_id)})
+        if not document_data:
+            return jsonify({"message": "Document not found"}), 404
+        
+        fields = {}
+        if data.get('title'):
+            fields['title'] = data['title']
+        
+        content = data.get('content')
+        if content is not None and content != decompress_text(document_data.get('content')):
+            # Clients send the revision they edited; a stale one means someone else saved in between
+            if data.get('revision') is not None and data['revision'] != document_data.get('revision', 1):
+                return jsonify({"message": "Document was modified by another request; reload and retry"}), 409
+            save_new_revision(document_data, content, 'edit', {**fields, "pdf_status": "pending"})
+            queue_document_pdf(document_data['_id'])
+        elif fields:
+            fields['updated_at'] = datetime.utcnow()
+            get_document_collection().update_one({"_id": document_data['_id']}, {"$set": fields})
+        
+        updated_data = get_document_collection().find_one({"_id": document_data['_id']})
+        return jsonify({
+            "message": "Document updated successfully",
+            "document": Document.from_dict(updated_data).to_dict()
+        }), 200
+        
+    except RevisionConflictError:
+        return jsonify({"message": "Document was modified by another request; reload and retry"}), 409
+    except Exception as e:
+        current_app.logger.error(f"Error updating document: {e}")
+        return jsonify({"message": "Invalid document ID or server error"}), 400
+
+@jwt_required()
+def regenerate_document(document_id):
+    """Drafts the document again from its client/project; the previous text is kept as a revision."""
+    user_id = get_jwt_identity()
+    data = request.get_json(silent=True) or {}
+    
+    try:
+        document_data = get_document_collection().find_one({"_id": ObjectId(document_id), "user_id": ObjectId(user_id)})
+        if not document_data:
+            return jsonify({"message": "Document not found"}), 404
+        
+        client_data = get_client_collection().find_one({"_id": document_data['client_id']})
+        client = Client.from_dict(client_data).to_dict() if client_data else {}
+        project = {}
+        if document_data.get('project_id'):
+            project_data = get_project_collection().find_one({"_id": document_data['project_id']})
+            project = Project.from_dict(project_data).to_dict() if project_data else {}
+        
+        try:
+            # Regenerating asks for a new draft, so the response cache is bypassed
+            draft_content = generate_document_draft(
+                document_data['doc_type'], client, project, data.get('custom_details', ''),
+                get_business_settings(user_id), use_cache=False
+            )
+        except GenerationBusyError as e:
+            return _busy_response(e)
+        
+        save_new_revision(document_data, draft_content, 'regenerate', {"pdf_status": "pending"})
+        queue_document_pdf(document_data['_id'])
+        
+        updated_data = get_document_collection().find_one({"_id": document_data['_id']})
+        return jsonify({
+            "message": "Document regenerated successfully",
+            "document": Document.from_dict(updated_data).to_dict()
+        }), 200
+        
+    except RevisionConflictError:
+        return jsonify({"message": "Document was modified by another request; reload and retry"}), 409
+    except Exception as e:
+        current_app.logger.error(f"Error regenerating document: {e}")
+        return jsonify({"message": "Error regenerating document"}), 500
+
+@jwt_required()
+def get_document_revisions(document_id):
+    user_id = get_jwt_identity()
+    
+    try:
+        document_data = get_document_collection().find_one(
+            {"_id": ObjectId(document_id), "user_id": ObjectId(user_id)},
+            {"revision": 1, "content_source": 1, "updated_at": 1, "content": 1}
+        )
+        if not document_data:
+            return jsonify({"message": "Document not found"}), 404
+        
+        current = {
+            "revision": document_data.get('revision', 1),
+            "source": document_data.get('content_source', 'ai_draft'),
+            "content_length": len(decompress_text(document_data.get('content')) or ''),
+            "created_at": document_data['updated_at'].isoformat() if document_data.get('updated_at') else None,
+            "current": True
+        }
+        return jsonify([current] + [r.to_dict() for r in list_revisions(document_id)]), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Error fetching document revisions: {e}")
+        return jsonify({"message": "Invalid document ID or server error"}), 400
+
+@jwt_required()
+def get_document_revision(document_id, revision):
+    user_id = get_jwt_identity()
+    
+    try:
+        document_data = get_document_collection().find_one({"_id": ObjectId(document_id), "user_id": ObjectId(user_id)})
+        if not document_data:
+            return jsonify({"message": "Document not found"}), 404
+        
+        content = get_revision_content(document_data, revision)
+        if content is None:
+            return jsonify({"message": "Revision not found"}), 404
+        
+        return jsonify({"document_id": document_id, "revision": revision, "content": content}), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Error fetching document revision: {e}")
+        return jsonify({"message": "Invalid document ID or server error"}), 400
+
+@jwt_required()
+def download_document_pdf(document_id):
+    user_id = get_jwt_identity()
+    
+    try:
+        document_data = get_document_collection().find_one(
+            {"_id": ObjectId(document_id), "user_id": ObjectId(user_id)},
+            {"pdf_url": 1, "pdf_status": 1}
+        )
+        if not document_data:
+            return jsonify({"message": "Document not found"}), 404
+        if not document_data.get('pdf_url'):
+            return jsonify({"message": "Document PDF is not ready", "pdf_status": document_data.get('pdf_status')}), 404
+            
+        return send_stored_file(document_data['pdf_url'], f"document-{document_id}.pdf")
+        
+    except StoredFileUnavailableError as e:
+        current_app.logger.error(f"Error fetching document PDF from storage: {e}")
+        return jsonify({"message": "Could not fetch the PDF from storage"}), 502
+    except Exception as e:
+        current_app.logger.error(f"Error downloading document PDF: {e}")
+        return jsonify({"message": "Invalid document ID or server error"}), 400
+
 @jwt_required()
 def delete_document(document_id):
     user_id = get_jwt_identity()
@@ -125,8 +438,10 @@ def delete_document(document_id):
         
         if result.deleted_count == 0:
             return jsonify({"message": "Document not found or unauthorized"}), 404
-            
-        # TODO: Implement Cloudinary deletion if necessary
+        
+        delete_revisions(document_id)
+        # The PDF is deleted from storage by the asset GC job once no record references it
+        release_assets(asset_owner("document", document_id))
             
         return jsonify({"message": "Document deleted successfully"}), 200
         
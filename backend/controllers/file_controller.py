@@ -0,0 +1,11 @@
+from flask import current_app, jsonify, send_from_directory
+
+# Stored files are content-addressed, so a URL always returns the same bytes
+FILE_CACHE_SECONDS = 365 * 24 * 3600
+
+def get_stored_file(key):
+    # Only the local backend serves files itself; cloudinary and s3 URLs point at the provider
+    if current_app.config['STORAGE_BACKEND'] != 'local':
+        return jsonify({"message": "File not found"}), 404
+    # send_from_directory rejects keys that escape the storage directory
+    return send_from_directory(current_app.config['STORAGE_LOCAL_DIR'], key, max_age=FILE_CACHE_SECONDS)
@@ -3,10 +3,19 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from bson.objectid import ObjectId
 from models.invoice_model import Invoice, InvoiceItem
 from services.pdf_service import generate_invoice_pdf # Placeholder
-from services.cloudinary_service import upload_file # Placeholder
+from services.storage_service import upload_file, asset_owner, release_assets, send_stored_file, StoredFileUnavailableError
 from services.stripe_service import create_payment_link # Placeholder
-from services.gmail_service import send_invoice_email # Placeholder
+from services.email_outbox_service import queue_invoice_email
+from services.user_profile_service import get_business_settings
+from services.reminder_service import reminder_fields
+from services.payment_service import get_payment_collection, record_manual_payment
+from models.client_model import Client
+from models.payment_model import Payment
+from utils.date_utils import normalize_date_fields
+from pymongo import UpdateOne
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import os
 
 def get_invoice_collection():
     return current_app.db.invoices
@@ -49,6 +58,8 @@ def create_invoice():
             "message": "Invoice created successfully",
             "invoice": new_invoice.to_dict()
         }), 201
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error creating invoice: {e}")
         return jsonify({"message": "Error creating invoice"}), 500
@@ -84,7 +95,8 @@ def update_invoice(invoice_id):
     data = request.get_json()
     
     try:
-        update_data = {k: v for k, v in data.items() if k in Invoice.__init__.__code__.co_varnames and k not in ['_id', 'user_id', 'created_at', 'invoice_number']}
+        update_data = {k: v for k, v in data.items() if k in Invoice.__init__.__code__.co_varnames and k not in ['_id', 'user_id', 'created_at', 'invoice_number', 'next_reminder_at', 'reminders_sent']}
+        normalize_date_fields(update_data, Invoice.DATE_FIELDS)
         update_data['updated_at'] = datetime.utcnow()
         
         # Recalculate total if items are updated
@@ -104,6 +116,16 @@ def update_invoice(invoice_id):
             
         updated_invoice_data = get_invoice_collection().find_one({"_id": ObjectId(invoice_id)})
         
+        # Invoices marked Paid by hand get a ledger entry for their outstanding balance
+        if update_data.get('status') == 'Paid':
+            record_manual_payment(updated_invoice_data)
+        
+        # Re-arm (or clear) the reminder schedule when the due date or status changes
+        if 'due_date' in update_data or 'status' in update_data:
+            reminder_update = reminder_fields(Invoice.from_dict(updated_invoice_data))
+            get_invoice_collection().update_one({"_id": ObjectId(invoice_id)}, {"$set": reminder_update})
+            updated_invoice_data.update(reminder_update)
+        
         return jsonify({
             "message": "Invoice updated successfully",
             "invoice": Invoice.from_dict(updated_invoice_data).to_dict()
@@ -122,6 +144,8 @@ def delete_invoice(invoice_id):
         
         if result.deleted_count == 0:
             return jsonify({"message": "Invoice not found or unauthorized"}), 404
+        
+        release_assets(asset_owner("invoice", invoice_id))
             
         return jsonify({"message": "Invoice deleted successfully"}), 200
         
@@ -143,10 +167,10 @@ def generate_and_upload_invoice_pdf(invoice_id):
         invoice = Invoice.from_dict(invoice_data)
         
         # 1. Generate PDF
-        pdf_path = generate_invoice_pdf(invoice) # This service function will create a temporary PDF file
+        pdf_path = generate_invoice_pdf(invoice, get_business_settings(user_id)) # This service function will create a temporary PDF file
         
         # 2. Upload to Cloudinary
-        cloudinary_url = upload_file(pdf_path, folder="invoices")
+        cloudinary_url = upload_file(pdf_path, folder="invoices", owner=asset_owner("invoice", invoice_id))
         
         # 3. Update invoice record
         get_invoice_collection().update_one(
@@ -166,6 +190,29 @@ def generate_and_upload_invoice_pdf(invoice_id):
         current_app.logger.error(f"Error generating/uploading invoice PDF: {e}")
         return jsonify({"message": "Error processing invoice PDF"}), 500
 
+@jwt_required()
+def download_invoice_pdf(invoice_id):
+    user_id = get_jwt_identity()
+    
+    try:
+        invoice_data = get_invoice_collection().find_one(
+            {"_id": ObjectId(invoice_id), "user_id": ObjectId(user_id)},
+            {"invoice_number": 1, "pdf_url": 1}
+        )
+        if not invoice_data:
+            return jsonify({"message": "Invoice not found"}), 404
+        if not invoice_data.get('pdf_url'):
+            return jsonify({"message": "Invoice PDF has not been generated"}), 404
+            
+        return send_stored_file(invoice_data['pdf_url'], f"invoice-{invoice_data.get('invoice_number') or invoice_id}.pdf")
+        
+    except StoredFileUnavailableError as e:
+        current_app.logger.error(f"Error fetching invoice PDF from storage: {e}")
+        return jsonify({"message": "Could not fetch the PDF from storage"}), 502
+    except Exception as e:
+        current_app.logger.error(f"Error downloading invoice PDF: {e}")
+        return jsonify({"message": "Invalid invoice ID or server error"}), 400
+
 @jwt_required()
 def create_and_attach_payment_link(invoice_id):
     user_id = get_jwt_identity()
@@ -195,6 +242,76 @@ def create_and_attach_payment_link(invoice_id):
         current_app.logger.error(f"Error creating payment link: {e}")
         return jsonify({"message": "Error creating Stripe payment link"}), 500
 
+def _create_payment_link_in_context(app, invoice):
+    """Runs create_payment_link in a worker thread, which needs its own app context."""
+    with app.app_context():
+        return create_payment_link(invoice)
+
+@jwt_required()
+def create_payment_links_batch():
+    user_id = get_jwt_identity()
+    data = request.get_json() or {}
+    
+    invoice_ids = data.get('invoice_ids') or []
+    force = data.get('force', False) # Replace links that already exist
+    max_invoices = current_app.config['STRIPE_BATCH_MAX_INVOICES']
+    
+    if not isinstance(invoice_ids, list) or not invoice_ids:
+        return jsonify({"message": "invoice_ids must be a non-empty list"}), 400
+    if len(invoice_ids) > max_invoices:
+        return jsonify({"message": f"At most {max_invoices} invoices can be processed per batch"}), 400
+    
+    try:
+        object_ids = [ObjectId(i) for i in invoice_ids]
+    except Exception:
+        return jsonify({"message": "Invalid invoice ID in batch"}), 400
+    
+    try:
+        # 1. Load all invoices in one query
+        invoices_data = get_invoice_collection().find({"_id": {"$in": object_ids}, "user_id": ObjectId(user_id)})
+        invoices = {i['_id']: Invoice.from_dict(i) for i in invoices_data}
+        
+        results = {}
+        pending = []
+        for object_id in object_ids:
+            invoice = invoices.get(object_id)
+            if not invoice:
+                results[object_id] = {"invoice_id": str(object_id), "status": "not_found"}
+            elif invoice.stripe_payment_link and not force:
+                results[object_id] = {"invoice_id": str(object_id), "status": "skipped", "payment_link": invoice.stripe_payment_link}
+            else:
+                pending.append(invoice)
+        
+        # 2. Fan out over a thread pool; stripe_service throttles every API call
+        app = current_app._get_current_object()
+        with ThreadPoolExecutor(max_workers=current_app.config['STRIPE_BATCH_WORKERS']) as pool:
+            links = list(pool.map(lambda invoice: _create_payment_link_in_context(app, invoice), pending))
+        
+        # 3. Write all links back with one bulk_write
+        now = datetime.utcnow()
+        operations = []
+        for invoice, (payment_link, session_id) in zip(pending, links):
+            if payment_link:
+                operations.append(UpdateOne(
+                    {"_id": invoice._id},
+                    {"$set": {"stripe_payment_link": payment_link, "stripe_session_id": session_id, "updated_at": now}}
+                ))
+                results[invoice._id] = {"invoice_id": str(invoice._id), "status": "created", "payment_link": payment_link}
+            else:
+                results[invoice._id] = {"invoice_id": str(invoice._id), "status": "error", "message": "Error creating Stripe payment link"}
+        if operations:
+            get_invoice_collection().bulk_write(operations, ordered=False)
+        
+        ordered_results = [results[object_id] for object_id in object_ids]
+        return jsonify({
+            "message": f"Created {len(operations)} of {len(pending)} payment links",
+            "results": ordered_results
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Error creating payment links in batch: {e}")
+        return jsonify({"message": "Error creating Stripe payment links"}), 500
+
 @jwt_required()
 def send_invoice(invoice_id):
     user_id = get_jwt_identity()
@@ -215,17 +332,18 @@ def send_invoice(invoice_id):
             
         client = Client.from_dict(client_data)
         
-        # 1. Send email via Gmail API
-        send_invoice_email(invoice, client)
+        # 1. Queue email; the outbox sender job delivers it via the Gmail API
+        queue_invoice_email(invoice, client)
         
-        # 2. Update invoice status
+        # 2. Update invoice status and arm the overdue reminder schedule
+        invoice.status = "Sent"
         get_invoice_collection().update_one(
             {"_id": ObjectId(invoice_id)},
-            {"$set": {"status": "Sent", "updated_at": datetime.utcnow()}}
+            {"$set": {"status": "Sent", "updated_at": datetime.utcnow(), **reminder_fields(invoice)}}
         )
         
         return jsonify({
-            "message": "Invoice sent successfully",
+            "message": "Invoice queued for sending",
             "status": "Sent"
         }), 200
         
@@ -239,11 +357,18 @@ def send_invoice(invoice_id):
 def get_payment_history():
     user_id = get_jwt_identity()
     
-    # Payments are essentially invoices with status 'Paid'
-    paid_invoices_data = get_invoice_collection().find({"user_id": ObjectId(user_id), "status": "Paid"}).sort("updated_at", -1)
-    payments = [Invoice.from_dict(i).to_dict() for i in paid_invoices_data]
-    
-    # In a more complex app, this would query a separate 'payments' collection
-    # but for this scope, paid invoices serve as payment history.
-    
-    return jsonify(payments), 200
+    try:
+        limit = min(int(request.args.get('limit', 100)), 500)
+        query = {"user_id": ObjectId(user_id)}
+        if request.args.get('invoice_id'):
+            query["invoice_id"] = ObjectId(request.args['invoice_id'])
+        
+        # Compact ledger rows, served by the (user_id, paid_at) index
+        payments_data = get_payment_collection().find(query).sort("paid_at", -1).limit(limit)
+        payments = [Payment.from_dict(p).to_dict() for p in payments_data]
+        
+        return jsonify(payments), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Error fetching payment history: {e}")
+        return jsonify({"message": "Invalid request or server error"}), 400
@@ -2,9 +2,12 @@ from flask import current_app, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from bson.objectid import ObjectId
 from models.project_model import Project, Milestone
-from models.invoice_model import Invoice
-from models.document_model import Document
 from services.google_calendar_service import create_calendar_event, delete_calendar_event # Placeholder
+from services.document_revision_service import delete_revisions
+from services.storage_service import asset_owner, release_assets
+from services.project_detail_service import get_project_detail as get_project_detail_data
+from utils.date_utils import normalize_date_fields
+from datetime import datetime
 
 def get_project_collection():
     return current_app.db.projects
@@ -43,6 +46,8 @@ def create_project():
             "message": "Project created successfully",
             "project": new_project.to_dict()
         }), 201
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error creating project: {e}")
         return jsonify({"message": "Error creating project"}), 500
@@ -60,28 +65,18 @@ def get_project_detail(project_id):
     user_id = get_jwt_identity()
     
     try:
-        project_data = get_project_collection().find_one({"_id": ObjectId(project_id), "user_id": ObjectId(user_id)})
-        if not project_data:
+        # The project and its child lists in one aggregation
+        detail = get_project_detail_data(user_id, project_id)
+        if not detail:
             return jsonify({"message": "Project not found"}), 404
-            
-        project = Project.from_dict(project_data).to_dict()
-        
-        # Fetch related data
-        milestones_data = get_milestone_collection().find({"project_id": ObjectId(project_id)}).sort("due_date", 1)
-        milestones = [Milestone.from_dict(m).to_dict() for m in milestones_data]
-        
-        documents_data = get_document_collection().find({"project_id": ObjectId(project_id)}).sort("created_at", -1)
-        documents = [Document.from_dict(d).to_dict() for d in documents_data]
-        
-        invoices_data = get_invoice_collection().find({"project_id": ObjectId(project_id)}).sort("issue_date", -1)
-        invoices = [Invoice.from_dict(i).to_dict() for i in invoices_data]
         
         # Response structure MUST match frontend expectation
         return jsonify({
-            "project": project,
-            "milestones": milestones,
-            "documents": documents,
-            "invoices": invoices
+            "project": detail['project'],
+            "milestones": detail['milestones'],
+            "documents": detail['documents'],
+            "invoices": detail['invoices'],
+            "counts": detail['counts']
         }), 200
         
     except Exception as e:
@@ -95,6 +90,7 @@ def update_project(project_id):
     
     try:
         update_data = {k: v for k, v in data.items() if k in Project.__init__.__code__.co_varnames and k not in ['_id', 'user_id', 'created_at']}
+        normalize_date_fields(update_data, Project.DATE_FIELDS)
         update_data['updated_at'] = datetime.utcnow()
         
         result = get_project_collection().update_one(
@@ -126,10 +122,16 @@ def delete_project(project_id):
         if result.deleted_count == 0:
             return jsonify({"message": "Project not found or unauthorized"}), 404
             
-        # Cascading delete for milestones, documents, and invoices
+        # Cascading delete for milestones, documents (with their revisions), and invoices; their PDFs are released for the asset GC
+        document_ids = get_document_collection().distinct("_id", {"project_id": ObjectId(project_id)})
+        owners = [asset_owner("document", document_id) for document_id in document_ids]
+        owners += [asset_owner("invoice", i["_id"]) for i in get_invoice_collection().find({"project_id": ObjectId(project_id)}, {"_id": 1})]
         get_milestone_collection().delete_many({"project_id": ObjectId(project_id)})
-        get_document_collection().delete_many({"project_id": ObjectId(project_id)})
+        if document_ids:
+            get_document_collection().delete_many({"_id": {"$in": document_ids}})
+            delete_revisions(*document_ids)
         get_invoice_collection().delete_many({"project_id": ObjectId(project_id)})
+        release_assets(*owners)
             
         return jsonify({"message": "Project deleted successfully"}), 200
         
@@ -169,6 +171,8 @@ def create_milestone(project_id):
             "message": "Milestone created successfully",
             "milestone": new_milestone.to_dict()
         }), 201
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error creating milestone: {e}")
         return jsonify({"message": "Error creating milestone"}), 500
@@ -185,6 +189,7 @@ def update_milestone(project_id, milestone_id):
             return jsonify({"message": "Project not found or unauthorized"}), 404
             
         update_data = {k: v for k, v in data.items() if k in Milestone.__init__.__code__.co_varnames and k not in ['_id', 'project_id', 'created_at']}
+        normalize_date_fields(update_data, Milestone.DATE_FIELDS)
         update_data['updated_at'] = datetime.utcnow()
         
         # If due_date or status changes, update Google Calendar event
@@ -0,0 +1,39 @@
+from flask import current_app, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models.search_scopes import SCOPES
+from services.search_service import search
+import time
+
+@jwt_required()
+def search_records():
+    user_id = get_jwt_identity()
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"message": "Missing search query: q"}), 400
+    
+    kinds = [k.strip() for k in request.args.get('types', '').split(',') if k.strip()]
+    unknown = [k for k in kinds if k not in SCOPES]
+    if unknown:
+        return jsonify({"message": f"Unknown search types: {', '.join(unknown)}"}), 400
+    
+    try:
+        max_results = current_app.config['SEARCH_MAX_RESULTS']
+        per_page = min(max(request.args.get('per_page', current_app.config['SEARCH_PAGE_SIZE'], type=int), 1), 100)
+        page = max(request.args.get('page', 1, type=int), 1)
+        if page * per_page > max_results:
+            return jsonify({"message": f"Search results are limited to the first {max_results} hits; refine the query"}), 400
+        
+        started = time.perf_counter()
+        hits, has_more = search(user_id, query, kinds or None, page, per_page)
+        return jsonify({
+            "query": query,
+            "page": page,
+            "per_page": per_page,
+            "has_more": has_more and page * per_page < max_results,
+            "results": hits,
+            "took_ms": round((time.perf_counter() - started) * 1000, 1)
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Error searching records: {e}")
+        return jsonify({"message": "Error performing search"}), 500
@@ -3,7 +3,10 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from bson.objectid import ObjectId
 from models.user_model import User
 from utils.auth_utils import hash_password
-from services.cloudinary_service import upload_file
+from services.logo_service import ingest_logo, InvalidLogoError
+from services.storage_service import asset_owner
+from services.user_profile_service import invalidate_user_profile
+from services.reminder_service import validate_reminder_schedule, reschedule_user_reminders
 from datetime import datetime
 
 def get_user_collection():
@@ -30,7 +33,8 @@ def get_user_settings():
             "business_settings": user['business_settings'],
             "api_keys": user['api_keys'],
             "notification_preferences": user['notification_preferences'],
-            "user_preferences": user['user_preferences']
+            "user_preferences": user['user_preferences'],
+            "reminder_schedule": user['reminder_schedule']
         }), 200
         
     except Exception as e:
@@ -64,6 +68,8 @@ def update_profile():
         if result.matched_count == 0:
             return jsonify({"message": "User not found"}), 404
             
+        invalidate_user_profile(user_id)
+            
         return jsonify({"message": "Profile updated successfully"}), 200
         
     except Exception as e:
@@ -117,6 +123,8 @@ def update_business_settings():
         if result.matched_count == 0:
             return jsonify({"message": "User not found"}), 404
             
+        invalidate_user_profile(user_id)
+            
         return jsonify({"message": "Business settings updated successfully"}), 200
         
     except Exception as e:
@@ -134,31 +142,36 @@ def upload_logo():
     logo_file = request.files['logo']
     
     try:
-        # Save file temporarily
-        temp_path = f"/tmp/logo_{user_id}_{logo_file.filename}"
-        logo_file.save(temp_path)
-        
-        # Upload to Cloudinary
-        cloudinary_url = upload_file(temp_path, folder="logos")
-        
-        # Clean up local file
-        os.remove(temp_path)
+        # Streamed into the image pipeline: validated, stored once, and resized for PDFs and the UI
+        logo = ingest_logo(logo_file.stream, asset_owner("logo", user_id))
+    except InvalidLogoError as e:
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error uploading logo: {e}")
+        return jsonify({"message": "Server error during logo upload"}), 500
+    
+    try:
+        logo_url = logo['variants']['ui']['url']
         
-        if not cloudinary_url:
-            return jsonify({"message": "Failed to upload logo to cloud"}), 500
-            
         # Update user's business settings
         result = get_user_collection().update_one(
             {"_id": ObjectId(user_id)},
-            {"$set": {"business_settings.logo_url": cloudinary_url, "updated_at": datetime.utcnow()}}
+            {"$set": {
+                "business_settings.logo_url": logo_url,
+                "business_settings.logo": logo,
+                "updated_at": datetime.utcnow()
+            }}
         )
         
         if result.matched_count == 0:
             return jsonify({"message": "User not found"}), 404
             
+        invalidate_user_profile(user_id)
+            
         return jsonify({
             "message": "Logo uploaded and updated successfully",
-            "logo_url": cloudinary_url
+            "logo_url": logo_url,
+            "logo": logo
         }), 200
         
     except Exception as e:
@@ -205,6 +218,8 @@ def update_notification_preferences():
         if result.matched_count == 0:
             return jsonify({"message": "User not found"}), 404
             
+        invalidate_user_profile(user_id)
+            
         return jsonify({"message": "Notification preferences updated successfully"}), 200
         
     except Exception as e:
@@ -228,8 +243,44 @@ def update_user_preferences():
         if result.matched_count == 0:
             return jsonify({"message": "User not found"}), 404
             
+        invalidate_user_profile(user_id)
+            
         return jsonify({"message": "User preferences updated successfully"}), 200
         
     except Exception as e:
         current_app.logger.error(f"Error updating user preferences: {e}")
         return jsonify({"message": "Server error"}), 500
+
+@jwt_required()
+def update_reminder_schedule():
+    user_id = get_jwt_identity()
+    data = request.get_json()
+    
+    try:
+        schedule = validate_reminder_schedule(data.get('days_after_due'))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    
+    try:
+        result = get_user_collection().update_one(
+            {"_id": ObjectId(user_id)},
+            {"$set": {"reminder_schedule": schedule, "updated_at": datetime.utcnow()}}
+        )
+        
+        if result.matched_count == 0:
+            return jsonify({"message": "User not found"}), 404
+            
+        invalidate_user_profile(user_id)
+        
+        # Re-arm next_reminder_at on all open invoices with the new cadence
+        rescheduled = reschedule_user_reminders(user_id, schedule)
+            
+        return jsonify({
+            "message": "Reminder schedule updated successfully",
+            "reminder_schedule": schedule,
+            "rescheduled_invoices": rescheduled
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Error updating reminder schedule: {e}")
+        return jsonify({"message": "Server error"}), 500
@@ -0,0 +1,134 @@
+from services.email_outbox_service import drain_outbox
+from services.stripe_event_service import process_pending_stripe_events
+from services.reconciliation_service import reconcile_stripe_payments
+from services.document_pdf_service import requeue_stale_document_pdfs
+from services.document_batch_service import requeue_stale_document_jobs
+from services.asset_gc_service import collect_orphaned_assets
+
+def send_outbox_emails(app):
+    """Drains one batch of the email outbox. Runs every few seconds via APScheduler."""
+    with app.app_context():
+        try:
+            summary = drain_outbox()
+            if any(summary.values()):
+                app.logger.info(f"Email outbox batch processed: {summary}")
+        except Exception as e:
+            app.logger.error(f"Error draining email outbox: {e}")
+
+def process_stripe_events(app):
+    """Applies stored Stripe webhook events (marking invoices Paid, notifications)."""
+    with app.app_context():
+        try:
+            summary = process_pending_stripe_events()
+            if any(summary.values()):
+                app.logger.info(f"Stripe events processed: {summary}")
+        except Exception as e:
+            app.logger.error(f"Error processing Stripe events: {e}")
+
+def reconcile_payments(app):
+    """Sweeps Stripe checkout sessions for payments whose webhook never arrived."""
+    if app.config['STRIPE_RECONCILE_SOURCE'] == 'stripe' and not app.config['STRIPE_SECRET_KEY']:
+        return
+    with app.app_context():
+        try:
+            summary = reconcile_stripe_payments()
+            if summary['payments_recorded']:
+                app.logger.warning(f"Stripe reconciliation recovered missed payments: {summary}")
+        except Exception as e:
+            app.logger.error(f"Error reconciling Stripe payments: {e}")
+
+def collect_assets(app):
+    """Deletes a batch of stored files that no record references any more."""
+    with app.app_context():
+        try:
+            summary = collect_orphaned_assets()
+            if summary['candidates']:
+                app.logger.info(
+                    f"Asset GC: deleted {summary['deleted']} of {summary['candidates']} orphaned assets "
+                    f"({summary['bytes']} bytes), failed {summary['failed']}, skipped {summary['skipped']}"
+                )
+        except Exception as e:
+            app.logger.error(f"Error collecting orphaned assets: {e}")
+
+def requeue_document_pdfs(app):
+    """Queues PDFs again for documents whose render job was lost (e.g., in a restart)."""
+    with app.app_context():
+        try:
+            queued = requeue_stale_document_pdfs()
+            if queued:
+                app.logger.warning(f"Re-queued {queued} stale document PDF renders.")
+        except Exception as e:
+            app.logger.error(f"Error re-queueing document PDFs: {e}")
+
+def requeue_document_jobs(app):
+    """Queues batch document jobs again that were lost in a restart or stopped mid-run."""
+    with app.app_context():
+        try:
+            queued = requeue_stale_document_jobs()
+            if queued:
+                app.logger.warning(f"Re-queued {queued} stale batch document jobs.")
+        except Exception as e:
+            app.logger.error(f"Error re-queueing batch document jobs: {e}")
+
+def schedule_background_jobs(scheduler, app):
+    """Schedules the short-interval background workers."""
+    scheduler.add_job(
+        send_outbox_emails,
+        'interval',
+        seconds=app.config['EMAIL_OUTBOX_INTERVAL_SECONDS'],
+        args=[app],
+        id='email_outbox_sender',
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
+    scheduler.add_job(
+        process_stripe_events,
+        'interval',
+        seconds=app.config['STRIPE_EVENT_INTERVAL_SECONDS'],
+        args=[app],
+        id='stripe_event_processor',
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
+    scheduler.add_job(
+        reconcile_payments,
+        'interval',
+        minutes=app.config['STRIPE_RECONCILE_INTERVAL_MINUTES'],
+        args=[app],
+        id='stripe_reconciliation',
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
+    scheduler.add_job(
+        requeue_document_pdfs,
+        'interval',
+        minutes=app.config['DOCUMENT_PDF_STALE_MINUTES'],
+        args=[app],
+        id='document_pdf_requeue',
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
+    scheduler.add_job(
+        requeue_document_jobs,
+        'interval',
+        minutes=app.config['DOCUMENT_JOB_STALE_MINUTES'],
+        args=[app],
+        id='document_job_requeue',
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
+    scheduler.add_job(
+        collect_assets,
+        'interval',
+        minutes=app.config['ASSET_GC_INTERVAL_MINUTES'],
+        args=[app],
+        id='asset_gc',
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
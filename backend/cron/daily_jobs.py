@@ -1,72 +1,91 @@
-from flask import current_app
-from datetime import datetime, timedelta
-from bson.objectid import ObjectId
-from models.invoice_model import Invoice
+from datetime import datetime
 from models.client_model import Client
-from services.gmail_service import send_overdue_reminder # Placeholder
+from services.reminder_service import send_due_reminders
+from services.user_profile_service import notifications_enabled
+from utils.date_utils import start_of_day
 
-def check_and_send_overdue_reminders():
+def mark_overdue_invoices(app):
     """
-    Checks for overdue invoices and sends a reminder email to the client.
+    Flips 'Sent' invoices whose due_date has passed to 'Overdue' and notifies their owners.
     This function is intended to be run daily by APScheduler.
     """
-    with current_app.app_context():
-        db = current_app.db
+    with app.app_context():
+        db = app.db
         
-        # 1. Find all invoices that are 'Sent' and whose due_date is in the past
-        today = datetime.utcnow().date()
-        
-        # Find invoices that are 'Sent' and due_date is less than today
-        overdue_invoices_data = db.invoices.find({
-            "status": "Sent",
-            "due_date": {"$lt": today.isoformat()}
-        })
-        
-        for invoice_data in overdue_invoices_data:
-            try:
-                invoice = Invoice.from_dict(invoice_data)
-                
-                # 2. Update status to 'Overdue'
-                db.invoices.update_one(
-                    {"_id": invoice._id},
-                    {"$set": {"status": "Overdue", "updated_at": datetime.utcnow()}}
-                )
-                
-                # 3. Fetch client details
-                client_data = db.clients.find_one({"_id": invoice.client_id})
-                if not client_data:
-                    current_app.logger.error(f"Client not found for overdue invoice {invoice._id}")
+        try:
+            # 1. Find all invoices that are 'Sent' and whose due_date is before today (BSON date comparison)
+            overdue_invoices = list(db.invoices.find(
+                {"status": "Sent", "due_date": {"$lt": start_of_day()}},
+                {"user_id": 1, "client_id": 1, "invoice_number": 1}
+            ))
+            if not overdue_invoices:
+                return
+            
+            # 2. Update status to 'Overdue' in one round trip
+            db.invoices.update_many(
+                {"_id": {"$in": [i['_id'] for i in overdue_invoices]}, "status": "Sent"},
+                {"$set": {"status": "Overdue", "updated_at": datetime.utcnow()}}
+            )
+            
+            # 3. Fetch client names with a single lookup
+            client_ids = list({i['client_id'] for i in overdue_invoices})
+            clients = {c['_id']: Client.from_dict(c) for c in db.clients.find({"_id": {"$in": client_ids}})}
+            
+            # 4. Create notifications for users who enabled them
+            notifications = []
+            for invoice in overdue_invoices:
+                if not notifications_enabled(invoice['user_id'], 'overdue_reminder'):
                     continue
-                client = Client.from_dict(client_data)
-                
-                # 4. Send overdue reminder email
-                # send_overdue_reminder(invoice, client) # Placeholder function
-                current_app.logger.info(f"Overdue reminder sent for invoice {invoice.invoice_number} to {client.email}")
-                
-                # 5. Create a notification for the user
-                db.notifications.insert_one({
-                    "user_id": invoice.user_id,
-                    "message": f"Invoice {invoice.invoice_number} to {client.name} is now overdue.",
+                client = clients.get(invoice['client_id'])
+                client_name = client.name if client else "a client"
+                notifications.append({
+                    "user_id": invoice['user_id'],
+                    "message": f"Invoice {invoice['invoice_number']} to {client_name} is now overdue.",
                     "type": "overdue_reminder",
-                    "related_id": invoice._id,
+                    "related_id": invoice['_id'],
                     "is_read": False,
                     "created_at": datetime.utcnow()
                 })
-                
-            except Exception as e:
-                current_app.logger.error(f"Error processing overdue invoice {invoice_data.get('_id')}: {e}")
+            if notifications:
+                db.notifications.insert_many(notifications, ordered=False)
+            
+            app.logger.info(f"Marked {len(overdue_invoices)} invoices as overdue.")
+        except Exception as e:
+            app.logger.error(f"Error marking overdue invoices: {e}")
+
+def send_overdue_reminders(app):
+    """
+    Queues reminder emails for invoices whose next_reminder_at has passed.
+    Runs hourly so reminders go out shortly after they become due.
+    """
+    with app.app_context():
+        try:
+            queued = send_due_reminders()
+            if queued:
+                app.logger.info(f"Queued {queued} overdue reminder emails.")
+        except Exception as e:
+            app.logger.error(f"Error sending overdue reminders: {e}")
 
-def schedule_daily_jobs(scheduler):
+def schedule_daily_jobs(scheduler, app):
     """Schedules the daily cron jobs."""
-    # Run every day at 08:00 UTC
+    # Run every day at 00:05 UTC, right after invoices become overdue
+    scheduler.add_job(
+        mark_overdue_invoices, 
+        'cron', 
+        hour=0, 
+        minute=5, 
+        args=[app],
+        id='overdue_status_job', 
+        replace_existing=True
+    )
+    # Reminder emails follow each user's schedule (e.g., 3, 7 and 14 days past due)
     scheduler.add_job(
-        check_and_send_overdue_reminders, 
+        send_overdue_reminders, 
         'cron', 
-        hour=8, 
-        minute=0, 
+        minute=15, 
+        args=[app],
         id='overdue_reminder_job', 
         replace_existing=True
     )
-    pass
 
 # NOTE: The scheduling logic is called in app.py after the scheduler is initialized.
@@ -0,0 +1,127 @@
+"""
+Measures what compressing document content at rest saves, and what it costs
+on write and read, for each available codec.
+
+By default it uses a synthetic corpus of Markdown proposals/contracts of
+realistic sizes; --documents reads .md/.txt files from a directory instead and
+--mongo-uri samples real documents (plain or already compressed).
+
+    python -m devtools.compression_benchmark --count 500
+    python -m devtools.compression_benchmark --documents ./drafts --threshold 1024
+    python -m devtools.compression_benchmark --mongo-uri mongodb://localhost:27017/freelancer --count 1000
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from utils.compression import CODEC_TAGS, compress_text, decompress_text, zstandard
+
+WORDS = (
+    "project client scope deliverable milestone timeline payment invoice agreement party services "
+    "design development testing deployment support maintenance revision approval feedback schedule "
+    "budget estimate rate hourly fixed fee deposit balance due upon completion within days written "
+    "notice termination confidential information intellectual property rights license ownership "
+    "warranty liability indemnify governing law jurisdiction dispute resolution amendment entire "
+    "website application mobile brand identity logo content strategy marketing analytics report "
+    "will shall must may not the a an and or of to for in on with by from as at this that each any "
+    "all such other its their our your provide deliver ensure include perform complete review "
+    "requirements specification documentation training handover launch phase week month quarter"
+).split()
+
+def _sentence(rng):
+    words = rng.choices(WORDS, k=rng.randint(8, 24))
+    return " ".join(words).capitalize() + "."
+
+def synthetic_document(rng):
+    """A Markdown document shaped like the drafts the templates ask for (sections, lists, a table)."""
+    lines = [f"# {rng.choice(['Project Proposal', 'Contract Agreement', 'Price Quote', 'Project Report'])}", ""]
+    for number in range(rng.randint(4, 14)):
+        lines += [f"## {number + 1}. {' '.join(rng.choices(WORDS, k=3)).title()}", ""]
+        for _ in range(rng.randint(1, 4)):
+            lines += [" ".join(_sentence(rng) for _ in range(rng.randint(2, 6))), ""]
+        if rng.random() < 0.4:
+            lines += [f"- {_sentence(rng)}" for _ in range(rng.randint(2, 6))] + [""]
+        if rng.random() < 0.2:
+            lines += ["| Item | Quantity | Price |", "| :--- | ---: | ---: |"]
+            lines += [f"| {' '.join(rng.choices(WORDS, k=2))} | {rng.randint(1, 40)} | {rng.randint(50, 5000)}.00 |"
+                      for _ in range(rng.randint(2, 8))] + [""]
+    return "\n".join(lines)
+
+def load_corpus(args):
+    if args.documents:
+        corpus = []
+        for name in sorted(os.listdir(args.documents)):
+            if name.endswith((".md", ".txt")):
+                with open(os.path.join(args.documents, name), encoding="utf-8") as f:
+                    corpus.append(f.read())
+        return corpus[:args.count]
+    if args.mongo_uri:
+        from pymongo import MongoClient
+        db = MongoClient(args.mongo_uri).get_default_database()
+        cursor = db.documents.aggregate([{"$sample": {"size": args.count}}, {"$project": {"content": 1}}])
+        return [decompress_text(d["content"]) for d in cursor if d.get("content")]
+    rng = random.Random(args.seed)
+    return [synthetic_document(rng) for _ in range(args.count)]
+
+def stored_size(value):
+    return len(value) if isinstance(value, bytes) else len(value.encode("utf-8"))
+
+def benchmark(corpus, codec, threshold, repeat):
+    stored = [compress_text(text, threshold, codec) for text in corpus]
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in corpus:
+            compress_text(text, threshold, codec)
+    write_us = (time.perf_counter() - start) / (repeat * len(corpus)) * 1e6
+
+    read_times = []
+    for value in stored:
+        if isinstance(value, bytes):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                decompress_text(value)
+            read_times.append((time.perf_counter() - start) / repeat * 1e6)
+
+    raw = sum(stored_size(text) for text in corpus)
+    compressed = sum(stored_size(value) for value in stored)
+    return {
+        "codec": codec,
+        "raw_kb": raw / 1024,
+        "stored_kb": compressed / 1024,
+        "saved": 1 - compressed / raw,
+        "compressed_docs": len(read_times),
+        "write_us": write_us,
+        "read_us_median": statistics.median(read_times) if read_times else 0.0,
+        "read_us_p95": sorted(read_times)[int(len(read_times) * 0.95) - 1] if read_times else 0.0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark document content compression.")
+    parser.add_argument("--count", type=int, default=500, help="Documents in the corpus.")
+    parser.add_argument("--threshold", type=int, default=2048, help="Characters before content is compressed.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions per document.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--documents", help="Directory of .md/.txt files to use instead of the synthetic corpus.")
+    parser.add_argument("--mongo-uri", help="Sample the documents collection of this database instead.")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args)
+    if not corpus:
+        parser.error("The corpus is empty")
+    sizes = sorted(len(text) for text in corpus)
+    print(f"{len(corpus)} documents, median {sizes[len(sizes) // 2]} chars, max {sizes[-1]} chars, "
+          f"threshold {args.threshold}")
+    print(f"{'codec':<6} {'raw KB':>9} {'stored KB':>10} {'saved':>7} {'compressed':>11} "
+          f"{'write µs':>9} {'read µs p50':>12} {'read µs p95':>12}")
+    for codec in CODEC_TAGS:
+        if codec == "zstd" and zstandard is None:
+            print("zstd   (skipped: zstandard is not installed)")
+            continue
+        r = benchmark(corpus, codec, args.threshold, args.repeat)
+        print(f"{r['codec']:<6} {r['raw_kb']:>9.1f} {r['stored_kb']:>10.1f} {r['saved']:>7.1%} "
+              f"{r['compressed_docs']:>11} {r['write_us']:>9.1f} {r['read_us_median']:>12.1f} {r['read_us_p95']:>12.1f}")
+
+if __name__ == "__main__":
+    main()
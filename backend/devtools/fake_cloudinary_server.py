@@ -0,0 +1,195 @@
+"""
+Local stand-in for Cloudinary's upload API, for exercising the upload manager
+(chunked uploads, retries, parallelism) without a Cloudinary account.
+
+It accepts POST /v1_1/<cloud>/<resource_type>/upload, both single-shot and
+chunked (Content-Range + X-Unique-Upload-Id), keeps the files in memory and
+serves them back from the returned secure_url. --failure-rate answers a share
+of requests with a 503 HTML page, which the SDK reports like a real outage.
+
+    python -m devtools.fake_cloudinary_server --port 18090 --latency 0.2 --failure-rate 0.1
+
+Then point the backend at it:
+
+    CLOUDINARY_CLOUD_NAME=demo CLOUDINARY_API_KEY=key CLOUDINARY_API_SECRET=secret \\
+    CLOUDINARY_UPLOAD_PREFIX=http://localhost:18090 flask run
+"""
+import argparse
+import json
+import os
+import random
+import re
+import secrets
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+_UPLOAD_PATH = re.compile(r"^/v1_1/(?P<cloud>[^/]+)/(?P<resource_type>[^/]+)/upload$")
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+class FakeCloudinaryState:
+    """Stored files, in-progress chunked uploads and request counters."""
+
+    def __init__(self, latency=0.0, failure_rate=0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.lock = threading.Lock()
+        self.files = {} # URL path -> bytes
+        self.partial = {} # X-Unique-Upload-Id -> {"public_id", "parts": {offset: bytes}, "total"}
+        self.stats = {"requests": 0, "uploads": 0, "parts": 0, "failures": 0, "bytes": 0, "in_flight": 0, "max_in_flight": 0}
+
+    def enter(self):
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["in_flight"] += 1
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+
+    def leave(self):
+        with self.lock:
+            self.stats["in_flight"] -= 1
+
+    def should_fail(self):
+        if self.failure_rate and random.random() < self.failure_rate:
+            with self.lock:
+                self.stats["failures"] += 1
+            return True
+        return False
+
+    def store(self, base_url, cloud, resource_type, public_id, filename, data):
+        extension = os.path.splitext(filename or "")[1].lstrip(".") or "bin"
+        version = int(time.time())
+        path = f"/{cloud}/{resource_type}/upload/v{version}/{public_id}.{extension}"
+        with self.lock:
+            self.files[path] = data
+            self.stats["uploads"] += 1
+            self.stats["bytes"] += len(data)
+        return {
+            "public_id": public_id,
+            "version": version,
+            "resource_type": resource_type,
+            "type": "upload",
+            "format": extension,
+            "bytes": len(data),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "url": base_url + path,
+            "secure_url": base_url + path,
+        }
+
+def parse_multipart(content_type, body):
+    """Returns (fields, (filename, data)) from a multipart/form-data body."""
+    message = BytesParser(policy=default_policy).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + body
+    )
+    fields, upload = {}, (None, b"")
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        if name == "file":
+            upload = (part.get_filename(), part.get_payload(decode=True) or b"")
+        else:
+            fields[name] = part.get_content().strip() if part.get_content_maintype() == "text" else part.get_payload(decode=True)
+    return fields, upload
+
+def make_handler(state):
+    class FakeCloudinaryHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, content_type="application/json"):
+            if not isinstance(body, bytes):
+                body = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _base_url(self):
+            return f"http://{self.headers.get('Host', f'{self.server.server_address[0]}:{self.server.server_address[1]}')}"
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            match = _UPLOAD_PATH.match(urlparse(self.path).path)
+            if not match:
+                self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+                return
+
+            state.enter()
+            try:
+                if state.latency:
+                    time.sleep(state.latency)
+                if state.should_fail():
+                    self._send(503, b"<html><body>503 Service Temporarily Unavailable</body></html>", "text/html")
+                    return
+
+                fields, (filename, data) = parse_multipart(self.headers["Content-Type"], body)
+                folder = fields.get("folder")
+                cloud, resource_type = match.group("cloud"), match.group("resource_type")
+                if resource_type == "auto":
+                    resource_type = "image" if (filename or "").lower().endswith((".png", ".jpg", ".jpeg", ".gif", ".webp", ".pdf")) else "raw"
+
+                content_range = _CONTENT_RANGE.match(self.headers.get("Content-Range", ""))
+                if not content_range:
+                    public_id = fields.get("public_id") or "/".join(filter(None, [folder, secrets.token_hex(10)]))
+                    self._send(200, state.store(self._base_url(), cloud, resource_type, public_id, filename, data))
+                    return
+
+                start, end, total = (int(v) for v in content_range.groups())
+                upload_id = self.headers.get("X-Unique-Upload-Id")
+                with state.lock:
+                    state.stats["parts"] += 1
+                    upload = state.partial.setdefault(upload_id, {
+                        "public_id": fields.get("public_id") or "/".join(filter(None, [folder, secrets.token_hex(10)])),
+                        "parts": {},
+                    })
+                    upload["parts"][start] = data # A retried part simply replaces the earlier attempt
+                    received = sum(len(p) for p in upload["parts"].values())
+                if end + 1 < total or received < total:
+                    self._send(200, {"public_id": upload["public_id"], "done": False, "bytes": received})
+                    return
+
+                with state.lock:
+                    state.partial.pop(upload_id, None)
+                assembled = b"".join(upload["parts"][offset] for offset in sorted(upload["parts"]))
+                self._send(200, state.store(self._base_url(), cloud, resource_type, upload["public_id"], filename, assembled))
+            finally:
+                state.leave()
+
+        def do_GET(self):
+            path = urlparse(self.path).path
+            if path == "/stats":
+                with state.lock:
+                    self._send(200, {**state.stats, "files": len(state.files), "pending_chunked": len(state.partial)})
+                return
+            data = state.files.get(path)
+            if data is None:
+                self._send(404, {"error": {"message": "Resource not found"}})
+            else:
+                self._send(200, data, "application/octet-stream")
+
+    return FakeCloudinaryHandler
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake Cloudinary upload API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18090)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every upload request.")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of requests answered with 503.")
+    args = parser.parse_args()
+
+    state = FakeCloudinaryState(args.latency, args.failure_rate)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    print(f"Fake Cloudinary API listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Stats: {state.stats}")
+
+if __name__ == "__main__":
+    main()
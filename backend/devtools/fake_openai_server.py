@@ -0,0 +1,188 @@
+"""
+Local OpenAI-compatible server for exercising document drafting without API
+calls: connection pooling, timeouts, the generation cap and SSE streaming.
+
+It answers POST /v1/chat/completions with a canned Markdown document, either
+as one JSON response or streamed as chat.completion.chunk events. Latency
+settings make slow generations (and 429 backpressure) easy to reproduce.
+
+    python -m devtools.fake_openai_server --port 18080 --first-token-delay 0.5 --tokens-per-second 40
+
+Then point the backend at it:
+
+    OPENAI_API_KEY=sk-fake OPENAI_BASE_URL=http://localhost:18080/v1 flask run
+"""
+import argparse
+import json
+import re
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_DOCUMENT = """# Project Proposal
+
+## Overview
+
+This proposal outlines the scope, timeline and budget for the project.
+
+## Scope of Work
+
+- Discovery and requirements workshop
+- Design and implementation
+- Testing, handover and documentation
+
+## Timeline
+
+| Phase | Duration |
+| :--- | :--- |
+| Discovery | 1 week |
+| Implementation | 4 weeks |
+| Handover | 1 week |
+
+## Terms
+
+Payment is due within **30 days** of each invoice. Either party may end this
+agreement with *14 days* written notice.
+"""
+
+class FakeOpenAIState:
+    """Response settings plus counters for concurrent and total requests."""
+
+    def __init__(self, document, first_token_delay=0.0, tokens_per_second=0.0):
+        self.document = document
+        self.first_token_delay = first_token_delay
+        self.tokens_per_second = tokens_per_second
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.total_requests = 0
+
+    def enter(self):
+        with self.lock:
+            self.total_requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def leave(self):
+        with self.lock:
+            self.in_flight -= 1
+
+def tokenize(text):
+    """Splits text into word-sized pieces (keeping whitespace) to imitate model tokens."""
+    return re.findall(r"\S+\s*|\s+", text)
+
+def make_handler(state):
+    class FakeOpenAIHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1" # Keep-alive, like the real API
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/stats"):
+                self._send_json(200, {"requests": state.total_requests, "in_flight": state.in_flight,
+                                      "max_in_flight": state.max_in_flight})
+            else:
+                self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+                return
+
+            state.enter()
+            try:
+                if state.first_token_delay:
+                    time.sleep(state.first_token_delay)
+                completion_id = f"chatcmpl-{secrets.token_hex(12)}"
+                model = request.get("model", "fake-model")
+                if request.get("stream"):
+                    self._stream(completion_id, model)
+                else:
+                    if state.tokens_per_second:
+                        time.sleep(len(tokenize(state.document)) / state.tokens_per_second)
+                    self._send_json(200, {
+                        "id": completion_id,
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": state.document}}],
+                        "usage": {"prompt_tokens": 0, "completion_tokens": len(tokenize(state.document)),
+                                  "total_tokens": len(tokenize(state.document))},
+                    })
+            finally:
+                state.leave()
+
+        def _stream(self, completion_id, model):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def send_event(payload):
+                data = f"data: {payload}\n\n".encode()
+                self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def chunk(delta, finish_reason=None):
+                return json.dumps({
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                })
+
+            try:
+                send_event(chunk({"role": "assistant", "content": ""}))
+                for token in tokenize(state.document):
+                    if state.tokens_per_second:
+                        time.sleep(1 / state.tokens_per_second)
+                    send_event(chunk({"content": token}))
+                send_event(chunk({}, "stop"))
+                send_event("[DONE]")
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                # The client stopped reading (e.g., the browser closed the SSE stream)
+                self.close_connection = True
+
+    return FakeOpenAIHandler
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake OpenAI-compatible chat completions server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--first-token-delay", type=float, default=0.0, help="Seconds before the first token.")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Generation speed (0 = instant).")
+    parser.add_argument("--document", help="Markdown file to return instead of the built-in sample.")
+    args = parser.parse_args()
+
+    document = DEFAULT_DOCUMENT
+    if args.document:
+        with open(args.document) as f:
+            document = f.read()
+
+    state = FakeOpenAIState(document, args.first_token_delay, args.tokens_per_second)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    print(f"Fake OpenAI API listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Handled {state.total_requests} requests (max {state.max_in_flight} concurrent)")
+
+if __name__ == "__main__":
+    main()
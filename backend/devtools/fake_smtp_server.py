@@ -0,0 +1,90 @@
+"""
+Minimal local SMTP server that accepts every message and prints it.
+Stands in for Gmail when exercising the email outbox in development:
+
+    EMAIL_TRANSPORT=smtp SMTP_PORT=1025 python app.py
+    python -m devtools.fake_smtp_server --port 1025
+
+Set --fail-rate to make a fraction of deliveries fail with a 451 so the
+outbox retry/backoff path can be observed.
+"""
+import argparse
+import random
+import socketserver
+from email import message_from_bytes
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.reply("220 fake-smtp ready")
+        mail_from, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip()
+            verb = command[:4].upper()
+
+            if verb in ("HELO", "EHLO"):
+                self.reply("250 fake-smtp")
+            elif verb == "MAIL":
+                mail_from, recipients = command[10:].strip(), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command[8:].strip())
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = self._read_data()
+                if random.random() < self.server.fail_rate:
+                    self.reply("451 Simulated temporary failure")
+                    continue
+                self.server.messages.append((mail_from, recipients, data))
+                message = message_from_bytes(data)
+                print(f"[{len(self.server.messages)}] {mail_from} -> {', '.join(recipients)}: {message['Subject']}")
+                self.reply("250 OK: queued")
+            elif verb == "RSET":
+                mail_from, recipients = None, []
+                self.reply("250 OK")
+            elif verb == "NOOP":
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+    def _read_data(self):
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line in (b".\r\n", b".\n"):
+                break
+            # Undo dot-stuffing
+            lines.append(line[1:] if line.startswith(b"..") else line)
+        return b"".join(lines)
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, fail_rate=0.0):
+        super().__init__(address, SMTPHandler)
+        self.fail_rate = fail_rate
+        self.messages = []
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake SMTP server for local email testing.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=1025)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of messages rejected with 451.")
+    args = parser.parse_args()
+
+    with FakeSMTPServer((args.host, args.port), fail_rate=args.fail_rate) as server:
+        print(f"Fake SMTP server listening on {args.host}:{args.port}")
+        server.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Minimal in-memory stand-in for the Stripe API, used to benchmark batch
+payment-link generation without touching a real account.
+
+It implements just enough of the API for stripe_service: creating products,
+prices and payment links, and listing checkout sessions for the reconciliation
+job (preloaded with --sessions, e.g. a fixture written by devtools.stripe_payloads).
+An optional artificial latency and a per-second request limit (answered with
+429, like Stripe) make throttling behaviour visible.
+
+    python -m devtools.fake_stripe_server --port 12111 --latency 0.15 --rate-limit 25
+
+Then point the backend at it:
+
+    STRIPE_SECRET_KEY=sk_test_fake STRIPE_API_BASE=http://localhost:12111 flask run
+"""
+import argparse
+import json
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+class FakeStripeState:
+    """Objects created so far plus the request counters used for rate limiting."""
+
+    def __init__(self, latency=0.0, rate_limit=0):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.lock = threading.Lock()
+        self.objects = {"product": {}, "price": {}, "payment_link": {}, "checkout.session": {}}
+        self.window_start = time.monotonic()
+        self.window_count = 0
+        self.total_requests = 0
+        self.rejected_requests = 0
+
+    def admit(self):
+        """Returns False when the per-second request limit is exceeded."""
+        with self.lock:
+            self.total_requests += 1
+            now = time.monotonic()
+            if now - self.window_start >= 1:
+                self.window_start = now
+                self.window_count = 0
+            self.window_count += 1
+            if self.rate_limit and self.window_count > self.rate_limit:
+                self.rejected_requests += 1
+                return False
+            return True
+
+    def create(self, object_type, prefix, fields):
+        obj = {"id": f"{prefix}_{secrets.token_hex(12)}", "object": object_type, "created": int(time.time()),
+               "livemode": False, **fields}
+        with self.lock:
+            self.objects[object_type][obj["id"]] = obj
+        return obj
+
+    def load_sessions(self, path):
+        """Preloads checkout sessions from a JSON fixture (same format as the reconciliation fixture source)."""
+        with open(path) as f:
+            data = json.load(f)
+        for session in data.get("data", []) if isinstance(data, dict) else data:
+            self.objects["checkout.session"][session["id"]] = session
+
+    def list_sessions(self, params, url):
+        """Mimics GET /v1/checkout/sessions: newest first, created[gte] / status filters, cursor pagination."""
+        created = params.get("created", {})
+        limit = min(int(params.get("limit", 10)), 100)
+        with self.lock:
+            sessions = sorted(self.objects["checkout.session"].values(), key=lambda s: s.get("created", 0), reverse=True)
+        if "gte" in created:
+            sessions = [s for s in sessions if s.get("created", 0) >= int(created["gte"])]
+        if "status" in params:
+            sessions = [s for s in sessions if s.get("status") == params["status"]]
+        if "starting_after" in params:
+            ids = [s["id"] for s in sessions]
+            if params["starting_after"] in ids:
+                sessions = sessions[ids.index(params["starting_after"]) + 1:]
+        return {"object": "list", "data": sessions[:limit], "has_more": len(sessions) > limit, "url": url}
+
+def parse_form(body):
+    """Decodes Stripe's form encoding (metadata[key]=v, line_items[0][price]=...) into nested dicts/lists."""
+    result = {}
+    for key, value in parse_qsl(body, keep_blank_values=True):
+        parts = key.replace("]", "").split("[")
+        target = result
+        for part, next_part in zip(parts, parts[1:]):
+            default = [] if next_part.isdigit() else {}
+            if isinstance(target, list):
+                index = int(part)
+                while len(target) <= index:
+                    target.append(default)
+                target = target[index]
+            else:
+                target = target.setdefault(part, default)
+        last = parts[-1]
+        if isinstance(target, list):
+            target.append(value)
+        else:
+            target[last] = value
+    return result
+
+def make_handler(state):
+    class FakeStripeHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _admit(self):
+            if state.latency:
+                time.sleep(state.latency)
+            if not state.admit():
+                self._send(429, {"error": {"type": "rate_limit_error", "message": "Too many requests"}})
+                return False
+            return True
+
+        def do_POST(self):
+            if not self._admit():
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            fields = parse_form(self.rfile.read(length).decode())
+            path = urlparse(self.path).path
+
+            if path == "/v1/products":
+                self._send(200, state.create("product", "prod", {"active": True, **fields}))
+            elif path == "/v1/prices":
+                fields["unit_amount"] = int(fields.get("unit_amount", 0))
+                self._send(200, state.create("price", "price", {"active": True, **fields}))
+            elif path == "/v1/payment_links":
+                link = state.create("payment_link", "plink", {"active": True, **fields})
+                link["url"] = f"https://buy.stripe.test/{link['id']}"
+                self._send(200, link)
+            else:
+                self._send(404, {"error": {"type": "invalid_request_error", "message": f"Unknown path {path}"}})
+
+        def do_GET(self):
+            if not self._admit():
+                return
+            path = urlparse(self.path).path
+            if path == "/v1/checkout/sessions":
+                self._send(200, state.list_sessions(parse_form(urlparse(self.path).query), path))
+            elif path == "/stats":
+                self._send(200, {"requests": state.total_requests, "rejected": state.rejected_requests,
+                                 "objects": {k: len(v) for k, v in state.objects.items()}})
+            else:
+                self._send(404, {"error": {"type": "invalid_request_error", "message": f"Unknown path {path}"}})
+
+    return FakeStripeHandler
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake Stripe API for local benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=12111)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request.")
+    parser.add_argument("--rate-limit", type=int, default=0, help="Requests per second before answering 429 (0 = unlimited).")
+    parser.add_argument("--sessions", help="JSON file of checkout sessions served by GET /v1/checkout/sessions.")
+    args = parser.parse_args()
+
+    state = FakeStripeState(args.latency, args.rate_limit)
+    if args.sessions:
+        state.load_sessions(args.sessions)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    print(f"Fake Stripe API listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Handled {state.total_requests} requests ({state.rejected_requests} rejected with 429)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Generates Stripe-signed webhook payloads for local testing and load benchmarks.
+
+Signatures follow Stripe's scheme (`t=<timestamp>,v1=<HMAC-SHA256(secret, "t.payload")>`),
+so the payloads pass `stripe.Webhook.construct_event` with the same secret.
+
+    # Print one signed checkout.session.completed event
+    python -m devtools.stripe_payloads --invoice-id <id> --secret whsec_test
+
+    # Write a checkout-session fixture for `flask reconcile-payments --fixture`
+    python -m devtools.stripe_payloads --invoice-id <id> --invoice-id <id2> --secret whsec_test \\
+        --write-fixture sessions.json
+
+    # Post 500 events (20% redeliveries) to a running server with 8 threads
+    python -m devtools.stripe_payloads --invoice-id <id> --secret whsec_test \\
+        --url http://localhost:5000/api/payments/webhook --count 500 --duplicates 0.2 --concurrency 8
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import random
+import secrets
+import statistics
+import time
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+from utils.currency import to_minor_units
+
+def sign_payload(payload, secret, timestamp=None):
+    """Returns the Stripe-Signature header value for a raw payload (bytes or str)."""
+    if isinstance(payload, bytes):
+        payload = payload.decode()
+    timestamp = int(timestamp or time.time())
+    signed = f"{timestamp}.{payload}".encode()
+    signature = hmac.new(secret.encode(), signed, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+def build_checkout_session(invoice_id, amount=100.0, currency="usd", session_id=None, created=None, payment_link=None):
+    """Builds a completed checkout.session object like the ones Stripe creates for payment links."""
+    created = int(created or time.time())
+    return {
+        "id": session_id or f"cs_test_{secrets.token_hex(12)}",
+        "object": "checkout.session",
+        "amount_total": to_minor_units(amount, currency),
+        "currency": currency,
+        "created": created,
+        "metadata": {"invoice_id": str(invoice_id)} if invoice_id else {},
+        "mode": "payment",
+        "payment_intent": f"pi_test_{secrets.token_hex(12)}",
+        "payment_link": payment_link,
+        "payment_method_types": ["card"],
+        "payment_status": "paid",
+        "status": "complete",
+    }
+
+def build_checkout_session_completed(invoice_id, amount=100.0, currency="usd", event_id=None, session_id=None, created=None):
+    """Builds a checkout.session.completed event shaped like the ones Stripe sends for payment links."""
+    session = build_checkout_session(invoice_id, amount, currency, session_id, created)
+    return {
+        "id": event_id or f"evt_test_{secrets.token_hex(12)}",
+        "object": "event",
+        "api_version": "2024-04-10",
+        "created": session["created"],
+        "livemode": False,
+        "type": "checkout.session.completed",
+        "data": {"object": session},
+    }
+
+def build_signed_request(event, secret, timestamp=None):
+    """Returns (body_bytes, headers) ready to POST to the webhook endpoint."""
+    body = json.dumps(event, separators=(",", ":")).encode()
+    headers = {"Content-Type": "application/json", "Stripe-Signature": sign_payload(body, secret, timestamp)}
+    return body, headers
+
+def post_event(url, event, secret):
+    """POSTs one signed event and returns (status_code, elapsed_seconds)."""
+    body, headers = build_signed_request(event, secret)
+    req = urllib.request.Request(url, data=body, headers=headers, method="POST")
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=30) as response:
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return status, time.perf_counter() - started
+
+def run_load(url, secret, invoice_ids, count, duplicates, concurrency, amount=100.0, currency="usd"):
+    """Sends `count` events, re-sending earlier events with probability `duplicates`."""
+    sent = []
+    events = []
+    for _ in range(count):
+        if sent and random.random() < duplicates:
+            events.append(random.choice(sent))
+        else:
+            event = build_checkout_session_completed(random.choice(invoice_ids), amount, currency)
+            sent.append(event)
+            events.append(event)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda e: post_event(url, e, secret), events))
+    total = time.perf_counter() - started
+
+    latencies = sorted(elapsed for _, elapsed in results)
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    print(f"Sent {count} events ({len(sent)} unique) in {total:.2f}s ({count / total:.1f} req/s)")
+    print(f"Status codes: {statuses}")
+    print(f"Latency p50={statistics.median(latencies) * 1000:.1f}ms "
+          f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f}ms max={latencies[-1] * 1000:.1f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate or send signed Stripe webhook payloads.")
+    parser.add_argument("--invoice-id", action="append", required=True, help="Invoice ID for metadata (repeatable).")
+    parser.add_argument("--secret", required=True, help="Webhook signing secret (STRIPE_WEBHOOK_SECRET).")
+    parser.add_argument("--amount", type=float, default=100.0)
+    parser.add_argument("--currency", default="usd")
+    parser.add_argument("--url", help="Webhook URL; when omitted, the signed payload is printed.")
+    parser.add_argument("--count", type=int, default=1)
+    parser.add_argument("--duplicates", type=float, default=0.0, help="Fraction of redelivered events.")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--write-fixture", metavar="PATH",
+                        help="Write one completed checkout session per invoice ID to PATH (reconciliation fixture) and exit.")
+    args = parser.parse_args()
+
+    if args.write_fixture:
+        sessions = [build_checkout_session(invoice_id, args.amount, args.currency) for invoice_id in args.invoice_id]
+        with open(args.write_fixture, "w") as f:
+            json.dump(sessions, f, indent=2)
+        print(f"Wrote {len(sessions)} checkout sessions to {args.write_fixture}")
+        return
+
+    if not args.url:
+        event = build_checkout_session_completed(args.invoice_id[0], args.amount, args.currency)
+        body, headers = build_signed_request(event, args.secret)
+        print(f"Stripe-Signature: {headers['Stripe-Signature']}")
+        print(body.decode())
+        return
+
+    run_load(args.url, args.secret, args.invoice_id, args.count, args.duplicates, args.concurrency, args.amount, args.currency)
+
+if __name__ == "__main__":
+    main()
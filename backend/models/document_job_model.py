@@ -0,0 +1,82 @@
+from bson.objectid import ObjectId
+from datetime import datetime
+
+class DocumentJobItem:
+    def __init__(self, client_id, project_id=None, status='queued', document_id=None, error=None, finished_at=None):
+        self.client_id = ObjectId(client_id)
+        self.project_id = ObjectId(project_id) if project_id else None
+        self.status = status # queued, drafting, rendering, done, failed
+        self.document_id = ObjectId(document_id) if document_id else None
+        self.error = error
+        self.finished_at = finished_at
+
+    def to_dict(self):
+        return {
+            "client_id": str(self.client_id),
+            "project_id": str(self.project_id) if self.project_id else None,
+            "status": self.status,
+            "document_id": str(self.document_id) if self.document_id else None,
+            "error": self.error,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    @staticmethod
+    def from_dict(data):
+        return DocumentJobItem(
+            client_id=data.get('client_id'),
+            project_id=data.get('project_id'),
+            status=data.get('status', 'queued'),
+            document_id=data.get('document_id'),
+            error=data.get('error'),
+            finished_at=data.get('finished_at')
+        )
+
+class DocumentJob:
+    def __init__(self, user_id, doc_type, title, custom_details, items, status='queued', counts=None, started_at=None, finished_at=None, created_at=None, updated_at=None, _id=None):
+        self._id = _id if _id else ObjectId()
+        self.user_id = ObjectId(user_id)
+        self.doc_type = doc_type
+        self.title = title # Each document is titled "<title> - <client name>"
+        self.custom_details = custom_details
+        self.items = [DocumentJobItem.from_dict(item) if isinstance(item, dict) else item for item in items]
+        self.status = status # queued, running, completed, completed_with_errors
+        self.counts = counts if counts else {"done": 0, "failed": 0}
+        self.started_at = started_at
+        self.finished_at = finished_at
+        self.created_at = created_at if created_at else datetime.utcnow()
+        self.updated_at = updated_at if updated_at else datetime.utcnow()
+
+    def to_dict(self):
+        return {
+            "_id": str(self._id),
+            "user_id": str(self.user_id),
+            "doc_type": self.doc_type,
+            "title": self.title,
+            "custom_details": self.custom_details,
+            "status": self.status,
+            "total": len(self.items),
+            "done": self.counts.get('done', 0),
+            "failed": self.counts.get('failed', 0),
+            "items": [item.to_dict() for item in self.items],
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+        }
+
+    @staticmethod
+    def from_dict(data):
+        return DocumentJob(
+            _id=data.get('_id'),
+            user_id=data.get('user_id'),
+            doc_type=data.get('doc_type'),
+            title=data.get('title'),
+            custom_details=data.get('custom_details'),
+            items=data.get('items', []),
+            status=data.get('status', 'queued'),
+            counts=data.get('counts'),
+            started_at=data.get('started_at'),
+            finished_at=data.get('finished_at'),
+            created_at=data.get('created_at'),
+            updated_at=data.get('updated_at')
+        )
@@ -1,20 +1,74 @@
+import re
 from bson.objectid import ObjectId
 from datetime import datetime
+from utils.compression import compress_text, decompress_text, is_compressed
+
+EXCERPT_LENGTH = 200
+MAX_CONTENT_TERMS = 5000
+
+# Markdown syntax that would only be noise in a one-line preview
+_MARKDOWN_NOISE = re.compile(r"^\s*\|?\s*:?-{3,}.*$|^\s{0,3}(#{1,6}|[-*+]|\d+[.)]|>)\s+|[*_`~|]+", re.MULTILINE)
+_LINK = re.compile(r"\[([^\]]+)\]\([^)]*\)")
+
+def make_excerpt(content, length=EXCERPT_LENGTH):
+    """Plain-text preview of the start of a document, cut at a word boundary."""
+    text = _MARKDOWN_NOISE.sub(" ", _LINK.sub(r"\1", content or ""))
+    text = " ".join(text.split())
+    if len(text) <= length:
+        return text
+    cut = text[:length]
+    return (cut[:cut.rindex(" ")] if " " in cut else cut) + "…"
+
+_TERM = re.compile(r"\w{2,}", re.UNICODE)
+
+def make_content_terms(content):
+    """Distinct words of the content, in order. The search index reads these when the content is compressed."""
+    terms = dict.fromkeys(term.lower() for term in _TERM.findall(content or ""))
+    return " ".join(list(terms)[:MAX_CONTENT_TERMS])
 
 class Document:
-    def __init__(self, user_id, client_id, project_id, doc_type, title, content, pdf_url=None, created_at=None, updated_at=None, _id=None):
+    # Everything but the full text; list views use this with to_summary_dict()
+    SUMMARY_PROJECTION = {"content": 0, "content_terms": 0}
+
+    def __init__(self, user_id, client_id, project_id, doc_type, title, content, pdf_url=None, pdf_status=None, revision=1, content_source='ai_draft', excerpt=None, created_at=None, updated_at=None, _id=None):
         self._id = _id if _id else ObjectId()
         self.user_id = ObjectId(user_id)
         self.client_id = ObjectId(client_id)
         self.project_id = ObjectId(project_id) if project_id else None
         self.doc_type = doc_type # Project Proposal, Contract Agreement, Invoice, Business Letter, Price Quote, Project Report
         self.title = title
-        self.content = content # AI drafted text
+        self.content = content # AI drafted text (stored compressed when large, see content_fields)
+        self.excerpt = excerpt if excerpt is not None else make_excerpt(self.content) # Stored so lists never load content
         self.pdf_url = pdf_url # Cloudinary URL
+        self.pdf_status = pdf_status # None (rendered inline), 'pending', 'ready' or 'failed' when rendered in the background
+        self.revision = revision # Number of the current content; earlier ones live in document_revisions
+        self.content_source = content_source # How the current content was produced: ai_draft, edit, regenerate
         self.created_at = created_at if created_at else datetime.utcnow()
         self.updated_at = updated_at if updated_at else datetime.utcnow()
 
-    def to_dict(self):
+    @property
+    def content(self):
+        # Loaded content may still be in its stored (compressed) form; it is decoded on first access
+        if is_compressed(self._content):
+            self._content = decompress_text(self._content)
+        return self._content
+
+    @content.setter
+    def content(self, value):
+        self._content = value
+
+    @staticmethod
+    def content_fields(content):
+        """The stored fields for `content`: the text (compressed when large) and, if compressed, its search terms."""
+        stored = compress_text(content)
+        return {"content": stored, "content_terms": make_content_terms(content) if is_compressed(stored) else None}
+
+    def to_mongo(self):
+        data = {k: v for k, v in self.__dict__.items() if k != '_content'}
+        data.update(Document.content_fields(self.content))
+        return data
+
+    def to_summary_dict(self):
         return {
             "_id": str(self._id),
             "user_id": str(self.user_id),
@@ -22,12 +76,18 @@ class Document:
             "project_id": str(self.project_id) if self.project_id else None,
             "doc_type": self.doc_type,
             "title": self.title,
-            "content": self.content,
+            "excerpt": self.excerpt,
             "pdf_url": self.pdf_url,
+            "pdf_status": self.pdf_status,
+            "revision": self.revision,
+            "content_source": self.content_source,
             "created_at": self.created_at.isoformat(),
             "updated_at": self.updated_at.isoformat(),
         }
 
+    def to_dict(self):
+        return {**self.to_summary_dict(), "content": self.content}
+
     @staticmethod
     def from_dict(data):
         return Document(
@@ -39,6 +99,10 @@ class Document:
             title=data.get('title'),
             content=data.get('content'),
             pdf_url=data.get('pdf_url'),
+            pdf_status=data.get('pdf_status'),
+            revision=data.get('revision', 1),
+            content_source=data.get('content_source', 'ai_draft'),
+            excerpt=data.get('excerpt'),
             created_at=data.get('created_at'),
             updated_at=data.get('updated_at')
         )
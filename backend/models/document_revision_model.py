@@ -0,0 +1,43 @@
+from bson.objectid import ObjectId
+from datetime import datetime
+
+class DocumentRevision:
+    def __init__(self, document_id, user_id, revision, kind, data, source, size, content_length, created_at=None, _id=None):
+        self._id = _id if _id else ObjectId()
+        self.document_id = ObjectId(document_id)
+        self.user_id = ObjectId(user_id)
+        self.revision = revision # The version of the content this row reconstructs
+        self.kind = kind # 'snapshot' (full text) or 'delta' (reverse delta from revision + 1)
+        self.data = data # zlib-compressed payload (BSON Binary)
+        self.source = source # How this version was produced: ai_draft, edit, regenerate
+        self.size = size # Stored bytes, for reporting
+        self.content_length = content_length # Characters in the reconstructed text
+        self.created_at = created_at if created_at else datetime.utcnow()
+
+    def to_dict(self):
+        # The payload is internal; API responses carry reconstructed text instead
+        return {
+            "_id": str(self._id),
+            "document_id": str(self.document_id),
+            "revision": self.revision,
+            "kind": self.kind,
+            "source": self.source,
+            "size": self.size,
+            "content_length": self.content_length,
+            "created_at": self.created_at.isoformat(),
+        }
+
+    @staticmethod
+    def from_dict(data):
+        return DocumentRevision(
+            _id=data.get('_id'),
+            document_id=data.get('document_id'),
+            user_id=data.get('user_id'),
+            revision=data.get('revision'),
+            kind=data.get('kind'),
+            data=data.get('data'),
+            source=data.get('source'),
+            size=data.get('size'),
+            content_length=data.get('content_length'),
+            created_at=data.get('created_at')
+        )
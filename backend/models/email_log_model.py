@@ -2,7 +2,7 @@ from bson.objectid import ObjectId
 from datetime import datetime
 
 class EmailLog:
-    def __init__(self, user_id, recipient, subject, body_preview, status, related_invoice_id=None, created_at=None, _id=None):
+    def __init__(self, user_id, recipient, subject, body_preview, status, related_invoice_id=None, outbox_id=None, attempt=1, error=None, created_at=None, _id=None):
         self._id = _id if _id else ObjectId()
         self.user_id = ObjectId(user_id)
         self.recipient = recipient
@@ -10,6 +10,9 @@ class EmailLog:
         self.body_preview = body_preview
         self.status = status # e.g., 'Sent', 'Failed'
         self.related_invoice_id = related_invoice_id
+        self.outbox_id = outbox_id # email_outbox entry this attempt belongs to
+        self.attempt = attempt
+        self.error = error
         self.created_at = created_at if created_at else datetime.utcnow()
 
     def to_dict(self):
@@ -21,6 +24,9 @@ class EmailLog:
             "body_preview": self.body_preview,
             "status": self.status,
             "related_invoice_id": str(self.related_invoice_id) if self.related_invoice_id else None,
+            "outbox_id": str(self.outbox_id) if self.outbox_id else None,
+            "attempt": self.attempt,
+            "error": self.error,
             "created_at": self.created_at.isoformat(),
         }
 
@@ -34,5 +40,8 @@ class EmailLog:
             body_preview=data.get('body_preview'),
             status=data.get('status'),
             related_invoice_id=data.get('related_invoice_id'),
+            outbox_id=data.get('outbox_id'),
+            attempt=data.get('attempt', 1),
+            error=data.get('error'),
             created_at=data.get('created_at')
         )
@@ -0,0 +1,60 @@
+from bson.objectid import ObjectId
+from datetime import datetime
+
+class OutboxEmail:
+    def __init__(self, user_id, recipient, subject, body, category, related_invoice_id=None, status='Pending', attempts=0, next_attempt_at=None, locked_at=None, last_error=None, message_id=None, sent_at=None, created_at=None, updated_at=None, _id=None):
+        self._id = _id if _id else ObjectId()
+        self.user_id = ObjectId(user_id)
+        self.recipient = recipient
+        self.subject = subject
+        self.body = body
+        self.category = category # e.g., 'invoice', 'overdue_reminder'
+        self.related_invoice_id = ObjectId(related_invoice_id) if related_invoice_id else None
+        self.status = status # Pending, Sending, Sent, Failed
+        self.attempts = attempts
+        self.next_attempt_at = next_attempt_at if next_attempt_at else datetime.utcnow()
+        self.locked_at = locked_at # Set while a sender worker holds the message
+        self.last_error = last_error
+        self.message_id = message_id # Provider message ID once delivered
+        self.sent_at = sent_at
+        self.created_at = created_at if created_at else datetime.utcnow()
+        self.updated_at = updated_at if updated_at else datetime.utcnow()
+
+    def to_dict(self):
+        return {
+            "_id": str(self._id),
+            "user_id": str(self.user_id),
+            "recipient": self.recipient,
+            "subject": self.subject,
+            "category": self.category,
+            "related_invoice_id": str(self.related_invoice_id) if self.related_invoice_id else None,
+            "status": self.status,
+            "attempts": self.attempts,
+            "next_attempt_at": self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            "last_error": self.last_error,
+            "message_id": self.message_id,
+            "sent_at": self.sent_at.isoformat() if self.sent_at else None,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+        }
+
+    @staticmethod
+    def from_dict(data):
+        return OutboxEmail(
+            _id=data.get('_id'),
+            user_id=data.get('user_id'),
+            recipient=data.get('recipient'),
+            subject=data.get('subject'),
+            body=data.get('body'),
+            category=data.get('category'),
+            related_invoice_id=data.get('related_invoice_id'),
+            status=data.get('status', 'Pending'),
+            attempts=data.get('attempts', 0),
+            next_attempt_at=data.get('next_attempt_at'),
+            locked_at=data.get('locked_at'),
+            last_error=data.get('last_error'),
+            message_id=data.get('message_id'),
+            sent_at=data.get('sent_at'),
+            created_at=data.get('created_at'),
+            updated_at=data.get('updated_at')
+        )
@@ -1,13 +1,17 @@
 from bson.objectid import ObjectId
 from datetime import datetime
+from utils.date_utils import parse_datetime, parse_stored_datetime, format_datetime
 
 class Event:
+    # Fields stored as native BSON dates
+    DATE_FIELDS = ('start_time', 'end_time')
+
     def __init__(self, user_id, title, start_time, end_time, description=None, location=None, google_event_id=None, created_at=None, updated_at=None, _id=None):
         self._id = _id if _id else ObjectId()
         self.user_id = ObjectId(user_id)
         self.title = title
-        self.start_time = start_time # ISO format string or datetime object
-        self.end_time = end_time # ISO format string or datetime object
+        self.start_time = parse_datetime(start_time) # Stored as a BSON date (UTC)
+        self.end_time = parse_datetime(end_time) # Stored as a BSON date (UTC)
         self.description = description
         self.location = location
         self.google_event_id = google_event_id # Google Calendar Event ID
@@ -19,8 +23,8 @@ class Event:
             "_id": str(self._id),
             "user_id": str(self.user_id),
             "title": self.title,
-            "start_time": self.start_time,
-            "end_time": self.end_time,
+            "start_time": format_datetime(self.start_time),
+            "end_time": format_datetime(self.end_time),
             "description": self.description,
             "location": self.location,
             "google_event_id": self.google_event_id,
@@ -34,8 +38,8 @@ class Event:
             _id=data.get('_id'),
             user_id=data.get('user_id'),
             title=data.get('title'),
-            start_time=data.get('start_time'),
-            end_time=data.get('end_time'),
+            start_time=parse_stored_datetime(data.get('start_time')),
+            end_time=parse_stored_datetime(data.get('end_time')),
             description=data.get('description'),
             location=data.get('location'),
             google_event_id=data.get('google_event_id'),
@@ -0,0 +1,77 @@
+from pymongo import ASCENDING, DESCENDING
+from models.invoice_model import REMINDER_EPOCH
+from models.search_scopes import ensure_search_indexes
+
+def ensure_indexes(db):
+    """
+    Creates the indexes the controllers and jobs rely on.
+    create_index is idempotent, so this is safe to run on every startup.
+    """
+    # Date fields are stored as BSON dates, so range queries and sorts use these indexes
+    db.invoices.create_index([("user_id", ASCENDING), ("issue_date", DESCENDING)])
+    db.invoices.create_index([("status", ASCENDING), ("due_date", ASCENDING)])
+    db.invoices.create_index([("project_id", ASCENDING), ("issue_date", DESCENDING)])
+    db.invoices.create_index([("client_id", ASCENDING), ("issue_date", DESCENDING)])
+    db.projects.create_index([("user_id", ASCENDING), ("start_date", DESCENDING)])
+    db.projects.create_index([("client_id", ASCENDING), ("start_date", DESCENDING)])
+    # Only invoices with a pending reminder are indexed; the reminder job is a range scan on it
+    db.invoices.create_index(
+        [("next_reminder_at", ASCENDING)],
+        name="next_reminder_at_pending",
+        partialFilterExpression={"next_reminder_at": {"$gt": REMINDER_EPOCH}}
+    )
+    db.milestones.create_index([("project_id", ASCENDING), ("due_date", ASCENDING)])
+    db.documents.create_index([("project_id", ASCENDING), ("created_at", DESCENDING)])
+    db.events.create_index([("user_id", ASCENDING), ("start_time", ASCENDING)])
+    # Only documents whose PDF is still pending are indexed; the PDF requeue sweep scans it
+    db.documents.create_index(
+        [("pdf_queued_at", ASCENDING)],
+        name="pdf_queued_at_pending",
+        partialFilterExpression={"pdf_status": "pending"}
+    )
+
+    # Reusable Stripe catalog objects (one Product per user, one Price per currency/amount)
+    db.stripe_products.create_index([("user_id", ASCENDING), ("mode", ASCENDING)], unique=True)
+    db.stripe_prices.create_index(
+        [("user_id", ASCENDING), ("currency", ASCENDING), ("unit_amount", ASCENDING), ("mode", ASCENDING)],
+        unique=True
+    )
+
+    # Stripe webhook events: the unique index deduplicates redeliveries
+    db.stripe_events.create_index([("event_id", ASCENDING)], unique=True)
+    db.stripe_events.create_index([("status", ASCENDING), ("received_at", ASCENDING)])
+
+    # Payments ledger: history and revenue reports are range scans on paid_at per user
+    db.payments.create_index([("user_id", ASCENDING), ("paid_at", DESCENDING)])
+    db.payments.create_index([("invoice_id", ASCENDING)])
+    db.payments.create_index(
+        [("source", ASCENDING), ("reference", ASCENDING)],
+        unique=True,
+        partialFilterExpression={"reference": {"$type": "string"}}
+    )
+
+    # Document revisions: one row per archived version; the unique index rejects concurrent saves
+    db.document_revisions.create_index([("document_id", ASCENDING), ("revision", DESCENDING)], unique=True)
+
+    # Batch document jobs, listed newest first per user
+    db.document_jobs.create_index([("user_id", ASCENDING), ("created_at", DESCENDING)])
+    # Recovery sweep for jobs lost in a restart
+    db.document_jobs.create_index([("status", ASCENDING), ("updated_at", ASCENDING)])
+
+    # Stored files, one per content hash and backend
+    db.assets.create_index([("sha256", ASCENDING), ("backend", ASCENDING)], unique=True)
+    db.assets.create_index("refs") # Releasing an owner's assets
+    db.assets.create_index("orphaned_at", sparse=True) # Asset GC scan
+    db.assets.create_index("url") # PDF downloads look assets up by the record's pdf_url
+
+    # Full-text search: one user_id-prefixed text index per searchable collection
+    ensure_search_indexes(db)
+
+    # LLM response cache: expired entries are removed by MongoDB, size eviction is LRU on last_used_at
+    db.llm_cache.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+    db.llm_cache.create_index([("last_used_at", ASCENDING)])
+
+    # Email outbox: the sender claims due messages in next_attempt_at order
+    db.email_outbox.create_index([("status", ASCENDING), ("next_attempt_at", ASCENDING)])
+    db.email_logs.create_index([("status", ASCENDING), ("created_at", DESCENDING)])
+    db.email_logs.create_index([("user_id", ASCENDING), ("created_at", DESCENDING)])
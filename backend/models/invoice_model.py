@@ -1,5 +1,10 @@
 from bson.objectid import ObjectId
 from datetime import datetime
+from utils.date_utils import parse_datetime, parse_stored_datetime, format_date
+
+# The next_reminder_at index is partial on values greater than this, so the
+# reminder query only ever touches invoices that actually have a pending reminder.
+REMINDER_EPOCH = datetime(1970, 1, 1)
 
 class InvoiceItem:
     def __init__(self, description, quantity, unit_price, created_at=None, _id=None):
@@ -30,14 +35,17 @@ class InvoiceItem:
         )
 
 class Invoice:
-    def __init__(self, user_id, client_id, project_id, invoice_number, issue_date, due_date, status, total_amount, currency, items, pdf_url=None, stripe_payment_link=None, stripe_session_id=None, created_at=None, updated_at=None, _id=None):
+    # Fields stored as native BSON dates
+    DATE_FIELDS = ('issue_date', 'due_date')
+
+    def __init__(self, user_id, client_id, project_id, invoice_number, issue_date, due_date, status, total_amount, currency, items, pdf_url=None, stripe_payment_link=None, stripe_session_id=None, next_reminder_at=None, reminders_sent=0, created_at=None, updated_at=None, _id=None):
         self._id = _id if _id else ObjectId()
         self.user_id = ObjectId(user_id)
         self.client_id = ObjectId(client_id)
         self.project_id = ObjectId(project_id) if project_id else None
         self.invoice_number = invoice_number
-        self.issue_date = issue_date # ISO format string or datetime object
-        self.due_date = due_date # ISO format string or datetime object
+        self.issue_date = parse_datetime(issue_date) # Stored as a BSON date
+        self.due_date = parse_datetime(due_date) # Stored as a BSON date
         self.status = status # Draft, Sent, Viewed, Paid, Overdue
         self.total_amount = total_amount
         self.currency = currency
@@ -45,6 +53,8 @@ class Invoice:
         self.pdf_url = pdf_url
         self.stripe_payment_link = stripe_payment_link
         self.stripe_session_id = stripe_session_id
+        self.next_reminder_at = next_reminder_at # When the next overdue reminder is due (None if none pending)
+        self.reminders_sent = reminders_sent
         self.created_at = created_at if created_at else datetime.utcnow()
         self.updated_at = updated_at if updated_at else datetime.utcnow()
 
@@ -55,8 +65,8 @@ class Invoice:
             "client_id": str(self.client_id),
             "project_id": str(self.project_id) if self.project_id else None,
             "invoice_number": self.invoice_number,
-            "issue_date": self.issue_date,
-            "due_date": self.due_date,
+            "issue_date": format_date(self.issue_date),
+            "due_date": format_date(self.due_date),
             "status": self.status,
             "total_amount": self.total_amount,
             "currency": self.currency,
@@ -64,6 +74,8 @@ class Invoice:
             "pdf_url": self.pdf_url,
             "stripe_payment_link": self.stripe_payment_link,
             "stripe_session_id": self.stripe_session_id,
+            "next_reminder_at": self.next_reminder_at.isoformat() if self.next_reminder_at else None,
+            "reminders_sent": self.reminders_sent,
             "created_at": self.created_at.isoformat(),
             "updated_at": self.updated_at.isoformat(),
         }
@@ -76,8 +88,8 @@ class Invoice:
             client_id=data.get('client_id'),
             project_id=data.get('project_id'),
             invoice_number=data.get('invoice_number'),
-            issue_date=data.get('issue_date'),
-            due_date=data.get('due_date'),
+            issue_date=parse_stored_datetime(data.get('issue_date')),
+            due_date=parse_stored_datetime(data.get('due_date')),
             status=data.get('status'),
             total_amount=data.get('total_amount'),
             currency=data.get('currency'),
@@ -85,6 +97,8 @@ class Invoice:
             pdf_url=data.get('pdf_url'),
             stripe_payment_link=data.get('stripe_payment_link'),
             stripe_session_id=data.get('stripe_session_id'),
+            next_reminder_at=data.get('next_reminder_at'),
+            reminders_sent=data.get('reminders_sent', 0),
             created_at=data.get('created_at'),
             updated_at=data.get('updated_at')
         )
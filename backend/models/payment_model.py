@@ -0,0 +1,53 @@
+from bson.objectid import ObjectId
+from datetime import datetime
+
+class Payment:
+    def __init__(self, user_id, invoice_id, amount, currency, method, source, reference=None, fee=None, invoice_number=None, client_id=None, paid_at=None, created_at=None, _id=None):
+        self._id = _id if _id else ObjectId()
+        self.user_id = ObjectId(user_id)
+        self.invoice_id = ObjectId(invoice_id)
+        self.amount = amount # In major units (e.g., 125.50), like invoice totals
+        self.currency = currency
+        self.method = method # e.g., 'card', 'bank_transfer', 'manual'
+        self.source = source # stripe, manual, backfill
+        self.reference = reference # Provider reference (e.g., Stripe checkout session ID), unique per source
+        self.fee = fee # Processing fee when known
+        self.invoice_number = invoice_number # Denormalized so history rows need no invoice lookup
+        self.client_id = ObjectId(client_id) if client_id else None
+        self.paid_at = paid_at if paid_at else datetime.utcnow()
+        self.created_at = created_at if created_at else datetime.utcnow()
+
+    def to_dict(self):
+        return {
+            "_id": str(self._id),
+            "user_id": str(self.user_id),
+            "invoice_id": str(self.invoice_id),
+            "invoice_number": self.invoice_number,
+            "client_id": str(self.client_id) if self.client_id else None,
+            "amount": self.amount,
+            "currency": self.currency,
+            "method": self.method,
+            "source": self.source,
+            "reference": self.reference,
+            "fee": self.fee,
+            "paid_at": self.paid_at.isoformat(),
+            "created_at": self.created_at.isoformat(),
+        }
+
+    @staticmethod
+    def from_dict(data):
+        return Payment(
+            _id=data.get('_id'),
+            user_id=data.get('user_id'),
+            invoice_id=data.get('invoice_id'),
+            amount=data.get('amount'),
+            currency=data.get('currency'),
+            method=data.get('method'),
+            source=data.get('source'),
+            reference=data.get('reference'),
+            fee=data.get('fee'),
+            invoice_number=data.get('invoice_number'),
+            client_id=data.get('client_id'),
+            paid_at=data.get('paid_at'),
+            created_at=data.get('created_at')
+        )
@@ -0,0 +1,58 @@
+"""
+The searchable collections and their text indexes. Each text index has
+user_id as its first key, so a search only walks the requesting user's
+entries; field weights are on the same scale in every index so hits from
+different collections can be merged by score (see services/search_service).
+"""
+from pymongo.errors import OperationFailure
+
+class SearchScope:
+    """One searchable collection: its text-indexed fields (with weights) and how a hit is presented."""
+
+    def __init__(self, kind, collection, weights, title_field, subtitle_fields, date_field="updated_at", snippet_fields=None):
+        self.kind = kind
+        self.collection = collection
+        self.weights = weights
+        self.title_field = title_field
+        self.subtitle_fields = subtitle_fields
+        self.date_field = date_field
+        # Fields a snippet may be cut from, in order of preference (default: lowest weight first)
+        self.snippet_fields = snippet_fields or tuple(sorted(weights, key=weights.get))
+
+    @property
+    def index_keys(self):
+        return [("user_id", 1)] + [(field, "text") for field in self.weights]
+
+    @property
+    def projection(self):
+        fields = {field.split(".")[0]: 1 for field in self.snippet_fields + (self.title_field,)}
+        fields.update({field: 1 for field in self.subtitle_fields})
+        fields[self.date_field] = 1
+        fields["score"] = {"$meta": "textScore"}
+        return fields
+
+SCOPES = {s.kind: s for s in (
+    # Compressed content is binary and not indexed; content_terms stands in for it (see Document.content_fields)
+    SearchScope("document", "documents", {"title": 10, "content": 1, "content_terms": 1}, "title", ("doc_type",),
+                snippet_fields=("content", "title")),
+    SearchScope("client", "clients", {"name": 10, "company": 6, "email": 6}, "name", ("company", "email")),
+    SearchScope("project", "projects", {"title": 10, "description": 2}, "title", ("status",)),
+    SearchScope("invoice", "invoices", {"invoice_number": 10, "items.description": 2}, "invoice_number",
+                ("status", "total_amount", "currency"), date_field="issue_date"),
+)}
+
+TEXT_INDEX_NAME = "search_text"
+INDEX_CONFLICT_CODES = (85, 86) # IndexOptionsConflict, IndexKeySpecsConflict
+
+def ensure_search_indexes(db):
+    for scope in SCOPES.values():
+        collection = db[scope.collection]
+        options = dict(name=TEXT_INDEX_NAME, weights=scope.weights, default_language="english")
+        try:
+            collection.create_index(scope.index_keys, **options)
+        except OperationFailure as e:
+            if e.code not in INDEX_CONFLICT_CODES:
+                raise
+            # A collection can only have one text index, so a changed field list replaces the old one
+            collection.drop_index(TEXT_INDEX_NAME)
+            collection.create_index(scope.index_keys, **options)
@@ -0,0 +1,48 @@
+from bson.objectid import ObjectId
+from datetime import datetime
+
+class StripeEvent:
+    def __init__(self, event_id, type, data_object, livemode=False, created=None, status='pending', attempts=0, last_error=None, locked_at=None, received_at=None, processed_at=None, _id=None):
+        self._id = _id if _id else ObjectId()
+        self.event_id = event_id # Stripe event ID (evt_...), unique
+        self.type = type # e.g., 'checkout.session.completed'
+        self.data_object = data_object # event['data']['object'] as received
+        self.livemode = livemode
+        self.created = created # When Stripe created the event, i.e. when it happened
+        self.status = status # pending, processing, processed, failed
+        self.attempts = attempts
+        self.last_error = last_error
+        self.locked_at = locked_at # Set while the processor holds the event
+        self.received_at = received_at if received_at else datetime.utcnow()
+        self.processed_at = processed_at
+
+    def to_dict(self):
+        return {
+            "_id": str(self._id),
+            "event_id": self.event_id,
+            "type": self.type,
+            "livemode": self.livemode,
+            "created": self.created.isoformat() if self.created else None,
+            "status": self.status,
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+            "received_at": self.received_at.isoformat(),
+            "processed_at": self.processed_at.isoformat() if self.processed_at else None,
+        }
+
+    @staticmethod
+    def from_dict(data):
+        return StripeEvent(
+            _id=data.get('_id'),
+            event_id=data.get('event_id'),
+            type=data.get('type'),
+            data_object=data.get('data_object'),
+            livemode=data.get('livemode', False),
+            created=data.get('created'),
+            status=data.get('status', 'pending'),
+            attempts=data.get('attempts', 0),
+            last_error=data.get('last_error'),
+            locked_at=data.get('locked_at'),
+            received_at=data.get('received_at'),
+            processed_at=data.get('processed_at')
+        )
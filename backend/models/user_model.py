@@ -2,7 +2,10 @@ from bson.objectid import ObjectId
 from datetime import datetime
 
 class User:
-    def __init__(self, email, password_hash, first_name, last_name, is_admin=False, business_settings=None, api_keys=None, notification_preferences=None, user_preferences=None, created_at=None, updated_at=None, _id=None):
+    # Days after the due date on which overdue reminder emails are sent
+    DEFAULT_REMINDER_SCHEDULE = [3, 7, 14]
+
+    def __init__(self, email, password_hash, first_name, last_name, is_admin=False, business_settings=None, api_keys=None, notification_preferences=None, user_preferences=None, reminder_schedule=None, created_at=None, updated_at=None, _id=None):
         self._id = _id if _id else ObjectId()
         self.email = email
         self.password_hash = password_hash
@@ -13,6 +16,7 @@ class User:
         self.api_keys = api_keys if api_keys is not None else self._default_api_keys()
         self.notification_preferences = notification_preferences if notification_preferences is not None else self._default_notification_preferences()
         self.user_preferences = user_preferences if user_preferences is not None else self._default_user_preferences()
+        self.reminder_schedule = reminder_schedule if reminder_schedule is not None else list(self.DEFAULT_REMINDER_SCHEDULE)
         self.created_at = created_at if created_at else datetime.utcnow()
         self.updated_at = updated_at if updated_at else datetime.utcnow()
 
@@ -27,6 +31,7 @@ class User:
             "api_keys": self.api_keys,
             "notification_preferences": self.notification_preferences,
             "user_preferences": self.user_preferences,
+            "reminder_schedule": self.reminder_schedule,
             "created_at": self.created_at.isoformat(),
             "updated_at": self.updated_at.isoformat(),
         }
@@ -44,6 +49,7 @@ class User:
             api_keys=data.get('api_keys'),
             notification_preferences=data.get('notification_preferences'),
             user_preferences=data.get('user_preferences'),
+            reminder_schedule=data.get('reminder_schedule'),
             created_at=data.get('created_at'),
             updated_at=data.get('updated_at')
         )
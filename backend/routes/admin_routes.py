@@ -10,7 +10,8 @@ from controllers.admin_controller import (
     delete_tool,
     toggle_tool_status,
     get_system_settings,
-    update_system_settings
+    update_system_settings,
+    get_cache_statistics
 )
 
 admin_bp = Blueprint('admin', __name__)
@@ -29,3 +30,6 @@ admin_bp.route('/tools/<tool_id>/toggle-status', methods=['PUT'])(toggle_tool_st
 admin_bp.route('/analytics', methods=['GET'])(get_admin_analytics)
 admin_bp.route('/settings', methods=['GET'])(get_system_settings)
 admin_bp.route('/settings', methods=['PUT'])(update_system_settings)
+
+# Diagnostics
+admin_bp.route('/cache-stats', methods=['GET'])(get_cache_statistics)
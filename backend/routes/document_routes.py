@@ -1,15 +1,33 @@
 from flask import Blueprint
 from controllers.document_controller import (
     create_document, 
+    stream_document,
     get_all_documents, 
     get_document_detail, 
-    delete_document
+    delete_document,
+    download_document_pdf,
+    update_document,
+    regenerate_document,
+    get_document_revisions,
+    get_document_revision,
+    create_document_batch,
+    get_document_batch
 )
 
 document_bp = Blueprint('documents', __name__)
 
 # Document CRUD Routes
 document_bp.route('/', methods=['POST'])(create_document) # This is the AI drafting + PDF generation route
+document_bp.route('/stream', methods=['POST'])(stream_document) # AI drafting streamed over SSE; PDF rendered in the background
+document_bp.route('/batch', methods=['POST'])(create_document_batch) # One doc type for many clients, run in the background
+document_bp.route('/batch/<job_id>', methods=['GET'])(get_document_batch)
 document_bp.route('/', methods=['GET'])(get_all_documents)
 document_bp.route('/<document_id>', methods=['GET'])(get_document_detail)
+document_bp.route('/<document_id>', methods=['PUT'])(update_document)
 document_bp.route('/<document_id>', methods=['DELETE'])(delete_document)
+document_bp.route('/<document_id>/pdf', methods=['GET'])(download_document_pdf) # ETag + Range aware
+
+# Revisions
+document_bp.route('/<document_id>/regenerate', methods=['POST'])(regenerate_document)
+document_bp.route('/<document_id>/revisions', methods=['GET'])(get_document_revisions)
+document_bp.route('/<document_id>/revisions/<int:revision>', methods=['GET'])(get_document_revision)
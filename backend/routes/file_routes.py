@@ -0,0 +1,7 @@
+from flask import Blueprint
+from controllers.file_controller import get_stored_file
+
+file_bp = Blueprint('files', __name__)
+
+# Files stored by the local storage backend (public, addressed by content hash)
+file_bp.route('/<path:key>', methods=['GET'])(get_stored_file)
@@ -6,7 +6,9 @@ from controllers.invoice_controller import (
     update_invoice, 
     delete_invoice,
     generate_and_upload_invoice_pdf,
+    download_invoice_pdf,
     create_and_attach_payment_link,
+    create_payment_links_batch,
     send_invoice
 )
 
@@ -21,5 +23,9 @@ invoice_bp.route('/<invoice_id>', methods=['DELETE'])(delete_invoice)
 
 # Invoice Action Routes
 invoice_bp.route('/<invoice_id>/generate-pdf', methods=['POST'])(generate_and_upload_invoice_pdf)
+invoice_bp.route('/<invoice_id>/pdf', methods=['GET'])(download_invoice_pdf) # ETag + Range aware
 invoice_bp.route('/<invoice_id>/create-payment-link', methods=['POST'])(create_and_attach_payment_link)
 invoice_bp.route('/<invoice_id>/send', methods=['POST'])(send_invoice)
+
+# Batch Actions
+invoice_bp.route('/payment-links/batch', methods=['POST'])(create_payment_links_batch)
@@ -1,7 +1,11 @@
 from flask import Blueprint
 from controllers.invoice_controller import get_payment_history
+from services.stripe_service import handle_stripe_webhook
 
 payment_bp = Blueprint('payments', __name__)
 
 # Payment History Route
 payment_bp.route('/', methods=['GET'])(get_payment_history)
+
+# Stripe Webhook (signature-verified, no JWT)
+payment_bp.route('/webhook', methods=['POST'])(handle_stripe_webhook)
@@ -0,0 +1,7 @@
+from flask import Blueprint
+from controllers.search_controller import search_records
+
+search_bp = Blueprint('search', __name__)
+
+# Full-text search across documents, clients, projects and invoices
+search_bp.route('/', methods=['GET'])(search_records)
@@ -7,7 +7,8 @@ from controllers.settings_controller import (
     upload_logo,
     update_api_keys,
     update_notification_preferences,
-    update_user_preferences
+    update_user_preferences,
+    update_reminder_schedule
 )
 
 settings_bp = Blueprint('settings', __name__)
@@ -29,3 +30,4 @@ settings_bp.route('/api-keys', methods=['PUT'])(update_api_keys)
 # Preferences
 settings_bp.route('/notifications', methods=['PUT'])(update_notification_preferences)
 settings_bp.route('/preferences', methods=['PUT'])(update_user_preferences)
+settings_bp.route('/reminders', methods=['PUT'])(update_reminder_schedule)
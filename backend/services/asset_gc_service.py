@@ -0,0 +1,73 @@
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from pymongo.errors import DuplicateKeyError
+from services.storage_service import get_asset_collection, get_storage_backend
+
+REPORT_SAMPLE_SIZE = 20
+
+def find_orphaned_assets(limit, grace_hours):
+    """Assets without owners that have stayed orphaned for longer than the grace period, oldest first."""
+    cutoff = datetime.utcnow() - timedelta(hours=grace_hours)
+    return list(get_asset_collection().find(
+        {"orphaned_at": {"$lt": cutoff}, "refs": {"$size": 0}},
+        {"sha256": 1, "backend": 1, "key": 1, "url": 1, "size": 1, "orphaned_at": 1}
+    ).sort("orphaned_at", 1).limit(limit))
+
+def collect_orphaned_assets(dry_run=False, limit=None, grace_hours=None):
+    """
+    Deletes one batch of orphaned assets (at most ASSET_GC_BATCH_SIZE, paced to
+    ASSET_GC_DELETES_PER_SECOND so the storage API is not flooded).
+
+    The record is removed first, with a condition that it is still unowned, so
+    an asset that gets claimed again in the meantime survives. With dry_run
+    nothing is deleted; the summary reports what would be.
+
+    Returns {"candidates", "deleted", "failed", "skipped", "bytes", "sample"}.
+    """
+    config = current_app.config
+    limit = limit or config['ASSET_GC_BATCH_SIZE']
+    grace_hours = config['ASSET_GC_GRACE_HOURS'] if grace_hours is None else grace_hours
+    candidates = find_orphaned_assets(limit, grace_hours)
+    summary = {
+        "candidates": len(candidates),
+        "deleted": 0,
+        "failed": 0,
+        "skipped": 0,
+        "bytes": sum(a.get("size") or 0 for a in candidates),
+        "sample": [
+            {"key": a["key"], "backend": a["backend"], "size": a.get("size"), "orphaned_at": a["orphaned_at"].isoformat()}
+            for a in candidates[:REPORT_SAMPLE_SIZE]
+        ],
+    }
+    if dry_run or not candidates:
+        return summary
+
+    backend = get_storage_backend()
+    assets = get_asset_collection()
+    interval = 1.0 / config['ASSET_GC_DELETES_PER_SECOND']
+    for asset in candidates:
+        if asset["backend"] != backend.name:
+            # Files stored under a previous STORAGE_BACKEND are left for that backend
+            summary["skipped"] += 1
+            continue
+        started = time.monotonic()
+        removed = assets.find_one_and_delete({"_id": asset["_id"], "refs": {"$size": 0}, "orphaned_at": {"$exists": True}})
+        if not removed:
+            summary["skipped"] += 1 # Claimed again since the scan
+            continue
+        try:
+            backend.delete(asset["key"], asset["url"])
+            summary["deleted"] += 1
+        except Exception as e:
+            # Put the record back so the next run retries the file
+            try:
+                assets.insert_one(removed)
+            except DuplicateKeyError:
+                pass # The same bytes were stored again meanwhile; that record owns the file now
+            summary["failed"] += 1
+            current_app.logger.error(f"Asset GC could not delete {asset['key']}: {e}")
+        elapsed = time.monotonic() - started
+        if elapsed < interval:
+            time.sleep(interval - elapsed)
+    return summary
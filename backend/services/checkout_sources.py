@@ -0,0 +1,60 @@
+import json
+import stripe
+from flask import current_app
+from services.stripe_service import init_stripe, throttle_stripe
+
+# Sources yield Stripe checkout session objects (plain dicts) created at or after
+# a Unix timestamp. The reconciliation job only depends on this interface, so it
+# runs the same way against the Stripe API, a fake Stripe server (STRIPE_API_BASE)
+# or a JSON fixture in CI.
+
+class StripeCheckoutSource:
+    """Pages through completed checkout sessions with the Stripe API."""
+
+    def __init__(self, page_size=100):
+        self.page_size = page_size
+
+    def iter_sessions(self, created_since):
+        init_stripe()
+        starting_after = None
+        while True:
+            # The expanded PaymentIntent's creation time is when the customer paid
+            params = {"created": {"gte": int(created_since)}, "status": "complete", "limit": self.page_size,
+                      "expand": ["data.payment_intent"]}
+            if starting_after:
+                params["starting_after"] = starting_after
+            throttle_stripe()
+            page = stripe.checkout.Session.list(**params)
+            # Plain dicts keep the job source-agnostic
+            sessions = [session.to_dict_recursive() for session in page.data]
+            yield from sessions
+            if not page.has_more or not sessions:
+                return
+            starting_after = sessions[-1]['id']
+
+class FixtureCheckoutSource:
+    """Reads checkout sessions from a JSON file: a list of sessions or a Stripe list object."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def iter_sessions(self, created_since):
+        with open(self.path) as f:
+            data = json.load(f)
+        sessions = data.get('data', []) if isinstance(data, dict) else data
+        for session in sorted(sessions, key=lambda s: s.get('created', 0), reverse=True):
+            if session.get('status', 'complete') == 'complete' and session.get('created', 0) >= created_since:
+                yield session
+
+def get_checkout_source(name=None, fixture_path=None):
+    """Returns the source configured by STRIPE_RECONCILE_SOURCE ('stripe' or 'fixture')."""
+    config = current_app.config
+    name = name or config['STRIPE_RECONCILE_SOURCE']
+    if name == 'stripe':
+        return StripeCheckoutSource()
+    if name == 'fixture':
+        path = fixture_path or config['STRIPE_RECONCILE_FIXTURE']
+        if not path:
+            raise ValueError("STRIPE_RECONCILE_FIXTURE must be set to use the fixture source")
+        return FixtureCheckoutSource(path)
+    raise ValueError(f"Unknown checkout source: {name!r}")
@@ -1,38 +1,107 @@
 import cloudinary
 import cloudinary.uploader
-from flask import current_app
+import cloudinary.utils
 import os
+import random
+import threading
+import time
+from flask import current_app
+
+# cloudinary.exceptions.Error carries no status code; these messages come from
+# network failures, non-JSON 5xx pages and throttling, which are worth retrying
+TRANSIENT_ERROR_PREFIXES = ("Socket error", "Unexpected error", "Error parsing server response")
+TRANSIENT_ERROR_MARKERS = ("rate limit", "timeout", "timed out", "try again", "temporarily")
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def is_transient_error(error):
+    message = str(error)
+    return message.startswith(TRANSIENT_ERROR_PREFIXES) or any(m in message.lower() for m in TRANSIENT_ERROR_MARKERS)
+
+class UploadManager:
+    """
+    Uploads files to Cloudinary. Files above chunk_threshold are sent in
+    chunk_size parts (each part retried on its own), and transient failures are
+    retried with exponential backoff and jitter. Parallel uploads run on the
+    storage service's bounded pool (see storage_service.submit_upload).
+    """
+
+    def __init__(self, chunk_threshold, chunk_size, retries, retry_base, timeout, logger):
+        self.chunk_threshold = chunk_threshold
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.retry_base = retry_base
+        self.timeout = timeout
+        self.logger = logger
+
+    def _with_retries(self, action, description):
+        for attempt in range(self.retries + 1):
+            try:
+                return action()
+            except cloudinary.exceptions.Error as e:
+                if attempt == self.retries or not is_transient_error(e):
+                    raise
+                delay = self.retry_base * (2 ** attempt) * random.uniform(0.5, 1.5)
+                self.logger.warning(f"Cloudinary {description} failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _upload_chunked(self, file_path, size, options):
+        """Mirrors cloudinary.uploader.upload_large, retrying each part instead of the whole file."""
+        upload_id = cloudinary.utils.random_public_id()
+        result = None
+        with open(file_path, 'rb') as f:
+            offset = 0
+            while offset < size:
+                chunk = f.read(self.chunk_size)
+                headers = {
+                    "Content-Range": f"bytes {offset}-{offset + len(chunk) - 1}/{size}",
+                    "X-Unique-Upload-Id": upload_id,
+                }
+                part = (os.path.basename(file_path), chunk)
+                result = self._with_retries(
+                    lambda: cloudinary.uploader.upload_large_part(part, http_headers=headers, **options),
+                    f"chunk {offset}/{size} of {file_path}"
+                )
+                # Later parts must target the public_id assigned to the first one
+                options["public_id"] = result.get("public_id")
+                offset += len(chunk)
+        return result
+
+    def upload(self, file_path, folder="documents", public_id=None):
+        """Uploads a file on the calling thread and returns the upload result. Raises on failure."""
+        options = {"folder": folder, "resource_type": "auto", "timeout": self.timeout}
+        if public_id:
+            # A fixed public_id makes a repeated upload of the same file return the existing asset, not add a copy
+            options.update(public_id=public_id, overwrite=False)
+        size = os.path.getsize(file_path)
+        if size > self.chunk_threshold:
+            return self._upload_chunked(file_path, size, options)
+        return self._with_retries(lambda: cloudinary.uploader.upload(file_path, **options), f"upload of {file_path}")
 
-def init_cloudinary():
-    """Initializes Cloudinary configuration."""
-    cloudinary.config(
-        cloud_name=current_app.config['CLOUDINARY_CLOUD_NAME'],
-        api_key=current_app.config['CLOUDINARY_API_KEY'],
-        api_secret=current_app.config['CLOUDINARY_API_SECRET']
-    )
-
-def upload_file(file_path, folder="documents"):
-    """Uploads a file to Cloudinary and returns the secure URL."""
-    try:
-        init_cloudinary()
-        
-        # Check if file exists before uploading
-        if not os.path.exists(file_path):
-            current_app.logger.error(f"File not found for upload: {file_path}")
-            return None
-
-        # Upload the file
-        result = cloudinary.uploader.upload(
-            file_path,
-            folder=folder,
-            resource_type="auto"
-        )
-        
-        return result.get('secure_url')
-        
-    except cloudinary.exceptions.Error as e:
-        current_app.logger.error(f"Cloudinary upload error: {e}")
-        return None
-    except Exception as e:
-        current_app.logger.error(f"General upload error: {e}")
-        return None
+def get_upload_manager():
+    """Returns the process-wide upload manager, configuring the Cloudinary SDK once on first use."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            config = current_app.config
+            cloudinary.config(
+                cloud_name=config['CLOUDINARY_CLOUD_NAME'],
+                api_key=config['CLOUDINARY_API_KEY'],
+                api_secret=config['CLOUDINARY_API_SECRET'],
+                upload_prefix=config['CLOUDINARY_UPLOAD_PREFIX'] # None = the real API
+            )
+            # The SDK's module-level connection pool keeps one connection per host, so parallel
+            # uploads would reconnect every time; size it to the upload pool instead
+            cloudinary.uploader._http = cloudinary.utils.get_http_connector(
+                cloudinary.config(), {**cloudinary.CERT_KWARGS, "maxsize": config['STORAGE_UPLOAD_WORKERS']}
+            )
+            _manager = UploadManager(
+                chunk_threshold=config['CLOUDINARY_CHUNK_THRESHOLD'],
+                chunk_size=config['CLOUDINARY_CHUNK_SIZE'],
+                retries=config['CLOUDINARY_UPLOAD_RETRIES'],
+                retry_base=config['CLOUDINARY_RETRY_BASE_SECONDS'],
+                timeout=config['CLOUDINARY_UPLOAD_TIMEOUT'],
+                logger=current_app.logger
+            )
+    return _manager
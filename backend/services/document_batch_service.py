@@ -0,0 +1,258 @@
+"""
+Batch document generation: one doc type and set of custom details drafted for
+many clients.
+
+Drafts run on a small thread pool and still go through the shared generation
+cap, so a batch cannot starve interactive drafting. PDFs are rendered in a
+process pool, since ReportLab layout is CPU-bound and would otherwise hold the
+GIL against the request threads; uploads go to the shared upload pool. Each
+item's progress is written to the job as it happens, so the client can poll
+GET /api/documents/batch/<job_id>.
+
+Jobs are queued on the in-memory scheduler, so a restart drops them. The
+scheduled requeue_stale_document_jobs sweep picks up jobs left 'queued' or
+'running' without progress and resumes them from their unfinished items.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from bson.objectid import ObjectId
+from flask import current_app
+from models.client_model import Client
+from models.project_model import Project
+from models.document_model import Document
+from models.document_job_model import DocumentJob
+from services.openai_service import generate_document_draft, GenerationBusyError, DRAFT_ERROR_PREFIX
+from services.pdf_service import generate_document_pdf
+from services.storage_service import submit_upload, asset_owner
+from services.user_profile_service import get_business_settings
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+# Jobs running in this process; the scheduler forgets a job once it starts
+_running_jobs = set()
+_running_jobs_lock = threading.Lock()
+
+def get_job_collection():
+    return current_app.db.document_jobs
+
+def _get_pdf_pool():
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            # spawn rather than fork: the parent holds MongoDB/HTTP connections and scheduler threads
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=current_app.config['DOCUMENT_BATCH_PDF_PROCESSES'],
+                mp_context=multiprocessing.get_context("spawn")
+            )
+    return _pdf_pool
+
+def _discard_pdf_pool(pool):
+    """Drops a broken pool (e.g., a worker was OOM-killed) so the next batch starts a fresh one."""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is pool:
+            _pdf_pool = None
+    pool.shutdown(wait=False)
+
+def create_document_job(user_id, doc_type, title, custom_details, items):
+    job = DocumentJob(user_id, doc_type, title, custom_details, items)
+    get_job_collection().insert_one({**job.__dict__, "items": [item.__dict__ for item in job.items]})
+    return job
+
+def _job_id(job_id):
+    return f"document_batch:{job_id}"
+
+def _update_item(job_id, index, status, **fields):
+    now = datetime.utcnow()
+    update = {"$set": {f"items.{index}.status": status, "updated_at": now}}
+    update["$set"].update({f"items.{index}.{field}": value for field, value in fields.items()})
+    if status in ('done', 'failed'):
+        update["$set"][f"items.{index}.finished_at"] = now
+        update["$inc"] = {f"counts.{status}": 1}
+    get_job_collection().update_one({"_id": job_id}, update)
+
+def _draft(job, client, project, business_settings):
+    """Drafts one item. A full generation queue is waited out rather than failing the item."""
+    retries = current_app.config['DOCUMENT_BATCH_BUSY_RETRIES']
+    for attempt in range(retries + 1):
+        try:
+            content = generate_document_draft(job.doc_type, client, project, job.custom_details, business_settings)
+            break
+        except GenerationBusyError as e:
+            if attempt == retries:
+                raise
+            time.sleep(e.retry_after)
+    if not content or content.startswith(DRAFT_ERROR_PREFIX):
+        raise RuntimeError(content or "Empty draft")
+    return content
+
+def _render(pool, document):
+    """Renders the PDF in the process pool, falling back to this thread if the pool broke."""
+    try:
+        return pool.submit(generate_document_pdf, document).result()
+    except BrokenProcessPool:
+        _discard_pdf_pool(pool)
+        return generate_document_pdf(document)
+
+def run_document_job(job_id):
+    """
+    Runs a queued job to completion. Must be called inside an app context; the
+    job is claimed atomically, so a job queued twice only runs once.
+    """
+    app = current_app._get_current_object()
+    now = datetime.utcnow()
+    job_data = get_job_collection().find_one_and_update(
+        {"_id": ObjectId(job_id), "status": "queued"},
+        {"$set": {"status": "running", "started_at": now, "updated_at": now}}
+    )
+    if not job_data:
+        return None
+    job = DocumentJob.from_dict(job_data)
+    with _running_jobs_lock:
+        _running_jobs.add(str(job._id))
+    try:
+        return _run_items(app, job)
+    finally:
+        with _running_jobs_lock:
+            _running_jobs.discard(str(job._id))
+
+def _run_items(app, job):
+    """Processes the job's unfinished items; an item that already has a document is only rendered."""
+    pending = [(index, item) for index, item in enumerate(job.items) if item.status not in ('done', 'failed')]
+
+    # Everything the drafts need is read up front in two queries
+    clients = {
+        c['_id']: Client.from_dict(c).to_dict()
+        for c in app.db.clients.find({"_id": {"$in": list({i.client_id for i in job.items})}, "user_id": job.user_id})
+    }
+    projects = {
+        p['_id']: Project.from_dict(p).to_dict()
+        for p in app.db.projects.find({"_id": {"$in": list({i.project_id for i in job.items if i.project_id})}, "user_id": job.user_id})
+    }
+    business_settings = get_business_settings(job.user_id)
+    pdf_pool = _get_pdf_pool()
+    finishing = []
+
+    def process(index, item):
+        with app.app_context():
+            try:
+                client = clients.get(item.client_id)
+                if client is None:
+                    raise LookupError("Client not found")
+                project = projects.get(item.project_id, {}) if item.project_id else {}
+                if item.project_id and not project:
+                    raise LookupError("Project not found")
+
+                document_data = app.db.documents.find_one({"_id": item.document_id}) if item.document_id else None
+                if document_data:
+                    document = Document.from_dict(document_data)
+                else:
+                    _update_item(job._id, index, 'drafting')
+                    document = Document(
+                        user_id=job.user_id,
+                        client_id=item.client_id,
+                        project_id=item.project_id,
+                        doc_type=job.doc_type,
+                        title=f"{job.title} - {client['name']}",
+                        content=_draft(job, client, project, business_settings),
+                        pdf_status='pending'
+                    )
+                    app.db.documents.insert_one(document.to_mongo())
+                    _update_item(job._id, index, 'rendering', document_id=document._id)
+
+                pdf_path = _render(pdf_pool, document)
+                # The upload runs on the shared upload pool, so this worker can move on to the next draft
+                upload = submit_upload(pdf_path, "documents", owner=asset_owner("document", document._id))
+                finishing.append(finishers.submit(finish, index, document._id, pdf_path, upload))
+            except Exception as e:
+                app.logger.error(f"Document job {job._id} item {index} failed: {e}")
+                _update_item(job._id, index, 'failed', error=str(e))
+
+    def finish(index, document_id, pdf_path, upload):
+        """Waits for an item's upload and records the outcome."""
+        with app.app_context():
+            try:
+                pdf_url = upload.result()
+            except Exception as e:
+                app.logger.error(f"Document job {job._id} item {index} upload failed: {e}")
+                pdf_url = None
+            finally:
+                if os.path.exists(pdf_path):
+                    os.remove(pdf_path)
+            app.db.documents.update_one(
+                {"_id": document_id},
+                {"$set": {"pdf_url": pdf_url, "pdf_status": "ready" if pdf_url else "failed", "updated_at": datetime.utcnow()}}
+            )
+            if pdf_url:
+                _update_item(job._id, index, 'done')
+            else:
+                _update_item(job._id, index, 'failed', error="PDF upload failed")
+
+    # Each worker waits for its own render, so renders queue up no faster than drafts finish
+    workers_count = app.config['DOCUMENT_BATCH_DRAFT_WORKERS']
+    with ThreadPoolExecutor(max_workers=workers_count) as workers, ThreadPoolExecutor(max_workers=workers_count) as finishers:
+        wait([workers.submit(process, index, item) for index, item in pending])
+        wait(finishing)
+
+    job_data = get_job_collection().find_one({"_id": job._id}, {"counts": 1})
+    status = 'completed_with_errors' if job_data['counts'].get('failed') else 'completed'
+    now = datetime.utcnow()
+    get_job_collection().update_one(
+        {"_id": job._id}, {"$set": {"status": status, "finished_at": now, "updated_at": now}}
+    )
+    return status
+
+def _run_document_job_job(app, job_id):
+    with app.app_context():
+        try:
+            status = run_document_job(job_id)
+            if status:
+                app.logger.info(f"Document job {job_id} finished: {status}")
+        except Exception as e:
+            app.logger.error(f"Error running document job {job_id}: {e}")
+
+def queue_document_job(job_id):
+    """Runs the job once on the scheduler's thread pool, off the request thread."""
+    app = current_app._get_current_object()
+    app.scheduler.add_job(
+        _run_document_job_job,
+        args=[app, str(job_id)],
+        id=_job_id(job_id),
+        replace_existing=True,
+        misfire_grace_time=None
+    )
+
+def requeue_stale_document_jobs(stale_minutes=None):
+    """
+    Queues jobs again that have sat 'queued' or 'running' without progress for
+    longer than DOCUMENT_JOB_STALE_MINUTES and that this process is neither
+    holding nor running (e.g., they were lost in a restart). A 'running' job
+    is put back to 'queued' so it can be claimed again. Returns the number of
+    jobs queued.
+    """
+    stale_minutes = stale_minutes or current_app.config['DOCUMENT_JOB_STALE_MINUTES']
+    cutoff = datetime.utcnow() - timedelta(minutes=stale_minutes)
+    jobs = get_job_collection()
+    stale = jobs.find({"status": {"$in": ["queued", "running"]}, "updated_at": {"$lt": cutoff}}, {"status": 1})
+    queued = 0
+    for job in stale:
+        with _running_jobs_lock:
+            if str(job['_id']) in _running_jobs:
+                continue
+        if current_app.scheduler.get_job(_job_id(job['_id'])):
+            continue # Still waiting for a free worker thread
+        if job['status'] == 'running':
+            reset = jobs.find_one_and_update(
+                {"_id": job['_id'], "status": "running", "updated_at": {"$lt": cutoff}},
+                {"$set": {"status": "queued", "updated_at": datetime.utcnow()}}
+            )
+            if not reset:
+                continue # Made progress or finished since the query
+        queue_document_job(job['_id'])
+        queued += 1
+    return queued
@@ -0,0 +1,74 @@
+import os
+from flask import current_app
+from bson.objectid import ObjectId
+from datetime import datetime, timedelta
+from models.document_model import Document
+from services.pdf_service import generate_document_pdf
+from services.storage_service import upload_file, asset_owner
+
+def get_document_collection():
+    return current_app.db.documents
+
+def _job_id(document_id):
+    return f"document_pdf:{document_id}"
+
+def render_document_pdf(document_id):
+    """Renders a document's PDF, uploads it and stores the URL (pdf_status 'ready', or 'failed')."""
+    documents = get_document_collection()
+    pdf_path = None
+    try:
+        document_data = documents.find_one({"_id": ObjectId(document_id)})
+        if not document_data:
+            return
+        pdf_path = generate_document_pdf(Document.from_dict(document_data))
+        cloudinary_url = upload_file(pdf_path, folder="documents", owner=asset_owner("document", document_id))
+        documents.update_one(
+            {"_id": ObjectId(document_id)},
+            {"$set": {"pdf_url": cloudinary_url, "pdf_status": "ready", "updated_at": datetime.utcnow()}}
+        )
+    except Exception as e:
+        current_app.logger.error(f"Error rendering PDF for document {document_id}: {e}")
+        documents.update_one({"_id": ObjectId(document_id)}, {"$set": {"pdf_status": "failed"}})
+    finally:
+        if pdf_path and os.path.exists(pdf_path):
+            os.remove(pdf_path)
+
+def _render_document_pdf_job(app, document_id):
+    with app.app_context():
+        render_document_pdf(document_id)
+
+def queue_document_pdf(document_id):
+    """
+    Marks the document's PDF as pending and renders it once on the scheduler's
+    thread pool, off the request thread. The scheduler keeps the job in memory
+    only; requeue_stale_document_pdfs picks it up again after a restart.
+    """
+    app = current_app._get_current_object()
+    get_document_collection().update_one(
+        {"_id": ObjectId(document_id)},
+        {"$set": {"pdf_status": "pending", "pdf_queued_at": datetime.utcnow()}}
+    )
+    app.scheduler.add_job(
+        _render_document_pdf_job,
+        args=[app, str(document_id)],
+        id=_job_id(document_id),
+        replace_existing=True,
+        misfire_grace_time=None
+    )
+
+def requeue_stale_document_pdfs(stale_minutes=None):
+    """
+    Queues the PDF again for documents left 'pending' longer than
+    DOCUMENT_PDF_STALE_MINUTES whose job this process no longer holds (e.g.,
+    it was lost in a restart). Returns the number of documents queued.
+    """
+    stale_minutes = stale_minutes or current_app.config['DOCUMENT_PDF_STALE_MINUTES']
+    cutoff = datetime.utcnow() - timedelta(minutes=stale_minutes)
+    stale = get_document_collection().find({"pdf_status": "pending", "pdf_queued_at": {"$lt": cutoff}}, {"_id": 1})
+    queued = 0
+    for document in stale:
+        if current_app.scheduler.get_job(_job_id(document['_id'])):
+            continue # Still waiting for a free worker thread
+        queue_document_pdf(document['_id'])
+        queued += 1
+    return queued
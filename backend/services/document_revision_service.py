@@ -0,0 +1,160 @@
+import difflib
+import json
+import zlib
+from flask import current_app
+from bson.binary import Binary
+from bson.objectid import ObjectId
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime
+from models.document_model import Document, make_excerpt
+from utils.compression import decompress_text
+from models.document_revision_model import DocumentRevision
+
+class RevisionConflictError(Exception):
+    """Raised when the document changed between reading it and saving a new revision."""
+    pass
+
+def get_revision_collection():
+    return current_app.db.document_revisions
+
+# --- Delta encoding ---
+
+def make_delta(source, target):
+    """
+    Returns a line-based delta that rebuilds `target` from `source`:
+    [["c", start, end], ...] copies source lines, ["i", [lines]] inserts new ones.
+    """
+    source_lines = source.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    ops = []
+    matcher = difflib.SequenceMatcher(None, source_lines, target_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append(["c", i1, i2])
+        elif j2 > j1: # replace / insert; deletes simply copy nothing
+            ops.append(["i", target_lines[j1:j2]])
+    return ops
+
+def apply_delta(source, ops):
+    source_lines = source.splitlines(keepends=True)
+    parts = []
+    for op in ops:
+        if op[0] == "c":
+            parts.extend(source_lines[op[1]:op[2]])
+        else:
+            parts.extend(op[1])
+    return "".join(parts)
+
+def _pack(value):
+    return Binary(zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"), 9))
+
+def _unpack(data):
+    return json.loads(zlib.decompress(bytes(data)).decode("utf-8"))
+
+# --- Saving ---
+
+def _is_snapshot(revision):
+    """Every SNAPSHOT_INTERVAL-th revision (starting with the first) is stored in full."""
+    return (revision - 1) % current_app.config['DOCUMENT_SNAPSHOT_INTERVAL'] == 0
+
+def _revision_filter(document_id, revision):
+    query = {"_id": ObjectId(document_id), "revision": revision}
+    if revision == 1:
+        # Documents created before revisions existed have no revision field
+        query = {"_id": ObjectId(document_id), "$or": [{"revision": 1}, {"revision": {"$exists": False}}]}
+    return query
+
+def save_new_revision(document_data, new_content, source, extra_fields=None):
+    """
+    Replaces a document's content with new_content as revision N+1, archiving
+    revision N as a reverse delta against the new text (or as a full snapshot
+    every DOCUMENT_SNAPSHOT_INTERVAL revisions, which caps the reconstruction
+    chain). Raises RevisionConflictError if another writer got there first.
+    Returns the new revision number.
+    """
+    current = document_data.get('revision', 1)
+    old_content = decompress_text(document_data.get('content')) or ''
+    revisions = get_revision_collection()
+
+    if _is_snapshot(current):
+        kind, payload = 'snapshot', _pack(old_content)
+    else:
+        kind, payload = 'delta', _pack(make_delta(new_content, old_content))
+
+    archived = DocumentRevision(
+        document_id=document_data['_id'],
+        user_id=document_data['user_id'],
+        revision=current,
+        kind=kind,
+        data=payload,
+        source=document_data.get('content_source', 'ai_draft'),
+        size=len(payload),
+        content_length=len(old_content),
+        created_at=document_data.get('updated_at')
+    )
+    try:
+        revisions.insert_one(archived.__dict__)
+    except DuplicateKeyError:
+        raise RevisionConflictError(f"Revision {current} of document {document_data['_id']} was already archived")
+
+    update = {**Document.content_fields(new_content), "excerpt": make_excerpt(new_content), "revision": current + 1, "content_source": source, "updated_at": datetime.utcnow()}
+    update.update(extra_fields or {})
+    result = current_app.db.documents.update_one(_revision_filter(document_data['_id'], current), {"$set": update})
+    if result.matched_count == 0:
+        revisions.delete_one({"_id": archived._id})
+        raise RevisionConflictError(f"Document {document_data['_id']} changed concurrently")
+    return current + 1
+
+# --- Reading ---
+
+def list_revisions(document_id):
+    """Returns revision metadata (no payloads), newest first."""
+    rows = get_revision_collection().find(
+        {"document_id": ObjectId(document_id)},
+        {"data": 0}
+    ).sort("revision", -1)
+    return [DocumentRevision.from_dict(r) for r in rows]
+
+def get_revision_content(document_data, revision):
+    """
+    Reconstructs the text of any revision. Starts from the nearest full text at
+    or after it (a snapshot, or the current content) and applies reverse deltas
+    backwards, so at most DOCUMENT_SNAPSHOT_INTERVAL - 1 deltas are applied.
+    Returns None if the revision does not exist.
+    """
+    current = document_data.get('revision', 1)
+    if revision == current:
+        return decompress_text(document_data.get('content')) or ''
+    if revision < 1 or revision > current:
+        return None
+
+    revisions = get_revision_collection()
+    snapshot = revisions.find_one(
+        {"document_id": document_data['_id'], "kind": "snapshot", "revision": {"$gte": revision}},
+        sort=[("revision", 1)]
+    )
+    if snapshot:
+        text = _unpack(snapshot['data'])
+        start = snapshot['revision']
+    else:
+        text = decompress_text(document_data.get('content')) or ''
+        start = current
+    if start == revision:
+        return text
+
+    # Deltas for revisions start-1 down to the requested one, applied newest first
+    deltas = revisions.find(
+        {"document_id": document_data['_id'], "revision": {"$gte": revision, "$lt": start}},
+        {"revision": 1, "kind": 1, "data": 1}
+    ).sort("revision", -1)
+    expected = start - 1
+    for row in deltas:
+        if row['revision'] != expected:
+            break
+        text = _unpack(row['data']) if row['kind'] == 'snapshot' else apply_delta(text, _unpack(row['data']))
+        expected -= 1
+    return text if expected == revision - 1 else None
+
+def delete_revisions(*document_ids):
+    """Deletes all stored revisions of the given documents."""
+    get_revision_collection().delete_many({"document_id": {"$in": [ObjectId(i) for i in document_ids]}})
@@ -0,0 +1,159 @@
+from flask import current_app
+from pymongo import ReturnDocument
+from datetime import datetime, timedelta
+from models.email_outbox_model import OutboxEmail
+from models.email_log_model import EmailLog
+from models.invoice_model import Invoice
+from models.client_model import Client
+from services.gmail_service import build_invoice_email, deliver_email
+
+# A message stuck in 'Sending' longer than this (e.g., the worker died) is picked up again
+STALE_LOCK_MINUTES = 10
+RATE_LIMIT_WINDOW = timedelta(minutes=1)
+BODY_PREVIEW_LENGTH = 200
+
+def get_outbox_collection():
+    return current_app.db.email_outbox
+
+def get_email_log_collection():
+    return current_app.db.email_logs
+
+# --- Enqueueing ---
+
+def enqueue_email(user_id, recipient, subject, body, category, related_invoice_id=None):
+    """Stores an email in the outbox; the sender job delivers it asynchronously."""
+    email = OutboxEmail(
+        user_id=user_id,
+        recipient=recipient,
+        subject=subject,
+        body=body,
+        category=category,
+        related_invoice_id=related_invoice_id
+    )
+    get_outbox_collection().insert_one(email.__dict__)
+    return email
+
+def enqueue_emails(emails):
+    """Stores several OutboxEmail objects with a single insert_many."""
+    if emails:
+        get_outbox_collection().insert_many([email.__dict__ for email in emails], ordered=False)
+    return len(emails)
+
+def queue_invoice_email(invoice: Invoice, client: Client):
+    """Queues the invoice email for a client."""
+    subject, body = build_invoice_email(invoice, client)
+    return enqueue_email(invoice.user_id, client.email, subject, body, 'invoice', invoice._id)
+
+# --- Sender Worker ---
+
+def _retry_delay(attempts):
+    """Exponential backoff: base, 2x base, 4x base, ... capped at the configured maximum."""
+    config = current_app.config
+    delay = config['EMAIL_RETRY_BASE_SECONDS'] * (2 ** (attempts - 1))
+    return timedelta(seconds=min(delay, config['EMAIL_RETRY_MAX_SECONDS']))
+
+def _sent_counts_in_window(now):
+    """Returns {user_id: emails sent in the current rate-limit window}."""
+    pipeline = [
+        {"$match": {"status": "Sent", "created_at": {"$gte": now - RATE_LIMIT_WINDOW}}},
+        {"$group": {"_id": "$user_id", "count": {"$sum": 1}}}
+    ]
+    return {row['_id']: row['count'] for row in get_email_log_collection().aggregate(pipeline)}
+
+def _claim_next(now, throttled_users):
+    """Atomically moves the next due message to 'Sending' so only one worker delivers it."""
+    query = {"status": "Pending", "next_attempt_at": {"$lte": now}}
+    if throttled_users:
+        query["user_id"] = {"$nin": list(throttled_users)}
+    return get_outbox_collection().find_one_and_update(
+        query,
+        {"$set": {"status": "Sending", "locked_at": now}},
+        sort=[("next_attempt_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+def drain_outbox(batch_size=None):
+    """
+    Delivers up to one batch of due outbox messages, honouring the per-account
+    rate limit. Failed attempts are rescheduled with exponential backoff until
+    EMAIL_MAX_ATTEMPTS is reached. Every attempt is recorded as an EmailLog.
+    Each message's outcome is saved as soon as it is known, so a worker dying
+    mid-batch never leaves a delivered message to be sent again by the stale-lock sweep.
+    Returns a summary dict of what happened.
+    """
+    config = current_app.config
+    batch_size = batch_size or config['EMAIL_OUTBOX_BATCH_SIZE']
+    rate_limit = config['EMAIL_RATE_LIMIT_PER_MINUTE']
+    outbox = get_outbox_collection()
+    now = datetime.utcnow()
+
+    # Release messages left locked by a worker that crashed mid-send
+    outbox.update_many(
+        {"status": "Sending", "locked_at": {"$lt": now - timedelta(minutes=STALE_LOCK_MINUTES)}},
+        {"$set": {"status": "Pending", "locked_at": None}}
+    )
+
+    sent_in_window = _sent_counts_in_window(now)
+    throttled_users = {user_id for user_id, count in sent_in_window.items() if count >= rate_limit}
+
+    logs = []
+    summary = {"sent": 0, "retried": 0, "failed": 0, "throttled": 0}
+
+    for _ in range(batch_size):
+        message_data = _claim_next(now, throttled_users)
+        if not message_data:
+            break
+        message = OutboxEmail.from_dict(message_data)
+
+        if sent_in_window.get(message.user_id, 0) >= rate_limit:
+            # Account hit its limit during this batch; put the message back for the next window
+            throttled_users.add(message.user_id)
+            outbox.update_one(
+                {"_id": message._id},
+                {"$set": {"status": "Pending", "locked_at": None, "next_attempt_at": now + RATE_LIMIT_WINDOW}}
+            )
+            summary['throttled'] += 1
+            continue
+
+        attempt = message.attempts + 1
+        try:
+            message_id = deliver_email(message.user_id, message.recipient, message.subject, message.body)
+            sent_at = datetime.utcnow()
+            outbox.update_one(
+                {"_id": message._id},
+                {"$set": {"status": "Sent", "attempts": attempt, "message_id": message_id, "sent_at": sent_at,
+                          "locked_at": None, "last_error": None, "updated_at": sent_at}}
+            )
+            sent_in_window[message.user_id] = sent_in_window.get(message.user_id, 0) + 1
+            status, error = 'Sent', None
+            summary['sent'] += 1
+        except Exception as e:
+            error = str(e)
+            status = 'Failed'
+            update = {"attempts": attempt, "locked_at": None, "last_error": error, "updated_at": datetime.utcnow()}
+            if attempt >= config['EMAIL_MAX_ATTEMPTS']:
+                update["status"] = "Failed"
+                summary['failed'] += 1
+            else:
+                update["status"] = "Pending"
+                update["next_attempt_at"] = now + _retry_delay(attempt)
+                summary['retried'] += 1
+            outbox.update_one({"_id": message._id}, {"$set": update})
+            current_app.logger.warning(f"Email {message._id} attempt {attempt} failed: {error}")
+
+        logs.append(EmailLog(
+            user_id=message.user_id,
+            recipient=message.recipient,
+            subject=message.subject,
+            body_preview=(message.body or '')[:BODY_PREVIEW_LENGTH],
+            status=status,
+            related_invoice_id=message.related_invoice_id,
+            outbox_id=message._id,
+            attempt=attempt,
+            error=error
+        ).__dict__)
+
+    if logs:
+        get_email_log_collection().insert_many(logs, ordered=False)
+
+    return summary
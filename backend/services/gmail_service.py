@@ -2,10 +2,18 @@ from flask import current_app
 from googleapiclient.discovery import build
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from email.utils import make_msgid
 import base64
+import smtplib
 from models.invoice_model import Invoice
 from models.client_model import Client
 from utils.google_oauth_utils import get_google_credentials # To get user's credentials
+from utils.date_utils import format_date
+from services.user_profile_service import get_sender_name
+
+class EmailDeliveryError(Exception):
+    """Raised when an email could not be handed to the mail provider."""
+    pass
 
 # Placeholder for a real service function
 def get_gmail_service(user_id):
@@ -25,49 +33,95 @@ def create_message(sender, to, subject, message_text):
     raw = base64.urlsafe_b64encode(message.as_bytes()).decode()
     return {'raw': raw}
 
-def send_invoice_email(invoice: Invoice, client: Client):
-    """Sends an invoice email to the client."""
-    user_id = str(invoice.user_id)
-    service = get_gmail_service(user_id)
-    if not service:
-        current_app.logger.warning(f"Gmail service not available for user {user_id}")
-        return
-        
-    try:
-        sender = current_app.config['SENDER_EMAIL']
-        recipient = client.email
-        subject = f"Invoice #{invoice.invoice_number} from {current_app.db.users.find_one({'_id': invoice.user_id}).get('first_name')} - {invoice.status}"
-        
-        body = f"""
-        Dear {client.name},
+# --- Message Builders ---
+
+def build_invoice_email(invoice: Invoice, client: Client):
+    """Builds the subject and body of an invoice email."""
+    sender_name = get_sender_name(invoice.user_id)
+    subject = f"Invoice #{invoice.invoice_number} from {sender_name} - {invoice.status}"
+
+    body = f"""
+    Dear {client.name},
+
+    Please find attached your invoice #{invoice.invoice_number} for {invoice.total_amount} {invoice.currency}.
+    The due date for this invoice is {format_date(invoice.due_date)}.
+
+    You can view and pay the invoice using the following link:
+    {invoice.stripe_payment_link}
+
+    A PDF copy of the invoice is also available here:
+    {invoice.pdf_url}
+
+    Thank you for your business.
+
+    Best regards,
+    {sender_name}
+    """
+    return subject, body
+
+def build_overdue_reminder_email(invoice: Invoice, client: Client):
+    """Builds the subject and body of an overdue reminder email."""
+    sender_name = get_sender_name(invoice.user_id)
+    subject = f"Reminder: Invoice #{invoice.invoice_number} is overdue"
 
-        Please find attached your invoice #{invoice.invoice_number} for {invoice.total_amount} {invoice.currency}.
-        The due date for this invoice is {invoice.due_date}.
+    body = f"""
+    Dear {client.name},
 
-        You can view and pay the invoice using the following link:
-        {invoice.stripe_payment_link}
+    This is a friendly reminder that invoice #{invoice.invoice_number} for {invoice.total_amount} {invoice.currency}
+    was due on {format_date(invoice.due_date)} and has not been paid yet.
 
-        A PDF copy of the invoice is also available here:
-        {invoice.pdf_url}
+    You can pay the invoice using the following link:
+    {invoice.stripe_payment_link}
 
-        Thank you for your business.
+    A PDF copy of the invoice is available here:
+    {invoice.pdf_url}
 
-        Best regards,
-        {current_app.db.users.find_one({'_id': invoice.user_id}).get('first_name')}
-        """
-        
+    If you have already paid, please disregard this message.
+
+    Best regards,
+    {sender_name}
+    """
+    return subject, body
+
+# --- Delivery ---
+
+def deliver_email(user_id, recipient, subject, body):
+    """
+    Hands a single email to the configured transport and returns the provider
+    message ID. Raises EmailDeliveryError on failure so the outbox can retry.
+    """
+    sender = current_app.config['SENDER_EMAIL']
+
+    if current_app.config['EMAIL_TRANSPORT'] == 'smtp':
+        return _deliver_via_smtp(sender, recipient, subject, body)
+
+    service = get_gmail_service(str(user_id))
+    if not service:
+        raise EmailDeliveryError(f"Gmail service not available for user {user_id}")
+
+    try:
         message = create_message(sender, recipient, subject, body)
-        
-        # service.users().messages().send(userId='me', body=message).execute()
-        current_app.logger.info(f"Simulated sending email for invoice {invoice._id} to {recipient}")
-        
-        # Log the email
-        # TODO: Implement EmailLog model and logging
-        
+        result = service.users().messages().send(userId='me', body=message).execute()
+        return result.get('id')
     except Exception as e:
-        current_app.logger.error(f"Error sending email via Gmail API: {e}")
+        raise EmailDeliveryError(f"Gmail API error: {e}") from e
 
-def send_overdue_reminder(invoice: Invoice, client: Client):
-    """Sends an overdue reminder email to the client."""
-    # Similar logic to send_invoice_email, but with a different subject/body
-    pass
+def _deliver_via_smtp(sender, recipient, subject, body):
+    """Sends through an SMTP relay (also used with a local fake server in development)."""
+    config = current_app.config
+    message = MIMEText(body)
+    message['To'] = recipient
+    message['From'] = sender
+    message['Subject'] = subject
+    message['Message-ID'] = make_msgid()
+
+    try:
+        with smtplib.SMTP(config['SMTP_HOST'], config['SMTP_PORT'], timeout=config['SMTP_TIMEOUT']) as smtp:
+            if config['SMTP_USE_TLS']:
+                smtp.starttls()
+            if config['SMTP_USERNAME']:
+                smtp.login(config['SMTP_USERNAME'], config['SMTP_PASSWORD'])
+            smtp.send_message(message)
+        return message['Message-ID']
+    except (smtplib.SMTPException, OSError) as e:
+        raise EmailDeliveryError(f"SMTP error: {e}") from e
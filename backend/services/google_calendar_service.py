@@ -1,7 +1,7 @@
 from flask import current_app
 from googleapiclient.discovery import build
 from google.oauth2.credentials import Credentials
-from datetime import datetime, timedelta
+from datetime import timedelta
 from models.project_model import Milestone
 from utils.google_oauth_utils import get_google_credentials # To get user's credentials
 
@@ -22,8 +22,8 @@ def create_calendar_event(user_id, milestone: Milestone):
         return None
         
     try:
-        # Assuming due_date is an ISO string
-        due_date = datetime.fromisoformat(milestone.due_date)
+        # due_date is stored as a naive UTC datetime
+        due_date = milestone.due_date
         
         event = {
             'summary': f"Milestone: {milestone.title}",
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import re
+from flask import current_app
+from pymongo import ReturnDocument
+from datetime import datetime, timedelta
+from utils.cache import CacheStats
+
+# Process-local hit/miss counters, reported with the other caches at /api/admin/cache-stats
+_stats = CacheStats("llm_responses")
+
+_WHITESPACE = re.compile(r"\s+")
+
+def get_llm_cache_collection():
+    return current_app.db.llm_cache
+
+def make_cache_key(model, messages, **params):
+    """
+    Hashes the model, the messages and any sampling parameters. Whitespace is
+    collapsed so prompts that differ only in indentation or line breaks (the
+    templates are indented f-strings) share an entry.
+    """
+    normalized = {
+        "model": model,
+        "messages": [{"role": m["role"], "content": _WHITESPACE.sub(" ", m["content"]).strip()} for m in messages],
+        "params": params,
+    }
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+
+def get_cached_response(key):
+    """Returns the cached completion text for a key, or None. Hits refresh last_used_at for eviction."""
+    entry = get_llm_cache_collection().find_one_and_update(
+        {"_id": key, "expires_at": {"$gt": datetime.utcnow()}},
+        {"$set": {"last_used_at": datetime.utcnow()}, "$inc": {"hits": 1}},
+        projection={"response": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if entry:
+        _stats.record_hit()
+        return entry['response']
+    _stats.record_miss()
+    return None
+
+def store_response(key, model, response):
+    """Stores a completion under its key, then trims the cache to LLM_CACHE_MAX_ENTRIES."""
+    config = current_app.config
+    now = datetime.utcnow()
+    cache = get_llm_cache_collection()
+    cache.update_one(
+        {"_id": key},
+        {"$set": {
+            "model": model,
+            "response": response,
+            "size": len(response),
+            "created_at": now,
+            "last_used_at": now,
+            # A TTL index on expires_at removes stale entries
+            "expires_at": now + timedelta(seconds=config['LLM_CACHE_TTL_SECONDS']),
+        }, "$setOnInsert": {"hits": 0}},
+        upsert=True
+    )
+    _evict_over_capacity(cache, config['LLM_CACHE_MAX_ENTRIES'])
+
+def _evict_over_capacity(cache, max_entries):
+    """Deletes the least recently used entries beyond max_entries."""
+    excess = cache.estimated_document_count() - max_entries
+    if excess <= 0:
+        return
+    stale_ids = [e['_id'] for e in cache.find({}, {"_id": 1}).sort("last_used_at", 1).limit(excess)]
+    if stale_ids:
+        result = cache.delete_many({"_id": {"$in": stale_ids}})
+        _stats.record_eviction(result.deleted_count)
+
+def get_llm_cache_summary():
+    """Returns entry count, stored size and lifetime hits of the shared cache (all workers)."""
+    pipeline = [{"$group": {"_id": None, "entries": {"$sum": 1}, "size": {"$sum": "$size"}, "hits": {"$sum": "$hits"}}}]
+    result = list(get_llm_cache_collection().aggregate(pipeline))
+    if not result:
+        return {"entries": 0, "size": 0, "hits": 0}
+    return {k: result[0][k] for k in ("entries", "size", "hits")}
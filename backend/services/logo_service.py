@@ -0,0 +1,152 @@
+"""
+Logo ingestion: validates an uploaded image, stores the original once and
+derives pre-sized variants for PDFs and the UI.
+
+The upload is streamed to a temporary file in chunks instead of being
+buffered in memory; JPEGs are decoded at a reduced scale via
+Image.draft, so a multi-megabyte photo never gets fully decoded. Variants are
+recorded on the original's asset, so uploading the same image again reuses
+them without decoding anything.
+"""
+import io
+import os
+import tempfile
+from flask import current_app
+from PIL import Image, ImageOps
+from services.storage_service import get_asset_collection, get_storage_backend, store_file, local_copy, claim_assets
+
+# Accepted Pillow formats and the extension the original is stored under
+ALLOWED_FORMATS = {"PNG": ".png", "JPEG": ".jpg", "GIF": ".gif", "WEBP": ".webp"}
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# name -> max (width, height) in pixels; pdf is 2 x 0.67 inches at 300 dpi
+LOGO_VARIANTS = {
+    "pdf": (600, 200),
+    "ui": (320, 320),
+    "thumb": (64, 64),
+}
+PDF_LOGO_DPI = 300
+
+class InvalidLogoError(ValueError):
+    pass
+
+def _spec_key(name):
+    width, height = LOGO_VARIANTS[name]
+    return f"{name}-{width}x{height}"
+
+def _save_stream(stream, max_bytes):
+    """Copies an upload stream to a temporary file, enforcing the size limit. Returns the path."""
+    fd, path = tempfile.mkstemp(prefix="logo_")
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for chunk in iter(lambda: stream.read(STREAM_CHUNK_SIZE), b""):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise InvalidLogoError(f"Logo is larger than {max_bytes // (1024 * 1024)} MB")
+                out.write(chunk)
+        if size == 0:
+            raise InvalidLogoError("Logo file is empty")
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+def _open_image(path, max_pixels):
+    """Opens and validates an image without decoding its pixel data."""
+    try:
+        with Image.open(path) as image:
+            image.verify()
+        image = Image.open(path) # verify() leaves the image unusable, so reopen it
+    except Exception:
+        raise InvalidLogoError("Logo is not a valid image")
+    if image.format not in ALLOWED_FORMATS:
+        image.close()
+        raise InvalidLogoError(f"Unsupported logo format; use one of {', '.join(sorted(ALLOWED_FORMATS))}")
+    if image.width * image.height > max_pixels:
+        image.close()
+        raise InvalidLogoError("Logo dimensions are too large")
+    return image
+
+def _make_variants(image):
+    """Yields (name, png_bytes, width, height) for each variant."""
+    largest = (max(w for w, _ in LOGO_VARIANTS.values()), max(h for _, h in LOGO_VARIANTS.values()))
+    # Lets the JPEG decoder skip straight to a scale (1/2, 1/4, 1/8) at least as large as needed
+    image.draft("RGB", largest)
+    image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info)
+    image = image.convert("RGBA" if has_alpha else "RGB")
+
+    for name, size in LOGO_VARIANTS.items():
+        variant = image.copy()
+        variant.thumbnail(size, Image.LANCZOS) # Keeps the aspect ratio and never upscales
+        buffer = io.BytesIO()
+        variant.save(buffer, format="PNG", optimize=True)
+        yield name, buffer.getvalue(), variant.width, variant.height
+
+def _store_variant(folder, data):
+    fd, path = tempfile.mkstemp(suffix=".png")
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            out.write(data)
+        return store_file(path, folder)
+    finally:
+        os.remove(path)
+
+def ingest_logo(stream, owner):
+    """
+    Stores an uploaded logo and its variants, owned by owner (the previous logo's
+    files are released). Returns the logo record saved in
+    business_settings.logo: {"sha256", "original_url", "variants": {name: {"url", "sha256", "width", "height"}}}.
+    Raises InvalidLogoError for uploads that are not acceptable images.
+    """
+    config = current_app.config
+    path = _save_stream(stream, config['LOGO_MAX_UPLOAD_BYTES'])
+    try:
+        image = _open_image(path, config['LOGO_MAX_PIXELS'])
+        with image:
+            # The extension gives the stored original its key suffix and content type
+            original_path = path + ALLOWED_FORMATS[image.format]
+            os.replace(path, original_path)
+            path = original_path
+            original = store_file(path, "logos/originals")
+            cached = original.get("variants") or {}
+            if all(_spec_key(name) in cached for name in LOGO_VARIANTS):
+                variants = {name: cached[_spec_key(name)] for name in LOGO_VARIANTS}
+            else:
+                variants = {}
+                for name, data, width, height in _make_variants(image):
+                    asset = _store_variant("logos", data)
+                    variants[name] = {"url": asset["url"], "sha256": asset["sha256"], "width": width, "height": height}
+                get_asset_collection().update_one(
+                    {"_id": original["_id"]},
+                    {"$set": {f"variants.{_spec_key(name)}": variant for name, variant in variants.items()}}
+                )
+    finally:
+        os.remove(path)
+
+    owned = get_asset_collection().find(
+        {"sha256": {"$in": [original["sha256"]] + [v["sha256"] for v in variants.values()]}, "backend": original["backend"]},
+        {"_id": 1}
+    )
+    claim_assets(owner, [asset["_id"] for asset in owned])
+    return {"sha256": original["sha256"], "original_url": original["url"], "variants": variants}
+
+def get_pdf_logo(business_settings):
+    """
+    Returns (path, width_points, height_points) of the PDF logo variant from a
+    local copy of the stored file, or None if there is none or it cannot be fetched.
+    """
+    variant = ((business_settings or {}).get("logo") or {}).get("variants", {}).get("pdf")
+    if not variant:
+        return None
+    try:
+        asset = get_asset_collection().find_one({"sha256": variant["sha256"], "backend": get_storage_backend().name})
+        if not asset:
+            return None
+        path = local_copy(asset)
+    except Exception:
+        # A missing logo should not stop the PDF from rendering
+        return None
+    scale = 72 / PDF_LOGO_DPI
+    return path, variant["width"] * scale, variant["height"] * scale
@@ -0,0 +1,286 @@
+"""
+Markdown -> ReportLab flowables for AI-drafted documents.
+
+Content is split into sections at headings. Each section is parsed into a
+small block AST (headings, paragraphs, lists, tables, code, quotes, rules)
+and rendered into flowables. Both steps are cached by the SHA-1 of the
+section text, so re-rendering a long contract after a small edit only
+parses and builds the sections that actually changed; ReportLab still lays
+out the whole document.
+"""
+import copy
+import hashlib
+import re
+from xml.sax.saxutils import escape
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT
+from reportlab.platypus import Paragraph, Spacer, Table, TableStyle, Preformatted, HRFlowable
+from utils.cache import TTLCache
+
+# Bump when the rendering below changes, so cached flowables are not reused
+RENDER_VERSION = 1
+
+_section_cache = TTLCache("markdown_sections", maxsize=4096, ttl=24 * 3600)
+_flowable_cache = TTLCache("markdown_flowables", maxsize=4096, ttl=24 * 3600)
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+_HR = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+_LIST_ITEM = re.compile(r"^(\s*)([-*+]|\d+[.)])\s+(.*)$")
+_TABLE_DIVIDER = re.compile(r"^\s*\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?\s*$")
+_QUOTE = re.compile(r"^\s*>\s?(.*)$")
+
+# --- Sections ---
+
+def split_sections(content):
+    """Splits Markdown into sections, each starting at a heading (headings inside code fences don't count)."""
+    sections = []
+    current = []
+    in_fence = False
+    for line in (content or "").splitlines():
+        if _FENCE.match(line):
+            in_fence = not in_fence
+        elif not in_fence and _HEADING.match(line) and current:
+            sections.append("\n".join(current))
+            current = []
+        current.append(line)
+    if current:
+        sections.append("\n".join(current))
+    return sections
+
+def section_key(section):
+    return hashlib.sha1(section.encode("utf-8")).hexdigest()
+
+# --- Block parser ---
+
+def _split_row(line):
+    line = line.strip()
+    if line.startswith("|"):
+        line = line[1:]
+    if line.endswith("|") and not line.endswith("\\|"):
+        line = line[:-1]
+    return [cell.strip().replace("\\|", "|") for cell in re.split(r"(?<!\\)\|", line)]
+
+def _column_alignments(divider):
+    alignments = []
+    for cell in _split_row(divider):
+        if cell.startswith(":") and cell.endswith(":"):
+            alignments.append("CENTER")
+        elif cell.endswith(":"):
+            alignments.append("RIGHT")
+        else:
+            alignments.append("LEFT")
+    return alignments
+
+def parse_blocks(text):
+    """
+    Parses one section into a list of block tuples:
+    ('heading', level, text), ('paragraph', text), ('list', [(depth, ordered, marker, text)]),
+    ('table', header, alignments, rows), ('code', text), ('quote', text), ('hr',).
+    """
+    lines = text.splitlines()
+    blocks = []
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        stripped = line.strip()
+
+        if not stripped:
+            i += 1
+            continue
+
+        if _FENCE.match(line):
+            fence = _FENCE.match(line).group(1)
+            code = []
+            i += 1
+            while i < len(lines) and not lines[i].strip().startswith(fence):
+                code.append(lines[i])
+                i += 1
+            blocks.append(("code", "\n".join(code)))
+            i += 1
+            continue
+
+        heading = _HEADING.match(line)
+        if heading:
+            blocks.append(("heading", len(heading.group(1)), heading.group(2)))
+            i += 1
+            continue
+
+        if _HR.match(line):
+            blocks.append(("hr",))
+            i += 1
+            continue
+
+        if "|" in line and i + 1 < len(lines) and _TABLE_DIVIDER.match(lines[i + 1]):
+            header = _split_row(line)
+            alignments = _column_alignments(lines[i + 1])
+            rows = []
+            i += 2
+            while i < len(lines) and lines[i].strip() and "|" in lines[i]:
+                rows.append(_split_row(lines[i]))
+                i += 1
+            blocks.append(("table", header, alignments, rows))
+            continue
+
+        if _LIST_ITEM.match(line):
+            items = []
+            while i < len(lines):
+                item = _LIST_ITEM.match(lines[i])
+                if item:
+                    indent, marker, item_text = item.groups()
+                    depth = len(indent.replace("\t", "    ")) // 2
+                    items.append([depth, marker[0].isdigit(), marker, item_text])
+                elif lines[i].strip() and items and lines[i].startswith((" ", "\t")):
+                    items[-1][3] += " " + lines[i].strip() # Continuation line of the previous item
+                else:
+                    break
+                i += 1
+            blocks.append(("list", [tuple(item) for item in items]))
+            continue
+
+        if _QUOTE.match(line):
+            quoted = []
+            while i < len(lines) and _QUOTE.match(lines[i]):
+                quoted.append(_QUOTE.match(lines[i]).group(1))
+                i += 1
+            blocks.append(("quote", " ".join(q.strip() for q in quoted if q.strip())))
+            continue
+
+        paragraph = []
+        while i < len(lines):
+            current = lines[i]
+            if (not current.strip() or _HEADING.match(current) or _FENCE.match(current) or _HR.match(current)
+                    or _LIST_ITEM.match(current) or _QUOTE.match(current)
+                    or ("|" in current and i + 1 < len(lines) and _TABLE_DIVIDER.match(lines[i + 1]))):
+                break
+            # Two trailing spaces are a Markdown hard line break
+            paragraph.append(current.strip() + ("<br/>" if current.endswith("  ") else ""))
+            i += 1
+        blocks.append(("paragraph", " ".join(paragraph)))
+
+    return blocks
+
+def get_section_blocks(section):
+    """Returns the parsed blocks of a section, from the cache when the same text was parsed before."""
+    return _section_cache.get_or_load(section_key(section), lambda: parse_blocks(section))
+
+# --- Inline formatting ---
+
+_INLINE_CODE = re.compile(r"`([^`]+)`")
+_LINK = re.compile(r"\[([^\]]+)\]\(([^)\s]+)\)")
+_BOLD = re.compile(r"(\*\*|__)(?=\S)(.+?)(?<=\S)\1")
+_ITALIC = re.compile(r"(?<![\w*])([*_])(?=\S)(.+?)(?<=\S)\1(?![\w*])")
+_STRIKE = re.compile(r"~~(?=\S)(.+?)(?<=\S)~~")
+
+def inline_markup(text):
+    """Converts inline Markdown to ReportLab paragraph markup, escaping everything else."""
+    placeholders = []
+
+    def protect(markup):
+        placeholders.append(markup)
+        return f"\x00{len(placeholders) - 1}\x00"
+
+    # Hard breaks produced by the block parser survive escaping
+    text = text.replace("<br/>", "\x01")
+    text = _INLINE_CODE.sub(lambda m: protect(f'<font face="Courier">{escape(m.group(1))}</font>'), text)
+    text = _LINK.sub(lambda m: protect(
+        f'<link href="{escape(m.group(2), {chr(34): "&quot;"})}" color="blue"><u>{escape(m.group(1))}</u></link>'
+    ), text)
+    text = escape(text)
+    text = _BOLD.sub(r"<b>\2</b>", text)
+    text = _ITALIC.sub(r"<i>\2</i>", text)
+    text = _STRIKE.sub(r"<strike>\1</strike>", text)
+    text = text.replace("\x01", "<br/>")
+    return re.sub(r"\x00(\d+)\x00", lambda m: placeholders[int(m.group(1))], text)
+
+# --- Rendering ---
+
+_ALIGN = {"LEFT": TA_LEFT, "CENTER": TA_CENTER, "RIGHT": TA_RIGHT}
+
+def _heading_style(level, styles):
+    return styles['Heading2'] if level <= 2 else styles['Heading3']
+
+def _table_entry(header, alignments, rows, styles):
+    """Table cells as Paragraphs (so long text wraps); the Table itself is built per render."""
+    width = max([len(header)] + [len(r) for r in rows])
+    cell_style = styles['TableCell']
+
+    def cells(values, bold=False):
+        values = list(values) + [""] * (width - len(values))
+        out = []
+        for index, value in enumerate(values):
+            markup = inline_markup(value)
+            style = cell_style
+            align = alignments[index] if index < len(alignments) else "LEFT"
+            if align != "LEFT":
+                style = copy.copy(cell_style)
+                style.alignment = _ALIGN[align]
+            out.append(Paragraph(f"<b>{markup}</b>" if bold else markup, style))
+        return out
+
+    return ("table", [cells(header, bold=True)] + [cells(r) for r in rows])
+
+def render_blocks(blocks, styles):
+    """Renders parsed blocks into cache entries: ('flowable', prototype) or ('table', cell rows)."""
+    entries = []
+    for block in blocks:
+        kind = block[0]
+        if kind == "heading":
+            entries.append(("flowable", Paragraph(inline_markup(block[2]), _heading_style(block[1], styles))))
+        elif kind == "paragraph":
+            entries.append(("flowable", Paragraph(inline_markup(block[1]), styles['BodyText'])))
+        elif kind == "list":
+            counters = {}
+            for depth, ordered, marker, text in block[1]:
+                counters[depth] = counters.get(depth, 0) + 1
+                for deeper in [d for d in counters if d > depth]:
+                    del counters[deeper]
+                bullet = f"{counters[depth]}." if ordered else "•"
+                style = copy.copy(styles['ListItem'])
+                style.leftIndent = 18 * (depth + 1)
+                style.bulletIndent = 18 * depth + 6
+                entries.append(("flowable", Paragraph(inline_markup(text), style, bulletText=bullet)))
+        elif kind == "table":
+            entries.append(_table_entry(block[1], block[2], block[3], styles))
+        elif kind == "code":
+            entries.append(("flowable", Preformatted(block[1], styles['Code'])))
+        elif kind == "quote":
+            entries.append(("flowable", Paragraph(inline_markup(block[1]), styles['Quote'])))
+        elif kind == "hr":
+            entries.append(("flowable", HRFlowable(width="100%", thickness=0.5, color=colors.grey, spaceBefore=6, spaceAfter=6)))
+    return entries
+
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('TOPPADDING', (0, 0), (-1, -1), 4),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+])
+
+def _materialize(entry, available_width):
+    """
+    Turns a cached entry into a fresh flowable. Layout state (wrap/split) lives on
+    the flowable, so cached prototypes are copied rather than shared between builds.
+    """
+    kind, value = entry
+    if kind == "table":
+        rows = [[copy.copy(cell) for cell in row] for row in value]
+        column_width = available_width / len(rows[0])
+        table = Table(rows, colWidths=[column_width] * len(rows[0]), repeatRows=1, hAlign='LEFT')
+        table.setStyle(TABLE_STYLE)
+        return table
+    return copy.copy(value)
+
+def markdown_to_flowables(content, styles, available_width):
+    """Converts Markdown content to flowables, reusing cached work for unchanged sections."""
+    story = []
+    for section in split_sections(content):
+        key = (section_key(section), RENDER_VERSION)
+        entries = _flowable_cache.get(key)
+        if entries is None:
+            entries = render_blocks(get_section_blocks(section), styles)
+            _flowable_cache.set(key, entries)
+        story.extend(_materialize(entry, available_width) for entry in entries)
+        story.append(Spacer(1, 4))
+    return story
@@ -1,55 +1,206 @@
+import threading
+import httpx
 from openai import OpenAI
 from flask import current_app
+from services.llm_cache import make_cache_key, get_cached_response, store_response
+from services.prompt_templates import build_document_prompt
+from services.system_settings_service import get_openai_model
+from utils.rate_limiter import ConcurrencyLimiter
+
+DRAFT_TEMPERATURE = 0.7
+# generate_document_draft returns the API error as text starting with this, instead of raising
+DRAFT_ERROR_PREFIX = "Error generating document draft"
+
+_client = None
+_limiter = None
+_init_lock = threading.Lock()
+
+class GenerationBusyError(Exception):
+    """Raised when every generation slot is taken and the wait queue is full."""
+    def __init__(self, retry_after):
+        super().__init__("Too many document generations in progress")
+        self.retry_after = retry_after
 
 def init_openai_client():
-    """Initializes the OpenAI client."""
-    # The client automatically uses the OPENAI_API_KEY environment variable
-    # which is set in the sandbox environment.
-    return OpenAI()
+    """
+    Returns the process-wide OpenAI client. It is built once, so its HTTP
+    connection pool (sized to the generation cap) is kept alive across drafts.
+    The API key falls back to the OPENAI_API_KEY environment variable and
+    OPENAI_BASE_URL can point at a local OpenAI-compatible server.
+    """
+    global _client
+    with _init_lock:
+        if _client is None:
+            config = current_app.config
+            _client = OpenAI(
+                api_key=config['OPENAI_API_KEY'],
+                base_url=config['OPENAI_BASE_URL'],
+                max_retries=config['OPENAI_MAX_RETRIES'],
+                timeout=httpx.Timeout(config['OPENAI_READ_TIMEOUT'], connect=config['OPENAI_CONNECT_TIMEOUT']),
+                http_client=httpx.Client(limits=httpx.Limits(
+                    max_connections=config['OPENAI_MAX_CONCURRENT'],
+                    max_keepalive_connections=config['OPENAI_MAX_CONCURRENT']
+                ))
+            )
+    return _client
 
-def generate_document_draft(doc_type, client_info, project_info, custom_details):
-    """Generates a document draft using the OpenAI API."""
-    client = init_openai_client()
-    
-    system_prompt = (
-        "You are an expert freelance business assistant. Your task is to draft professional business documents "
-        "based on the provided type and details. The output must be the full text of the document, "
-        "formatted nicely with Markdown, ready to be converted into a PDF. Do not include any conversational "
-        "text, preambles, or explanations. Just the document content."
-    )
-    
-    user_prompt = f"""
-    Draft a **{doc_type}** document.
-    
-    **Client Information:**
-    - Name: {client_info.get('name')}
-    - Company: {client_info.get('company')}
-    - Email: {client_info.get('email')}
+def _get_limiter():
+    global _limiter
+    with _init_lock:
+        if _limiter is None:
+            config = current_app.config
+            _limiter = ConcurrencyLimiter(
+                config['OPENAI_MAX_CONCURRENT'],
+                max_queued=config['OPENAI_MAX_QUEUED'],
+                queue_timeout=config['OPENAI_QUEUE_TIMEOUT']
+            )
+    return _limiter
+
+class GenerationSlot:
+    """One in-flight generation. release() is idempotent, so it is safe in several cleanup paths."""
+
+    def __init__(self, limiter):
+        self._limiter = limiter
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self):
+        with self._lock:
+            if not self._released:
+                self._released = True
+                self._limiter.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+def acquire_generation_slot():
+    """Waits for a generation slot; raises GenerationBusyError when the queue is full or the wait times out."""
+    limiter = _get_limiter()
+    if not limiter.acquire():
+        raise GenerationBusyError(current_app.config['OPENAI_RETRY_AFTER_SECONDS'])
+    return GenerationSlot(limiter)
+
+def _draft_cache_key(model, messages, max_tokens):
+    return make_cache_key(model, messages, temperature=DRAFT_TEMPERATURE, max_tokens=max_tokens)
+
+def _cache_enabled(use_cache):
+    return use_cache and current_app.config['LLM_CACHE_ENABLED']
+
+def _cached_draft(cache_key):
+    """Looks a draft up in the response cache; a cache failure counts as a miss."""
+    try:
+        return get_cached_response(cache_key)
+    except Exception as e:
+        current_app.logger.warning(f"Could not read the document draft cache: {e}")
+        return None
+
+def _cache_draft(cache_key, model, content):
+    """Stores a finished draft in the response cache; a cache failure never fails the (already billed) draft."""
+    try:
+        store_response(cache_key, model, content)
+    except Exception as e:
+        current_app.logger.warning(f"Could not cache document draft: {e}")
+
+def generate_document_draft(doc_type, client_info, project_info, custom_details, business_info=None, use_cache=True):
+    """
+    Generates a document draft using the OpenAI API. Identical prompts are served
+    from the response cache; use_cache=False forces a fresh draft (which then
+    replaces the cached one). Raises GenerationBusyError when at capacity.
+    """
+    model = get_openai_model()
+    messages, max_tokens = build_document_prompt(doc_type, client_info, project_info, custom_details, business_info)
+    cache_key = _draft_cache_key(model, messages, max_tokens)
+    if _cache_enabled(use_cache):
+        cached = _cached_draft(cache_key)
+        if cached is not None:
+            return cached
     
-    **Project Information:**
-    - Title: {project_info.get('title')}
-    - Description: {project_info.get('description')}
-    - Budget: {project_info.get('budget')}
-    - Timeline: {project_info.get('start_date')} to {project_info.get('end_date')}
+    client = init_openai_client()
     
-    **Custom Details/Instructions:**
-    {custom_details}
+    with acquire_generation_slot():
+        try:
+            response = client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=DRAFT_TEMPERATURE,
+                max_tokens=max_tokens,
+            )
+            content = response.choices[0].message.content
+            
+        except Exception as e:
+            current_app.logger.error(f"OpenAI API error: {e}")
+            return f"{DRAFT_ERROR_PREFIX}: {e}"
     
-    Ensure the document is comprehensive and professional.
+    if current_app.config['LLM_CACHE_ENABLED'] and content:
+        _cache_draft(cache_key, model, content)
+    return content
+
+class DraftStream:
+    """
+    Iterable of text fragments from a streamed draft (or a single cached draft).
+    Holds a generation slot until the stream is exhausted or close() is called;
+    the draft is cached only when the stream completes.
+    """
+
+    def __init__(self, stream=None, slot=None, model=None, cache_key=None, cached=None):
+        self.stream = stream
+        self.slot = slot
+        self.model = model
+        self.cache_key = cache_key
+        self.cached = cached
+
+    def __iter__(self):
+        if self.cached is not None:
+            yield self.cached
+            return
+        parts = []
+        try:
+            for chunk in self.stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+        finally:
+            self.close()
+        
+        if current_app.config['LLM_CACHE_ENABLED'] and parts:
+            _cache_draft(self.cache_key, self.model, "".join(parts))
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.close()
+        if self.slot is not None:
+            self.slot.release()
+
+def open_document_draft_stream(doc_type, client_info, project_info, custom_details, business_info=None, use_cache=True):
+    """
+    Starts a streamed draft and returns a DraftStream. Everything that can fail
+    fast (capacity, connecting, the API rejecting the request) happens here,
+    before any bytes are sent to the browser. Raises GenerationBusyError when
+    at capacity; errors after this point propagate from iteration.
     """
+    model = get_openai_model()
+    messages, max_tokens = build_document_prompt(doc_type, client_info, project_info, custom_details, business_info)
+    cache_key = _draft_cache_key(model, messages, max_tokens)
+    if _cache_enabled(use_cache):
+        cached = _cached_draft(cache_key)
+        if cached is not None:
+            return DraftStream(cached=cached)
     
+    client = init_openai_client()
+    
+    slot = acquire_generation_slot()
     try:
-        response = client.chat.completions.create(
-            model="gemini-2.5-flash", # Using the available model
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.7,
+        stream = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=DRAFT_TEMPERATURE,
+            max_tokens=max_tokens,
+            stream=True,
         )
-        
-        return response.choices[0].message.content
-        
-    except Exception as e:
-        current_app.logger.error(f"OpenAI API error: {e}")
-        return f"Error generating document draft: {e}"
+    except Exception:
+        slot.release()
+        raise
+    return DraftStream(stream, slot, model, cache_key)
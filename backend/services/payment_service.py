@@ -0,0 +1,111 @@
+from flask import current_app
+from pymongo import UpdateOne
+from bson.objectid import ObjectId
+from datetime import datetime
+from models.payment_model import Payment
+from utils.currency import from_minor_units
+
+# Amounts are floats in major units; anything within half a cent counts as settled
+AMOUNT_TOLERANCE = 0.005
+
+def get_payment_collection():
+    return current_app.db.payments
+
+def build_payment(invoice, amount, currency, method, source, reference=None, fee=None, paid_at=None):
+    """Builds a ledger row for an invoice document."""
+    return Payment(
+        user_id=invoice['user_id'],
+        invoice_id=invoice['_id'],
+        amount=amount,
+        currency=(currency or invoice.get('currency') or '').upper(),
+        method=method,
+        source=source,
+        reference=reference,
+        fee=fee,
+        invoice_number=invoice.get('invoice_number'),
+        client_id=invoice.get('client_id'),
+        paid_at=paid_at
+    )
+
+def checkout_session_paid_at(session):
+    """
+    When a checkout session was paid: the creation time of its PaymentIntent if
+    the session was fetched with it expanded, else None. The session's own
+    created time is when checkout started, not when the customer paid.
+    """
+    payment_intent = session.get('payment_intent')
+    if isinstance(payment_intent, dict) and payment_intent.get('created'):
+        return datetime.utcfromtimestamp(payment_intent['created'])
+    return None
+
+def build_checkout_session_payment(invoice, session, paid_at=None):
+    """
+    Builds the ledger row for a completed Stripe checkout session, paid at
+    paid_at (e.g. the checkout.session.completed event time) if given.
+    Checkout sessions do not carry the Stripe fee; it lives on the balance transaction.
+    """
+    return build_payment(
+        invoice,
+        amount=from_minor_units(session.get('amount_total') or 0, session.get('currency')),
+        currency=session.get('currency'),
+        method=(session.get('payment_method_types') or ['card'])[0],
+        source='stripe',
+        reference=session.get('id'),
+        paid_at=paid_at or checkout_session_paid_at(session)
+    )
+
+def _ledger_key(payment):
+    return {"source": payment.source, "reference": payment.reference}
+
+def payment_upsert(payment: Payment):
+    """
+    Returns an UpdateOne that inserts the payment unless (source, reference) is
+    already in the ledger, so replaying a provider event never double-counts.
+    """
+    return UpdateOne(_ledger_key(payment), {"$setOnInsert": payment.__dict__}, upsert=True)
+
+def record_payment(payment: Payment):
+    """Writes one payment to the ledger (idempotently when it has a reference) and returns it."""
+    if payment.reference is None:
+        get_payment_collection().insert_one(payment.__dict__)
+    else:
+        get_payment_collection().update_one(_ledger_key(payment), {"$setOnInsert": payment.__dict__}, upsert=True)
+    return payment
+
+def get_paid_totals(invoice_ids):
+    """Returns {invoice_id: sum of ledger payments} for several invoices in one aggregation."""
+    pipeline = [
+        {"$match": {"invoice_id": {"$in": [ObjectId(i) for i in invoice_ids]}}},
+        {"$group": {"_id": "$invoice_id", "total": {"$sum": "$amount"}}}
+    ]
+    return {row['_id']: row['total'] for row in get_payment_collection().aggregate(pipeline)}
+
+def get_paid_total(invoice_id):
+    """Returns the sum of all ledger payments recorded against an invoice."""
+    return get_paid_totals([invoice_id]).get(ObjectId(invoice_id), 0)
+
+def covers_total(invoice, paid_total):
+    """True once paid_total settles the invoice (partial payments leave it open)."""
+    return paid_total + AMOUNT_TOLERANCE >= (invoice.get('total_amount') or 0)
+
+def is_fully_paid(invoice):
+    """True once the ledger covers the invoice total."""
+    return covers_total(invoice, get_paid_total(invoice['_id']))
+
+def record_manual_payment(invoice):
+    """
+    Records the outstanding balance of an invoice that was marked Paid by hand
+    (e.g., a bank transfer), so the ledger stays complete for revenue reports.
+    """
+    outstanding = round((invoice.get('total_amount') or 0) - get_paid_total(invoice['_id']), 2)
+    if outstanding <= 0:
+        return None
+    return record_payment(build_payment(
+        invoice,
+        amount=outstanding,
+        currency=invoice.get('currency'),
+        method='manual',
+        source='manual',
+        reference=str(invoice['_id']),
+        paid_at=datetime.utcnow()
+    ))
@@ -1,29 +1,75 @@
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
 from reportlab.lib import colors
 from models.invoice_model import Invoice
 from models.document_model import Document
 from datetime import datetime
+from utils.date_utils import format_date
+from services.markdown_pdf import markdown_to_flowables
+from services.logo_service import get_pdf_logo
+from xml.sax.saxutils import escape
 import os
 
 # --- PDF Generation Utilities ---
 
+# PDFs are built with invariant=True (fixed creation date and document ID), so the same
+# content always produces the same bytes and storage can deduplicate re-rendered files.
+
+_styles = None
+
 def get_styles():
-    styles = getSampleStyleSheet()
-    styles.add(ParagraphStyle(name='TitleStyle', fontSize=24, leading=30, alignment=1))
-    styles.add(ParagraphStyle(name='Heading2', fontSize=14, leading=18, spaceBefore=12, spaceAfter=6))
-    styles.add(ParagraphStyle(name='BodyText', fontSize=10, leading=12))
-    return styles
+    """Returns the shared stylesheet (built once; the Markdown renderer caches flowables that use it)."""
+    global _styles
+    if _styles is None:
+        styles = getSampleStyleSheet()
+        styles.add(ParagraphStyle(name='TitleStyle', fontSize=24, leading=30, alignment=1))
+        # Heading2 and BodyText already exist in the sample stylesheet, so adjust them instead of adding
+        for name, attrs in (('Heading2', dict(fontSize=14, leading=18, spaceBefore=12, spaceAfter=6)),
+                            ('Heading3', dict(fontSize=12, leading=15, spaceBefore=10, spaceAfter=4)),
+                            ('BodyText', dict(fontSize=10, leading=13, spaceAfter=6)),
+                            ('Code', dict(fontSize=8.5, leading=10.5, backColor=colors.whitesmoke, borderPadding=4, spaceBefore=4, spaceAfter=8))):
+            for attr, value in attrs.items():
+                setattr(styles[name], attr, value)
+        styles.add(ParagraphStyle(name='ListItem', parent=styles['BodyText'], spaceAfter=2))
+        styles.add(ParagraphStyle(name='TableCell', parent=styles['BodyText'], fontSize=9, leading=11, spaceAfter=0))
+        styles.add(ParagraphStyle(name='Quote', parent=styles['BodyText'], leftIndent=18, textColor=colors.HexColor('#444444'), fontName='Helvetica-Oblique'))
+        _styles = styles
+    return _styles
 
-def generate_invoice_pdf(invoice: Invoice):
+def build_branding_header(business_settings, styles):
+    """Builds the sender block (logo, company name, address, contact) from the user's business settings."""
+    if not business_settings:
+        return []
+    flowables = []
+    # The pre-sized PDF variant of the logo, read from the local cache
+    logo = get_pdf_logo(business_settings)
+    if logo:
+        path, width, height = logo
+        flowables.append(Image(path, width=width, height=height, hAlign='LEFT'))
+        flowables.append(Spacer(1, 0.1 * 72))
+    if business_settings.get('company_name'):
+        flowables.append(Paragraph(business_settings['company_name'], styles['Heading2']))
+    for field in ('address', 'phone', 'tax_id'):
+        value = business_settings.get(field)
+        if value:
+            label = 'Tax ID: ' if field == 'tax_id' else ''
+            flowables.append(Paragraph(f"{label}{value}", styles['BodyText']))
+    if flowables:
+        flowables.append(Spacer(1, 0.25 * 72))
+    return flowables
+
+def generate_invoice_pdf(invoice: Invoice, business_settings=None):
     """Generates a PDF for an invoice and saves it to a temporary file."""
     temp_file_path = f"/tmp/invoice_{str(invoice._id)}.pdf"
-    doc = SimpleDocTemplate(temp_file_path, pagesize=letter)
+    doc = SimpleDocTemplate(temp_file_path, pagesize=letter, invariant=True)
     styles = get_styles()
     story = []
 
+    # Sender branding
+    story.extend(build_branding_header(business_settings, styles))
+
     # Title
     story.append(Paragraph(f"INVOICE #{invoice.invoice_number}", styles['TitleStyle']))
     story.append(Spacer(1, 0.5 * 72)) # 0.5 inch spacer
@@ -31,8 +77,8 @@ def generate_invoice_pdf(invoice: Invoice):
     # Invoice Details Table (Placeholder for client/user info)
     # In a real app, you'd fetch user and client details here
     data = [
-        ['Issue Date:', invoice.issue_date],
-        ['Due Date:', invoice.due_date],
+        ['Issue Date:', format_date(invoice.issue_date) or 'N/A'],
+        ['Due Date:', format_date(invoice.due_date) or 'N/A'],
         ['Status:', invoice.status],
         ['Client ID:', str(invoice.client_id)],
         ['Project ID:', str(invoice.project_id) if invoice.project_id else 'N/A'],
@@ -82,27 +128,18 @@ def generate_invoice_pdf(invoice: Invoice):
 def generate_document_pdf(document: Document):
     """Generates a PDF for a general document (e.g., proposal, contract) from Markdown content."""
     temp_file_path = f"/tmp/document_{str(document._id)}.pdf"
-    doc = SimpleDocTemplate(temp_file_path, pagesize=letter)
+    doc = SimpleDocTemplate(temp_file_path, pagesize=letter, invariant=True)
     styles = get_styles()
     story = []
 
     # Title
-    story.append(Paragraph(document.title, styles['TitleStyle']))
+    story.append(Paragraph(escape(document.title or ''), styles['TitleStyle']))
     story.append(Spacer(1, 0.25 * 72))
-    story.append(Paragraph(f"Document Type: {document.doc_type}", styles['Heading2']))
+    story.append(Paragraph(f"Document Type: {escape(document.doc_type or '')}", styles['Heading2']))
     story.append(Spacer(1, 0.25 * 72))
 
-    # Content (Assuming content is Markdown/simple text)
-    # Note: ReportLab does not natively support full Markdown. 
-    # We'll convert simple paragraphs for display.
-    content_lines = document.content.split('\n')
-    for line in content_lines:
-        if line.strip().startswith('#'):
-            # Simple heading detection
-            story.append(Paragraph(line.strip().lstrip('#').strip(), styles['Heading2']))
-        elif line.strip():
-            story.append(Paragraph(line.strip(), styles['BodyText']))
-        story.append(Spacer(1, 0.1 * 72))
+    # Content: Markdown rendered section by section; unchanged sections come from the cache
+    story.extend(markdown_to_flowables(document.content, styles, doc.width))
 
     doc.build(story)
     return temp_file_path
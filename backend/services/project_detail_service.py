@@ -0,0 +1,116 @@
+"""
+Project detail page in one database round trip: the project and its
+milestones, documents and invoices come from a single aggregation, each child
+list bounded and projected to what the page shows, with the full counts.
+
+Rows are serialized directly from the aggregation output (same fields and
+formats as the models' to_dict), without building model objects.
+"""
+from datetime import datetime
+from bson.objectid import ObjectId
+from flask import current_app
+from models.invoice_model import Invoice
+from models.project_model import Project, Milestone
+from utils.date_utils import parse_stored_datetime, format_date
+
+class ChildList:
+    """A child collection of the project: how it is sorted and which fields the page gets."""
+
+    def __init__(self, name, collection, sort, projection, date_fields):
+        self.name = name
+        self.collection = collection
+        self.sort = sort
+        self.projection = projection
+        self.date_fields = date_fields
+
+    def lookup(self, limit):
+        return {"$lookup": {
+            "from": self.collection,
+            "let": {"project_id": "$_id"},
+            "pipeline": [
+                # The equality match on project_id is served by the (project_id, sort field) index
+                {"$match": {"$expr": {"$eq": ["$project_id", "$$project_id"]}}},
+                {"$sort": self.sort},
+                {"$facet": {
+                    "items": [{"$limit": limit}, {"$project": self.projection}],
+                    "total": [{"$count": "count"}],
+                }},
+            ],
+            "as": self.name,
+        }}
+
+def fields(*names, **expressions):
+    """
+    A $project stage body that always emits the named fields, null when a
+    row lacks them (a plain inclusion would drop the key), like to_dict does.
+    """
+    projection = {name: {"$ifNull": [f"${name}", None]} for name in names}
+    projection.update(expressions)
+    return projection
+
+CHILD_LISTS = (
+    ChildList(
+        "milestones", "milestones", {"due_date": 1},
+        fields("project_id", "title", "due_date", "status", "notes", "calendar_event_id", "created_at", "updated_at"),
+        Milestone.DATE_FIELDS
+    ),
+    ChildList(
+        "documents", "documents", {"created_at": -1},
+        # The summary fields only; content can be large and is fetched per document
+        fields("user_id", "client_id", "project_id", "doc_type", "title", "excerpt", "pdf_url", "pdf_status",
+               "created_at", "updated_at",
+               revision={"$ifNull": ["$revision", 1]},
+               content_source={"$ifNull": ["$content_source", "ai_draft"]}),
+        ()
+    ),
+    ChildList(
+        "invoices", "invoices", {"issue_date": -1},
+        # Line items are left to the invoice detail endpoint; the list gets their count
+        fields("user_id", "client_id", "project_id", "invoice_number", "issue_date", "due_date", "status",
+               "total_amount", "currency", "pdf_url", "stripe_payment_link", "created_at", "updated_at",
+               item_count={"$size": {"$ifNull": ["$items", []]}}),
+        Invoice.DATE_FIELDS
+    ),
+)
+
+PROJECT_FIELDS = fields("user_id", "client_id", "title", "description", "status", "start_date", "end_date",
+                        "budget", "created_at", "updated_at")
+
+def serialize_row(row, date_fields=()):
+    """Turns an aggregation row into JSON-ready values: ObjectIds as strings, dates as the models format them."""
+    result = {}
+    for key, value in row.items():
+        if key in date_fields:
+            value = format_date(parse_stored_datetime(value))
+        elif isinstance(value, ObjectId):
+            value = str(value)
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        result[key] = value
+    return result
+
+def get_project_detail(user_id, project_id, limit=None):
+    """
+    Returns {"project", "milestones", "documents", "invoices", "counts"} for a
+    project of the user, or None if there is no such project. Each child list
+    holds at most `limit` rows (PROJECT_DETAIL_CHILD_LIMIT); counts are totals.
+    """
+    limit = limit or current_app.config['PROJECT_DETAIL_CHILD_LIMIT']
+    pipeline = [
+        {"$match": {"_id": ObjectId(project_id), "user_id": ObjectId(user_id)}},
+        {"$project": PROJECT_FIELDS},
+    ]
+    pipeline += [child.lookup(limit) for child in CHILD_LISTS]
+    rows = list(current_app.db.projects.aggregate(pipeline))
+    if not rows:
+        return None
+
+    project = rows[0]
+    detail = {"counts": {}}
+    for child in CHILD_LISTS:
+        facet = (project.pop(child.name) or [{}])[0]
+        detail[child.name] = [serialize_row(row, child.date_fields) for row in facet.get("items", [])]
+        total = facet.get("total")
+        detail["counts"][child.name] = total[0]["count"] if total else 0
+    detail["project"] = serialize_row(project, Project.DATE_FIELDS)
+    return detail
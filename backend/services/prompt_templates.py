@@ -0,0 +1,166 @@
+import math
+import re
+from string import Template
+from textwrap import dedent
+
+# Rough size estimate used for budgeting: English prose averages about four
+# characters per token for the models we use. Exact counts are not needed,
+# only a stable upper bound on prompt size.
+CHARS_PER_TOKEN = 4
+TRUNCATION_MARKER = " [...]"
+
+_WHITESPACE = re.compile(r"[ \t]+")
+
+SYSTEM_PROMPT = (
+    "You are an expert freelance business assistant. Your task is to draft professional business documents "
+    "based on the provided type and details. The output must be the full text of the document, "
+    "formatted nicely with Markdown, ready to be converted into a PDF. Do not include any conversational "
+    "text, preambles, or explanations. Just the document content."
+)
+
+def estimate_tokens(text):
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+def trim_to_tokens(text, max_tokens):
+    """Cuts text to roughly max_tokens at a word boundary, marking the cut."""
+    text = (text or "").strip()
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    limit = max(max_tokens * CHARS_PER_TOKEN - len(TRUNCATION_MARKER), 0)
+    cut = text[:limit]
+    if " " in cut:
+        cut = cut[:cut.rindex(" ")]
+    return cut.rstrip() + TRUNCATION_MARKER
+
+class PromptTemplate:
+    """
+    A document type's user prompt, compiled once at import. Free-form fields are
+    trimmed to per-field token limits, then the lowest-priority ones are shrunk
+    further until the whole prompt fits prompt_budget. max_tokens bounds the
+    completion, so both halves of a request have a predictable size.
+    """
+
+    # Free-form fields in the order they give up space when the prompt is over budget
+    TRIM_ORDER = ("custom_details", "project_description")
+
+    def __init__(self, doc_type, instructions, max_tokens, prompt_budget=1500, field_limits=None):
+        self.doc_type = doc_type
+        self.max_tokens = max_tokens
+        self.prompt_budget = prompt_budget
+        self.field_limits = {"doc_type": 20, "project_description": 300, "custom_details": 600, **(field_limits or {})}
+        self.template = Template(dedent("""
+            Draft a **$doc_type** document.
+
+            **Sender (Freelancer) Information:**
+            - Business Name: $company_name
+            - Address: $address
+
+            **Client Information:**
+            - Name: $client_name
+            - Company: $client_company
+            - Email: $client_email
+
+            **Project Information:**
+            - Title: $project_title
+            - Description: $project_description
+            - Budget: $project_budget
+            - Timeline: $start_date to $end_date
+
+            **Custom Details/Instructions:**
+            $custom_details
+
+            """).strip() + "\n\n" + dedent(instructions).strip())
+        # Fixed text is measured once; only the substituted fields vary per request
+        self.fixed_tokens = estimate_tokens(self.template.template) + estimate_tokens(SYSTEM_PROMPT)
+
+    def render(self, doc_type, client_info, project_info, custom_details, business_info=None):
+        """Returns the chat messages for this template, trimmed to the prompt budget."""
+        business_info = business_info or {}
+        fields = {
+            "doc_type": doc_type,
+            "company_name": business_info.get('company_name'),
+            "address": business_info.get('address'),
+            "client_name": client_info.get('name'),
+            "client_company": client_info.get('company'),
+            "client_email": client_info.get('email'),
+            "project_title": project_info.get('title'),
+            "project_description": project_info.get('description'),
+            "project_budget": project_info.get('budget'),
+            "start_date": project_info.get('start_date'),
+            "end_date": project_info.get('end_date'),
+            "custom_details": custom_details,
+        }
+        fields = {k: _WHITESPACE.sub(" ", str(v)).strip() if v is not None else "" for k, v in fields.items()}
+        for field, limit in self.field_limits.items():
+            fields[field] = trim_to_tokens(fields[field], limit)
+
+        excess = self.fixed_tokens + sum(estimate_tokens(v) for v in fields.values()) - self.prompt_budget
+        for field in self.TRIM_ORDER:
+            if excess <= 0:
+                break
+            current = estimate_tokens(fields[field])
+            allowed = max(current - excess, 0)
+            fields[field] = trim_to_tokens(fields[field], allowed) if allowed else ""
+            excess -= current - estimate_tokens(fields[field])
+
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": self.template.substitute(fields)}
+        ]
+
+# Doc types offered by the frontend (see Document.doc_type); completion limits
+# follow the typical length of each document.
+TEMPLATES = {t.doc_type: t for t in (
+    PromptTemplate("Project Proposal", """
+        Structure it as: overview, scope of work, deliverables, timeline, pricing and next steps.
+        Ensure the document is comprehensive and professional.
+        """, max_tokens=1800),
+    PromptTemplate("Contract Agreement", """
+        Include parties, scope, payment terms, timeline, intellectual property, confidentiality,
+        termination and signature blocks. Ensure the document is comprehensive and professional.
+        """, max_tokens=3000, prompt_budget=2000, field_limits={"custom_details": 1000}),
+    PromptTemplate("Invoice", """
+        Present the billable items as a Markdown table with totals, followed by payment instructions.
+        Keep it concise and professional.
+        """, max_tokens=800),
+    PromptTemplate("Business Letter", """
+        Write it as a formal letter with date, salutation, body and closing.
+        Keep it concise and professional.
+        """, max_tokens=700),
+    PromptTemplate("Price Quote", """
+        List the quoted items as a Markdown table with totals, validity period and terms.
+        Keep it concise and professional.
+        """, max_tokens=900),
+    PromptTemplate("Project Report", """
+        Cover progress against milestones, completed work, open issues, risks and next steps.
+        Ensure the document is comprehensive and professional.
+        """, max_tokens=1500),
+)}
+
+# Used for doc types without a dedicated template (the doc type is still named in the prompt)
+GENERIC_TEMPLATE = PromptTemplate(None, "Ensure the document is comprehensive and professional.", max_tokens=1500)
+
+# Short values the dashboard's document form sends (frontend/src/pages/Dashboard.jsx)
+DOC_TYPE_ALIASES = {
+    "proposal": "Project Proposal",
+    "contract": "Contract Agreement",
+    "invoice": "Invoice",
+    "letter": "Business Letter",
+    "quote": "Price Quote",
+    "report": "Project Report",
+}
+_DOC_TYPES_BY_KEY = {**{name.lower(): name for name in TEMPLATES}, **DOC_TYPE_ALIASES}
+
+def normalize_doc_type(doc_type):
+    """Maps 'proposal', 'project proposal' etc. to the template's doc type; unknown types are returned as given (stripped)."""
+    doc_type = (doc_type or "").strip()
+    return _DOC_TYPES_BY_KEY.get(doc_type.lower(), doc_type)
+
+def get_template(doc_type):
+    return TEMPLATES.get(normalize_doc_type(doc_type), GENERIC_TEMPLATE)
+
+def build_document_prompt(doc_type, client_info, project_info, custom_details, business_info=None):
+    """Returns (messages, max_tokens) for a document draft."""
+    doc_type = normalize_doc_type(doc_type)
+    template = get_template(doc_type)
+    return template.render(doc_type, client_info, project_info, custom_details, business_info), template.max_tokens
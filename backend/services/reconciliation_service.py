@@ -0,0 +1,150 @@
+import calendar
+from flask import current_app
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from datetime import datetime, timedelta
+from services.checkout_sources import get_checkout_source
+from services.payment_service import build_checkout_session_payment, payment_upsert, get_paid_totals, covers_total
+from services.stripe_event_service import build_paid_notification
+
+JOB_NAME = 'stripe_reconciliation'
+
+INVOICE_PROJECTION = {"user_id": 1, "client_id": 1, "invoice_number": 1, "total_amount": 1, "currency": 1,
+                      "status": 1, "stripe_session_id": 1}
+
+def get_job_state_collection():
+    return current_app.db.job_state
+
+def _load_watermark(now):
+    """Returns the creation time (Unix seconds) from which to scan checkout sessions."""
+    config = current_app.config
+    state = get_job_state_collection().find_one({"_id": JOB_NAME}) or {}
+    watermark = state.get('watermark')
+    if watermark is None:
+        watermark = calendar.timegm((now - timedelta(days=config['STRIPE_RECONCILE_LOOKBACK_DAYS'])).utctimetuple())
+    # Sessions stay open for up to 24h, so one created before the watermark can complete after it.
+    # Re-scanning that overlap is cheap because already-recorded sessions are skipped.
+    return watermark - config['STRIPE_RECONCILE_OVERLAP_HOURS'] * 3600
+
+def _metadata_invoice_id(session):
+    try:
+        invoice_id = (session.get('metadata') or {}).get('invoice_id')
+        return ObjectId(invoice_id) if invoice_id else None
+    except (InvalidId, TypeError):
+        return None
+
+def _match_invoices(sessions):
+    """
+    Maps session ID -> invoice document. Sessions are matched by metadata.invoice_id;
+    sessions without it fall back to the payment link stored on the invoice.
+    Both lookups are single $in queries per batch.
+    """
+    db = current_app.db
+    by_invoice_id = {}
+    by_link = {}
+    for session in sessions:
+        invoice_id = _metadata_invoice_id(session)
+        if invoice_id:
+            by_invoice_id[session['id']] = invoice_id
+        elif session.get('payment_link'):
+            by_link[session['id']] = session['payment_link']
+
+    invoices = {}
+    if by_invoice_id:
+        invoices.update({i['_id']: i for i in db.invoices.find({"_id": {"$in": list(by_invoice_id.values())}}, INVOICE_PROJECTION)})
+    link_invoices = {}
+    if by_link:
+        link_invoices = {i['stripe_session_id']: i for i in db.invoices.find(
+            {"stripe_session_id": {"$in": list(by_link.values())}}, INVOICE_PROJECTION
+        )}
+
+    matched = {}
+    for session_id, invoice_id in by_invoice_id.items():
+        if invoice_id in invoices:
+            matched[session_id] = invoices[invoice_id]
+    for session_id, link_id in by_link.items():
+        if link_id in link_invoices:
+            matched[session_id] = link_invoices[link_id]
+    return matched
+
+def _reconcile_batch(sessions, now, summary):
+    db = current_app.db
+    matched = _match_invoices(sessions)
+    summary['unmatched'] += len(sessions) - len(matched)
+    if not matched:
+        return
+
+    # Skip sessions the webhook path (or an earlier run) already recorded
+    recorded = set(db.payments.distinct("reference", {"source": "stripe", "reference": {"$in": list(matched)}}))
+    sessions_by_id = {s['id']: s for s in sessions}
+    missing = {session_id: invoice for session_id, invoice in matched.items() if session_id not in recorded}
+    if not missing:
+        return
+
+    db.payments.bulk_write(
+        [payment_upsert(build_checkout_session_payment(invoice, sessions_by_id[session_id]))
+         for session_id, invoice in missing.items()],
+        ordered=False
+    )
+    summary['payments_recorded'] += len(missing)
+
+    # Paid transitions for invoices the ledger now covers
+    invoices = {invoice['_id']: invoice for invoice in missing.values()}
+    paid_totals = get_paid_totals(list(invoices))
+    to_mark = [invoice for invoice_id, invoice in invoices.items()
+               if invoice.get('status') != 'Paid' and covers_total(invoice, paid_totals.get(invoice_id, 0))]
+    if not to_mark:
+        return
+
+    # One guarded update per invoice: the webhook processor may mark the same invoice
+    # Paid concurrently, and only the run that actually moves it may notify the owner.
+    notifications = []
+    for invoice in to_mark:
+        if not db.invoices.find_one_and_update(
+            {"_id": invoice['_id'], "status": {"$ne": "Paid"}},
+            {"$set": {"status": "Paid", "next_reminder_at": None, "updated_at": now}},
+            projection={"_id": 1}
+        ):
+            continue
+        summary['invoices_marked_paid'] += 1
+        notification = build_paid_notification(invoice, now)
+        if notification:
+            notifications.append(notification)
+    if notifications:
+        db.notifications.insert_many(notifications, ordered=False)
+
+def reconcile_stripe_payments(source=None, batch_size=None):
+    """
+    Catches up on payments whose webhook never arrived. Pages through completed
+    checkout sessions created since the stored watermark, matches them to invoices
+    in batched lookups, records missing ledger rows with bulk_write and applies the
+    missing Paid transitions, each guarded on status. The watermark advances only
+    after a full pass, so an interrupted run simply rescans. Returns a summary dict.
+    """
+    config = current_app.config
+    source = source or get_checkout_source()
+    batch_size = batch_size or config['STRIPE_RECONCILE_BATCH_SIZE']
+    now = datetime.utcnow()
+    created_since = _load_watermark(now)
+
+    summary = {"sessions": 0, "unmatched": 0, "payments_recorded": 0, "invoices_marked_paid": 0}
+    newest = None
+    batch = []
+    for session in source.iter_sessions(created_since):
+        if session.get('payment_status') != 'paid':
+            continue
+        summary['sessions'] += 1
+        newest = max(newest or 0, session.get('created') or 0)
+        batch.append(session)
+        if len(batch) >= batch_size:
+            _reconcile_batch(batch, now, summary)
+            batch = []
+    if batch:
+        _reconcile_batch(batch, now, summary)
+
+    update = {"$set": {"last_run_at": now, "last_summary": summary}}
+    if newest:
+        # $max: rescanning the overlap window never moves the watermark backwards
+        update["$max"] = {"watermark": newest}
+    get_job_state_collection().update_one({"_id": JOB_NAME}, update, upsert=True)
+    return summary
@@ -0,0 +1,126 @@
+from flask import current_app
+from pymongo import UpdateOne
+from bson.objectid import ObjectId
+from datetime import datetime, timedelta
+from models.user_model import User
+from models.invoice_model import Invoice, REMINDER_EPOCH
+from models.client_model import Client
+from models.email_outbox_model import OutboxEmail
+from services.gmail_service import build_overdue_reminder_email
+from services.user_profile_service import get_user_profile
+from services.email_outbox_service import enqueue_emails
+
+# Statuses for which overdue reminders are still sent
+REMINDER_STATUSES = ["Sent", "Overdue"]
+
+MAX_SCHEDULE_LENGTH = 10
+MAX_REMINDER_DAYS = 365
+
+def get_invoice_collection():
+    return current_app.db.invoices
+
+def validate_reminder_schedule(days):
+    """Returns a sorted, de-duplicated list of day offsets or raises ValueError."""
+    if not isinstance(days, list) or len(days) > MAX_SCHEDULE_LENGTH:
+        raise ValueError(f"Reminder schedule must be a list of at most {MAX_SCHEDULE_LENGTH} day offsets")
+    if not all(isinstance(d, int) and not isinstance(d, bool) and 1 <= d <= MAX_REMINDER_DAYS for d in days):
+        raise ValueError(f"Reminder days must be whole numbers between 1 and {MAX_REMINDER_DAYS}")
+    return sorted(set(days))
+
+def get_reminder_schedule(user_id):
+    """Returns the user's reminder day offsets (cached with the user profile)."""
+    profile = get_user_profile(user_id) or {}
+    schedule = profile.get('reminder_schedule')
+    return schedule if schedule is not None else list(User.DEFAULT_REMINDER_SCHEDULE)
+
+def compute_next_reminder_at(due_date, schedule, now=None):
+    """
+    Returns the first scheduled reminder time (due_date + N days) that is still
+    in the future, or None when the schedule is exhausted. Offsets already in the
+    past are skipped, so a late send or a missed job run never triggers a burst.
+    """
+    if not due_date or not schedule:
+        return None
+    now = now or datetime.utcnow()
+    for days in sorted(schedule):
+        reminder_at = due_date + timedelta(days=days)
+        if reminder_at > now:
+            return reminder_at
+    return None
+
+def reminder_fields(invoice: Invoice, schedule=None):
+    """Returns the $set fields that (re)arm the reminder schedule of an open invoice."""
+    if invoice.status not in REMINDER_STATUSES:
+        return {"next_reminder_at": None}
+    if schedule is None:
+        schedule = get_reminder_schedule(invoice.user_id)
+    return {"next_reminder_at": compute_next_reminder_at(invoice.due_date, schedule)}
+
+def reschedule_user_reminders(user_id, schedule):
+    """Recomputes next_reminder_at for all open invoices of a user in one bulk_write."""
+    invoices = get_invoice_collection().find(
+        {"user_id": ObjectId(user_id), "status": {"$in": REMINDER_STATUSES}},
+        {"due_date": 1}
+    )
+    operations = [
+        UpdateOne({"_id": i['_id']}, {"$set": {"next_reminder_at": compute_next_reminder_at(i.get('due_date'), schedule)}})
+        for i in invoices
+    ]
+    if operations:
+        get_invoice_collection().bulk_write(operations, ordered=False)
+    return len(operations)
+
+def send_due_reminders(batch_size=500):
+    """
+    Queues reminder emails for every invoice whose next_reminder_at has passed.
+    One indexed range query finds the due rows, clients are fetched with a single
+    $in lookup, emails are inserted into the outbox with insert_many and the
+    invoices are advanced to their next reminder with one bulk_write per batch.
+    Returns the number of reminders queued.
+    """
+    db = current_app.db
+    queued = 0
+
+    while True:
+        now = datetime.utcnow()
+        invoices_data = list(get_invoice_collection().find({
+            "next_reminder_at": {"$gt": REMINDER_EPOCH, "$lte": now},
+            "status": {"$in": REMINDER_STATUSES}
+        }).limit(batch_size))
+        if not invoices_data:
+            break
+
+        invoices = [Invoice.from_dict(i) for i in invoices_data]
+        client_ids = list({i.client_id for i in invoices})
+        clients = {c['_id']: Client.from_dict(c) for c in db.clients.find({"_id": {"$in": client_ids}})}
+
+        emails = []
+        operations = []
+        for invoice in invoices:
+            client = clients.get(invoice.client_id)
+            update = {"$set": {"next_reminder_at": compute_next_reminder_at(
+                invoice.due_date, get_reminder_schedule(invoice.user_id), now
+            )}}
+            if client:
+                subject, body = build_overdue_reminder_email(invoice, client)
+                emails.append(OutboxEmail(
+                    user_id=invoice.user_id,
+                    recipient=client.email,
+                    subject=subject,
+                    body=body,
+                    category='overdue_reminder',
+                    related_invoice_id=invoice._id
+                ))
+                update["$inc"] = {"reminders_sent": 1}
+            else:
+                current_app.logger.error(f"Client not found for overdue invoice {invoice._id}")
+            operations.append(UpdateOne({"_id": invoice._id}, update))
+
+        enqueue_emails(emails)
+        get_invoice_collection().bulk_write(operations, ordered=False)
+        queued += len(emails)
+
+        if len(invoices_data) < batch_size:
+            break
+
+    return queued
@@ -0,0 +1,106 @@
+"""
+Full-text search over a user's documents, clients, projects and invoices.
+
+The searchable collections and their user_id-prefixed text indexes are
+defined in models/search_scopes. Hits from the collections are merged by
+text score and paginated; snippets are cut from the matching body field.
+"""
+import re
+from bson.objectid import ObjectId
+from flask import current_app
+from models.search_scopes import SCOPES
+from utils.compression import decompress_text
+
+MAX_QUERY_LENGTH = 200
+SNIPPET_CHARS = 160
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_NEGATED = re.compile(r"(?:^|\s)-\S+")
+# Crude suffix stripping, only used to find where a stemmed match sits in the text for the snippet
+_SUFFIXES = ("ing", "ed", "es", "s", "ly")
+
+def query_terms(query):
+    """Positive terms of a $text query (negated terms are dropped), lowercased."""
+    terms = []
+    for word in _WORD.findall(_NEGATED.sub(" ", query).lower()):
+        for suffix in _SUFFIXES:
+            if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+                word = word[:-len(suffix)]
+                break
+        if word not in terms:
+            terms.append(word)
+    return terms
+
+def term_pattern(terms):
+    return re.compile(r"\b(" + "|".join(re.escape(t) for t in terms) + ")", re.IGNORECASE)
+
+def make_snippet(text, pattern, length=SNIPPET_CHARS):
+    """Returns about `length` characters of text around the first query term, or its start if none match."""
+    text = re.sub(r"\s+", " ", text or "").strip()
+    if not text:
+        return ""
+    match = pattern.search(text)
+    if not match or len(text) <= length:
+        start = 0
+    else:
+        start = max(match.start() - length // 3, 0)
+        # Start on a word boundary
+        space = text.rfind(" ", 0, start)
+        start = space + 1 if space != -1 and start - space < 20 else start
+    snippet = text[start:start + length]
+    if start + length < len(text):
+        cut = snippet.rfind(" ")
+        snippet = (snippet[:cut] if cut > length // 2 else snippet) + "…"
+    return ("…" if start else "") + snippet
+
+def _field_value(record, field):
+    if field == "items.description":
+        return " ".join(item.get("description") or "" for item in record.get("items") or [])
+    value = decompress_text(record.get(field))
+    return "" if value is None else str(value)
+
+def _to_hit(scope, record, pattern):
+    # The title is returned anyway, so the snippet comes from the lowest-weighted
+    # (longest, body-like) field that mentions a term
+    snippet = ""
+    for field in scope.snippet_fields:
+        value = _field_value(record, field)
+        if value and pattern.search(value):
+            snippet = make_snippet(value, pattern)
+            break
+    date = record.get(scope.date_field)
+    return {
+        "type": scope.kind,
+        "id": str(record["_id"]),
+        "title": _field_value(record, scope.title_field),
+        "subtitle": " · ".join(_field_value(record, f) for f in scope.subtitle_fields if record.get(f) is not None),
+        "snippet": snippet,
+        "score": round(record.get("score", 0), 4),
+        "date": date.isoformat() if hasattr(date, "isoformat") else date,
+    }
+
+def search(user_id, query, kinds=None, page=1, per_page=20):
+    """
+    Returns (hits, has_more) for a page of results across the requested kinds.
+    Each collection returns at most page * per_page + 1 hits sorted by score, which
+    is enough to merge the requested page and to know whether another follows.
+    """
+    query = (query or "").strip()[:MAX_QUERY_LENGTH]
+    terms = query_terms(query)
+    if not terms:
+        return [], False
+
+    pattern = term_pattern(terms)
+    limit = page * per_page + 1
+    hits = []
+    for kind in kinds or SCOPES:
+        scope = SCOPES[kind]
+        cursor = current_app.db[scope.collection].find(
+            {"user_id": ObjectId(user_id), "$text": {"$search": query}},
+            scope.projection
+        ).sort([("score", {"$meta": "textScore"})]).limit(limit)
+        hits.extend(_to_hit(scope, record, pattern) for record in cursor)
+
+    hits.sort(key=lambda hit: hit["score"], reverse=True)
+    start = (page - 1) * per_page
+    return hits[start:start + per_page], len(hits) > start + per_page
@@ -0,0 +1,355 @@
+"""
+File storage for generated PDFs and logos, behind one upload_file() call.
+
+Backends:
+- cloudinary: the Cloudinary upload manager (default)
+- local: a directory on disk, served by GET /api/files/<key>
+- s3: any S3-compatible object store (AWS, MinIO, ...) via the optional boto3
+
+Blobs are content-addressed: the key is the SHA-256 of the bytes and the
+`assets` collection maps each hash to its stored URL, so uploading identical
+bytes again (a re-rendered PDF, the same logo) is a single indexed lookup.
+
+Each asset lists its owners in `refs` ("document:<id>", "invoice:<id>",
+"logo:<user_id>"). An asset whose last owner lets go gets `orphaned_at`, and
+the asset GC job (asset_gc_service) deletes it once it has stayed orphaned
+for ASSET_GC_GRACE_HOURS.
+"""
+import abc
+import re
+import hashlib
+import mimetypes
+import os
+import shutil
+import tempfile
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import current_app, redirect, request, send_file, Response
+from pymongo.errors import DuplicateKeyError
+import cloudinary.uploader
+from services.cloudinary_service import get_upload_manager
+
+try:
+    import boto3
+except ImportError: # Optional dependency, only needed for STORAGE_BACKEND=s3
+    boto3 = None
+
+HASH_CHUNK_SIZE = 1024 * 1024
+# Where the local backend's files are served (see file_routes) unless STORAGE_PUBLIC_BASE_URL is set
+LOCAL_FILES_URL = "http://localhost:5000/api/files"
+
+class StoredFileUnavailableError(Exception):
+    """Raised when a stored file could not be fetched from its storage backend."""
+    pass
+
+_backend = None
+_pool = None
+_init_lock = threading.Lock()
+
+def get_asset_collection():
+    return current_app.db.assets
+
+def file_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class StorageBackend(abc.ABC):
+    """Stores a file under a content-derived key and returns its public URL."""
+    name = None
+
+    @abc.abstractmethod
+    def put(self, file_path, key, content_type):
+        """Stores the file under key and returns its public URL."""
+
+    @abc.abstractmethod
+    def delete(self, key, url):
+        """Deletes a stored file; deleting a file that is already gone is not an error."""
+
+    def local_path(self, key):
+        """The file's path when it is stored on this machine, else None."""
+        return None
+
+    def download(self, key, url, target_path):
+        with urllib.request.urlopen(url, timeout=30) as response, open(target_path, 'wb') as out:
+            shutil.copyfileobj(response, out, HASH_CHUNK_SIZE)
+
+class CloudinaryBackend(StorageBackend):
+    name = "cloudinary"
+
+    def put(self, file_path, key, content_type):
+        folder, filename = key.rsplit("/", 1)
+        # Cloudinary adds the extension itself, so the public_id is the bare hash
+        result = get_upload_manager().upload(file_path, folder, public_id=os.path.splitext(filename)[0])
+        return result.get('secure_url')
+
+    def delete(self, key, url):
+        get_upload_manager() # Configures the SDK
+        match = re.search(r"/(image|video|raw)/upload/", url or "")
+        resource_type = match.group(1) if match else "image"
+        # Raw files keep their extension in the public_id, images and videos do not
+        public_id = key if resource_type == "raw" else os.path.splitext(key)[0]
+        cloudinary.uploader.destroy(public_id, resource_type=resource_type, invalidate=True)
+
+class LocalStorageBackend(StorageBackend):
+    name = "local"
+
+    def __init__(self, root, public_base_url):
+        self.root = root
+        self.public_base_url = public_base_url.rstrip("/")
+
+    def path_for(self, key):
+        path = os.path.realpath(os.path.join(self.root, key))
+        if not path.startswith(os.path.realpath(self.root) + os.sep):
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def put(self, file_path, key, content_type):
+        target = self.path_for(key)
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            # Copy then rename, so a concurrent reader never sees a partial file
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(target))
+            with os.fdopen(fd, 'wb') as out, open(file_path, 'rb') as src:
+                shutil.copyfileobj(src, out, HASH_CHUNK_SIZE)
+            os.replace(temp_path, target)
+        return f"{self.public_base_url}/{key}"
+
+    def delete(self, key, url):
+        try:
+            os.remove(self.path_for(key))
+        except FileNotFoundError:
+            pass
+
+    def local_path(self, key):
+        return self.path_for(key)
+
+class S3StorageBackend(StorageBackend):
+    name = "s3"
+
+    def __init__(self, bucket, public_base_url, **client_options):
+        if boto3 is None:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires the boto3 package")
+        self.bucket = bucket
+        self.public_base_url = public_base_url.rstrip("/")
+        self.client = boto3.client("s3", **client_options)
+
+    def put(self, file_path, key, content_type):
+        # upload_file switches to multipart uploads for large files on its own
+        self.client.upload_file(file_path, self.bucket, key, ExtraArgs={"ContentType": content_type})
+        return f"{self.public_base_url}/{key}"
+
+    def delete(self, key, url):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def download(self, key, url, target_path):
+        # Through the API rather than the URL, so private buckets work too
+        self.client.download_file(self.bucket, key, target_path)
+
+def get_storage_backend():
+    global _backend
+    with _init_lock:
+        if _backend is None:
+            config = current_app.config
+            name = config['STORAGE_BACKEND']
+            if name == "cloudinary":
+                _backend = CloudinaryBackend()
+            elif name == "local":
+                _backend = LocalStorageBackend(
+                    config['STORAGE_LOCAL_DIR'],
+                    config['STORAGE_PUBLIC_BASE_URL'] or LOCAL_FILES_URL
+                )
+            elif name == "s3":
+                bucket = config['S3_BUCKET']
+                default_url = (f"{config['S3_ENDPOINT_URL'].rstrip('/')}/{bucket}" if config['S3_ENDPOINT_URL']
+                               else f"https://{bucket}.s3.{config['S3_REGION']}.amazonaws.com")
+                _backend = S3StorageBackend(
+                    bucket,
+                    config['STORAGE_PUBLIC_BASE_URL'] or default_url,
+                    endpoint_url=config['S3_ENDPOINT_URL'],
+                    region_name=config['S3_REGION'],
+                    aws_access_key_id=config['S3_ACCESS_KEY_ID'],
+                    aws_secret_access_key=config['S3_SECRET_ACCESS_KEY']
+                )
+            else:
+                raise ValueError(f"Unknown STORAGE_BACKEND: {name}")
+    return _backend
+
+def asset_owner(kind, record_id):
+    """The reference an owning record holds on its assets, e.g. "document:<id>"."""
+    return f"{kind}:{record_id}"
+
+def _release(query, owners):
+    assets = get_asset_collection()
+    released = [a["_id"] for a in assets.find(query, {"_id": 1})]
+    if not released:
+        return 0
+    assets.update_many({"_id": {"$in": released}}, {"$pull": {"refs": {"$in": owners}}})
+    assets.update_many(
+        {"_id": {"$in": released}, "refs": {"$size": 0}},
+        {"$set": {"orphaned_at": datetime.utcnow()}}
+    )
+    return len(released)
+
+def claim_assets(owner, asset_ids):
+    """
+    Makes owner reference exactly these assets: it is added to them and
+    dropped from any asset it referenced before (e.g. the previous PDF).
+    """
+    asset_ids = list(asset_ids)
+    get_asset_collection().update_many(
+        {"_id": {"$in": asset_ids}},
+        {"$addToSet": {"refs": owner}, "$unset": {"orphaned_at": ""}}
+    )
+    _release({"refs": owner, "_id": {"$nin": asset_ids}}, [owner])
+
+def release_assets(*owners):
+    """Drops the references of deleted records; assets left without owners become GC candidates."""
+    if not owners:
+        return 0
+    return _release({"refs": {"$in": list(owners)}}, list(owners))
+
+def store_file(file_path, folder="documents", owner=None):
+    """Stores a file (once per content hash) and returns its asset record. Raises on failure."""
+    backend = get_storage_backend()
+    sha256 = file_sha256(file_path)
+    assets = get_asset_collection()
+    asset = assets.find_one({"sha256": sha256, "backend": backend.name})
+    if not asset:
+        extension = os.path.splitext(file_path)[1].lower()
+        content_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+        key = f"{folder}/{sha256}{extension}"
+        asset = {
+            "sha256": sha256,
+            "backend": backend.name,
+            "key": key,
+            "url": backend.put(file_path, key, content_type),
+            "size": os.path.getsize(file_path),
+            "content_type": content_type,
+            "refs": [],
+            # Unowned until claimed; the GC grace period covers the gap before the owner is saved
+            "orphaned_at": datetime.utcnow(),
+            "created_at": datetime.utcnow(),
+        }
+        try:
+            assets.insert_one(asset)
+        except DuplicateKeyError:
+            # Another upload of the same bytes finished first; both stored the same key
+            asset = assets.find_one({"sha256": sha256, "backend": backend.name})
+    if owner:
+        claim_assets(owner, [asset["_id"]])
+    return asset
+
+def upload_file(file_path, folder="documents", owner=None):
+    """
+    Uploads a file to the configured storage backend and returns its URL (None on failure).
+    owner (see asset_owner) is the record the file belongs to; its previous file is released.
+    """
+    try:
+        # Check if file exists before uploading
+        if not os.path.exists(file_path):
+            current_app.logger.error(f"File not found for upload: {file_path}")
+            return None
+        return store_file(file_path, folder, owner)['url']
+    except Exception as e:
+        current_app.logger.error(f"Upload error ({current_app.config['STORAGE_BACKEND']}): {e}")
+        return None
+
+def _get_pool():
+    global _pool
+    with _init_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=current_app.config['STORAGE_UPLOAD_WORKERS'], thread_name_prefix="storage-upload")
+    return _pool
+
+def _upload_in_context(app, file_path, folder, owner):
+    with app.app_context():
+        return store_file(file_path, folder, owner)['url']
+
+def submit_upload(file_path, folder="documents", owner=None):
+    """Queues an upload on the bounded upload pool. The Future resolves to the URL (or raises)."""
+    return _get_pool().submit(_upload_in_context, current_app._get_current_object(), file_path, folder, owner)
+
+def _prune_download_cache(cache_dir, max_bytes):
+    """Removes the least recently used downloads until the cache fits in max_bytes."""
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        stat = os.stat(path)
+        entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except FileNotFoundError:
+            pass
+
+def local_copy(asset):
+    """
+    Returns a path on this machine holding the asset's bytes: the file itself
+    for the local backend, otherwise a verified download kept in
+    STORAGE_CACHE_DIR (by content hash) so repeat downloads stay local.
+    """
+    backend = get_storage_backend()
+    path = backend.local_path(asset["key"])
+    if path:
+        return path
+
+    cache_dir = current_app.config['STORAGE_CACHE_DIR']
+    path = os.path.join(cache_dir, asset["sha256"] + os.path.splitext(asset["key"])[1])
+    if os.path.exists(path):
+        os.utime(path) # Marks it recently used
+        return path
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=cache_dir, suffix=".part")
+    os.close(fd)
+    try:
+        backend.download(asset["key"], asset["url"], temp_path)
+        if file_sha256(temp_path) != asset["sha256"]:
+            raise ValueError(f"Downloaded {asset['key']} does not match its content hash")
+        os.replace(temp_path, path)
+    except Exception:
+        os.remove(temp_path)
+        raise
+    _prune_download_cache(cache_dir, current_app.config['STORAGE_CACHE_MAX_BYTES'])
+    return path
+
+def send_stored_file(url, download_name):
+    """
+    Responds with a stored file (e.g. a record's pdf_url) from this server.
+    The ETag is the content hash: a matching If-None-Match gets a 304 before
+    the file is fetched at all, and Range requests are answered by send_file
+    (206), which hands the file to the server's zero-copy file wrapper where
+    available. Files the asset table does not know (uploaded before it
+    existed) are redirected to their URL instead. Raises
+    StoredFileUnavailableError when the file cannot be fetched.
+    """
+    asset = get_asset_collection().find_one({"url": url, "backend": get_storage_backend().name})
+    if not asset:
+        return redirect(url)
+    if request.if_none_match.contains_weak(asset["sha256"]):
+        response = Response(status=304)
+        response.set_etag(asset["sha256"])
+    else:
+        try:
+            path = local_copy(asset)
+        except Exception as e:
+            raise StoredFileUnavailableError(f"Could not fetch {asset['key']}: {e}") from e
+        response = send_file(
+            path,
+            mimetype=asset.get("content_type"),
+            download_name=download_name,
+            conditional=True,
+            etag=asset["sha256"]
+        )
+    # Always revalidated (a cheap 304), never stored by shared caches
+    response.cache_control.no_cache = True
+    response.cache_control.private = True
+    return response
@@ -0,0 +1,133 @@
+from flask import current_app
+from pymongo import ReturnDocument
+from bson.objectid import ObjectId
+from datetime import datetime, timedelta
+from models.stripe_event_model import StripeEvent
+from services.user_profile_service import notifications_enabled
+from services.payment_service import build_checkout_session_payment, record_payment, is_fully_paid
+
+# An event stuck in 'processing' longer than this (e.g., the worker died) is retried
+STALE_LOCK_MINUTES = 10
+
+def get_stripe_event_collection():
+    return current_app.db.stripe_events
+
+# --- Event Handlers ---
+
+def build_paid_notification(invoice, now):
+    """Returns the 'invoice paid' notification document, or None if the owner opted out."""
+    if not notifications_enabled(invoice['user_id'], 'invoice_paid'):
+        return None
+    return {
+        "user_id": invoice['user_id'],
+        "message": f"Invoice {invoice['invoice_number']} has been paid.",
+        "type": "invoice_paid",
+        "related_id": invoice['_id'],
+        "is_read": False,
+        "created_at": now
+    }
+
+def handle_checkout_session_completed(data_object, occurred_at):
+    """
+    Records the payment in the ledger, marks the invoice referenced in the session
+    metadata as Paid once the ledger covers its total, and notifies its owner.
+    """
+    invoice_id = (data_object.get('metadata') or {}).get('invoice_id')
+    if not invoice_id:
+        return
+    
+    db = current_app.db
+    now = datetime.utcnow()
+    
+    invoice = db.invoices.find_one(
+        {"_id": ObjectId(invoice_id)},
+        {"user_id": 1, "client_id": 1, "invoice_number": 1, "total_amount": 1, "currency": 1}
+    )
+    if not invoice:
+        current_app.logger.warning(f"Invoice {invoice_id} from Stripe session {data_object.get('id')} not found; skipping.")
+        return
+    
+    # Upserted on the session ID, so a replayed event never records the payment twice.
+    # The event is sent when the payment succeeds, so its time is the payment time.
+    record_payment(build_checkout_session_payment(invoice, data_object, paid_at=occurred_at))
+    
+    if not is_fully_paid(invoice):
+        current_app.logger.info(f"Partial payment recorded for invoice {invoice_id}.")
+        return
+    
+    # The status guard makes the transition idempotent: only the first delivery changes anything
+    invoice = db.invoices.find_one_and_update(
+        {"_id": invoice['_id'], "status": {"$ne": "Paid"}},
+        {"$set": {"status": "Paid", "next_reminder_at": None, "updated_at": now}},
+        projection={"user_id": 1, "invoice_number": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if not invoice:
+        current_app.logger.info(f"Invoice {invoice_id} already Paid; skipping.")
+        return
+    
+    current_app.logger.info(f"Invoice {invoice_id} successfully marked as Paid.")
+    
+    notification = build_paid_notification(invoice, now)
+    if notification:
+        db.notifications.insert_one(notification)
+
+# Event type -> handler(data_object, occurred_at). Other types are recorded and marked processed.
+EVENT_HANDLERS = {
+    'checkout.session.completed': handle_checkout_session_completed,
+}
+
+# --- Processor ---
+
+def _claim_next_event(now):
+    """Atomically moves the oldest pending event to 'processing' so it is applied exactly once."""
+    return get_stripe_event_collection().find_one_and_update(
+        {"status": "pending"},
+        {"$set": {"status": "processing", "locked_at": now}, "$inc": {"attempts": 1}},
+        sort=[("received_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+def process_pending_stripe_events(batch_size=None):
+    """
+    Applies up to one batch of stored Stripe events. Failures are retried on later
+    runs until STRIPE_EVENT_MAX_ATTEMPTS, after which the event is marked failed.
+    Returns a summary dict of what happened.
+    """
+    config = current_app.config
+    batch_size = batch_size or config['STRIPE_EVENT_BATCH_SIZE']
+    events = get_stripe_event_collection()
+    now = datetime.utcnow()
+    
+    # Release events left locked by a processor that crashed mid-way
+    events.update_many(
+        {"status": "processing", "locked_at": {"$lt": now - timedelta(minutes=STALE_LOCK_MINUTES)}},
+        {"$set": {"status": "pending", "locked_at": None}}
+    )
+    
+    summary = {"processed": 0, "failed": 0, "retried": 0}
+    for _ in range(batch_size):
+        event_data = _claim_next_event(now)
+        if not event_data:
+            break
+        event = StripeEvent.from_dict(event_data)
+        
+        try:
+            handler = EVENT_HANDLERS.get(event.type)
+            if handler:
+                handler(event.data_object or {}, event.created or event.received_at)
+            events.update_one(
+                {"_id": event._id},
+                {"$set": {"status": "processed", "processed_at": datetime.utcnow(), "locked_at": None, "last_error": None}}
+            )
+            summary['processed'] += 1
+        except Exception as e:
+            exhausted = event.attempts >= config['STRIPE_EVENT_MAX_ATTEMPTS']
+            events.update_one(
+                {"_id": event._id},
+                {"$set": {"status": "failed" if exhausted else "pending", "locked_at": None, "last_error": str(e)}}
+            )
+            summary['failed' if exhausted else 'retried'] += 1
+            current_app.logger.error(f"Error processing Stripe event {event.event_id} (attempt {event.attempts}): {e}")
+    
+    return summary
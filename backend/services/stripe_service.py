@@ -1,46 +1,128 @@
 import stripe
+import json
 from flask import current_app, jsonify, request
 from bson.objectid import ObjectId
 from models.invoice_model import Invoice
+from models.stripe_event_model import StripeEvent
+from pymongo.errors import DuplicateKeyError
+from services.user_profile_service import get_business_settings
+from utils.cache import TTLCache
+from utils.rate_limiter import TokenBucket
+from utils.currency import to_minor_units
+import threading
 from datetime import datetime
 
+# (user_id, currency, unit_amount, mode) -> Stripe Price ID. Prices are immutable,
+# so entries only expire to bound memory.
+_price_cache = TTLCache("stripe_prices", maxsize=4096, ttl=6 * 3600)
+
+_stripe_limiter = None
+_stripe_limiter_lock = threading.Lock()
+
 def init_stripe():
     """Initializes Stripe API key."""
     stripe.api_key = current_app.config['STRIPE_SECRET_KEY']
+    if current_app.config['STRIPE_API_BASE']:
+        # e.g., a local fake Stripe server in development
+        stripe.api_base = current_app.config['STRIPE_API_BASE']
+
+def throttle_stripe():
+    """
+    Blocks until the process-wide client-side rate limit allows another Stripe API call.
+    Keeps concurrent batch work under Stripe's request limits instead of collecting 429s.
+    """
+    global _stripe_limiter
+    with _stripe_limiter_lock:
+        if _stripe_limiter is None:
+            rate = current_app.config['STRIPE_MAX_REQUESTS_PER_SECOND']
+            _stripe_limiter = TokenBucket(rate, capacity=rate)
+    _stripe_limiter.acquire()
+
+def get_stripe_mode():
+    """Returns 'live' or 'test' depending on the configured secret key (catalog IDs differ per mode)."""
+    key = current_app.config['STRIPE_SECRET_KEY'] or ''
+    return 'live' if key.startswith(('sk_live', 'rk_live')) else 'test'
+
+def get_or_create_product(user_id, mode):
+    """Returns the Stripe Product used for all invoice payments of a user, creating it once."""
+    products = current_app.db.stripe_products
+    product_data = products.find_one({"user_id": ObjectId(user_id), "mode": mode})
+    if product_data:
+        return product_data['product_id']
+    
+    company_name = get_business_settings(user_id).get('company_name') or "Freelancer"
+    throttle_stripe()
+    product = stripe.Product.create(
+        name=f"{company_name} - Invoice Payment",
+        metadata={"user_id": str(user_id)},
+    )
+    try:
+        products.insert_one({"user_id": ObjectId(user_id), "mode": mode, "product_id": product.id, "created_at": datetime.utcnow()})
+        return product.id
+    except DuplicateKeyError:
+        # Another worker created it concurrently; use theirs
+        return products.find_one({"user_id": ObjectId(user_id), "mode": mode})['product_id']
+
+def get_or_create_price(user_id, currency, unit_amount):
+    """
+    Returns a reusable Stripe Price ID for (user, currency, amount).
+    Lookups go through an in-process cache, then the stripe_prices collection;
+    only a never-seen amount costs Stripe API calls.
+    """
+    mode = get_stripe_mode()
+    cache_key = (str(user_id), currency, unit_amount, mode)
+    price_id = _price_cache.get(cache_key)
+    if price_id:
+        return price_id
+    
+    prices = current_app.db.stripe_prices
+    query = {"user_id": ObjectId(user_id), "currency": currency, "unit_amount": unit_amount, "mode": mode}
+    price_data = prices.find_one(query, {"price_id": 1})
+    if price_data:
+        _price_cache.set(cache_key, price_data['price_id'])
+        return price_data['price_id']
+    
+    product_id = get_or_create_product(user_id, mode)
+    throttle_stripe()
+    price = stripe.Price.create(
+        unit_amount=unit_amount,
+        currency=currency,
+        product=product_id,
+    )
+    try:
+        prices.insert_one({**query, "price_id": price.id, "product_id": product_id, "created_at": datetime.utcnow()})
+        price_id = price.id
+    except DuplicateKeyError:
+        # Lost a creation race; the duplicate Price is harmless but we reuse the stored one
+        price_id = prices.find_one(query, {"price_id": 1})['price_id']
+    
+    _price_cache.set(cache_key, price_id)
+    return price_id
 
 def create_payment_link(invoice: Invoice):
     """Creates a Stripe Payment Link for an invoice."""
     init_stripe()
     
-    # 1. Create Stripe Product and Price (or use existing ones)
-    # For simplicity, we'll create a one-time price for the total invoice amount.
     try:
-        # Convert total amount to cents/smallest currency unit
-        amount_in_cents = int(invoice.total_amount * 100)
+        # Convert total amount to the smallest currency unit (cents, or whole yen for zero-decimal currencies)
+        unit_amount = to_minor_units(invoice.total_amount, invoice.currency)
         
-        # Create a product for the invoice
-        product = stripe.Product.create(
-            name=f"Invoice #{invoice.invoice_number}",
-            description=f"Payment for invoice {invoice.invoice_number} (Client: {invoice.client_id})",
-        )
-        
-        # Create a price for the product
-        price = stripe.Price.create(
-            unit_amount=amount_in_cents,
-            currency=invoice.currency.lower(),
-            product=product.id,
-        )
+        # 1. Reuse the Price for this (user, currency, amount); usually no API call
+        price_id = get_or_create_price(invoice.user_id, invoice.currency.lower(), unit_amount)
         
         # 2. Create a Payment Link
+        throttle_stripe()
         payment_link = stripe.PaymentLink.create(
             line_items=[
                 {
-                    "price": price.id,
+                    "price": price_id,
                     "quantity": 1,
                 },
             ],
             # Pass invoice ID as metadata for webhook
             metadata={"invoice_id": str(invoice._id)},
+            # The shared Product is not invoice-specific, so show the invoice number at checkout
+            custom_text={"submit": {"message": f"Payment for invoice #{invoice.invoice_number}"}},
             # After payment, redirect to a success page (e.g., frontend's invoice detail)
             after_completion={"type": "redirect", "redirect": {"url": f"{current_app.config['FRONTEND_URL']}/invoices/{str(invoice._id)}?payment=success"}},
         )
@@ -56,19 +138,22 @@ def create_payment_link(invoice: Invoice):
         return None, None
 
 def handle_stripe_webhook():
-    """Handles incoming Stripe webhook events."""
-    init_stripe()
-    
+    """
+    Verifies and records incoming Stripe webhook events, then acknowledges immediately.
+    Events are stored once under a unique event_id index (Stripe redeliveries are
+    acknowledged without being stored again) and applied by the background
+    stripe event processor.
+    """
     payload = request.data
     sig_header = request.headers.get('stripe-signature')
     endpoint_secret = current_app.config['STRIPE_WEBHOOK_SECRET']
     
-    event = None
-    
     try:
-        event = stripe.Webhook.construct_event(
+        # Verifies the signature; the raw payload is stored below as received
+        stripe.Webhook.construct_event(
             payload, sig_header, endpoint_secret
         )
+        event = json.loads(payload)
     except ValueError as e:
         # Invalid payload
         current_app.logger.error(f"Stripe Webhook Error: Invalid payload: {e}")
@@ -78,26 +163,18 @@ def handle_stripe_webhook():
         current_app.logger.error(f"Stripe Webhook Error: Invalid signature: {e}")
         return jsonify({'success': False, 'message': 'Invalid signature'}), 400
 
-    # Handle the event
-    if event['type'] == 'checkout.session.completed':
-        session = event['data']['object']
-        
-        # Retrieve the invoice ID from the metadata
-        invoice_id = session.get('metadata', {}).get('invoice_id')
-        
-        if invoice_id:
-            # Update the invoice status to 'Paid'
-            result = current_app.db.invoices.update_one(
-                {"_id": ObjectId(invoice_id)},
-                {"$set": {"status": "Paid", "updated_at": datetime.utcnow()}}
-            )
-            
-            if result.matched_count > 0:
-                current_app.logger.info(f"Invoice {invoice_id} successfully marked as Paid.")
-                # TODO: Add notification logic here
-            else:
-                current_app.logger.warning(f"Invoice {invoice_id} not found for webhook update.")
-        
-    # Other events can be handled here (e.g., payment_intent.succeeded, invoice.paid)
+    stripe_event = StripeEvent(
+        event_id=event['id'],
+        type=event['type'],
+        data_object=event.get('data', {}).get('object', {}),
+        livemode=event.get('livemode', False),
+        created=datetime.utcfromtimestamp(event['created']) if event.get('created') else None
+    )
+    
+    try:
+        current_app.db.stripe_events.insert_one(stripe_event.__dict__)
+    except DuplicateKeyError:
+        # Redelivery of an event we already have; Stripe only needs the 2xx
+        return jsonify({'success': True, 'duplicate': True}), 200
     
     return jsonify({'success': True}), 200
@@ -0,0 +1,30 @@
+from flask import current_app
+from utils.cache import TTLCache
+
+SETTINGS_ID = "global_settings"
+
+DEFAULT_SYSTEM_SETTINGS = {
+    "default_currency": "USD",
+    "global_tax_rate": 0.08,
+    "openai_model": "gemini-2.5-flash",
+    "frontend_version": "1.0.0",
+    "backend_version": "1.0.0"
+}
+
+# A single document read on every draft; a short TTL bounds how long other workers serve stale values
+_settings_cache = TTLCache("system_settings", maxsize=1, ttl=60)
+
+def get_system_settings():
+    """Returns the global settings document (defaults filled in), cached briefly per process."""
+    def load():
+        settings = current_app.db.system_settings.find_one({"_id": SETTINGS_ID}) or {}
+        settings.pop('_id', None)
+        return {**DEFAULT_SYSTEM_SETTINGS, **settings}
+    return _settings_cache.get_or_load(SETTINGS_ID, load)
+
+def invalidate_system_settings():
+    _settings_cache.invalidate(SETTINGS_ID)
+
+def get_openai_model():
+    """Returns the model used for AI drafting, as chosen by admins in the system settings."""
+    return get_system_settings().get('openai_model') or DEFAULT_SYSTEM_SETTINGS['openai_model']
@@ -0,0 +1,61 @@
+import threading
+from flask import current_app
+from bson.objectid import ObjectId
+from utils.cache import TTLCache
+
+# Fields needed for email greetings, PDF branding and document drafting.
+# Credentials (password_hash, api_keys) are deliberately never cached.
+PROFILE_PROJECTION = {
+    "first_name": 1,
+    "last_name": 1,
+    "email": 1,
+    "business_settings": 1,
+    "notification_preferences": 1,
+    "user_preferences": 1,
+    "reminder_schedule": 1,
+}
+
+_profile_cache = None
+_profile_cache_lock = threading.Lock()
+
+def _get_cache():
+    # Created lazily because the size and TTL come from the app config
+    global _profile_cache
+    with _profile_cache_lock:
+        if _profile_cache is None:
+            _profile_cache = TTLCache(
+                "user_profiles",
+                maxsize=current_app.config['USER_PROFILE_CACHE_SIZE'],
+                ttl=current_app.config['USER_PROFILE_CACHE_TTL']
+            )
+    return _profile_cache
+
+def get_user_profile(user_id):
+    """
+    Returns the cached profile/settings document of a user, or None if the user
+    does not exist. The returned dict is shared between callers; do not mutate it.
+    """
+    user_id = ObjectId(user_id)
+    return _get_cache().get_or_load(
+        user_id,
+        lambda: current_app.db.users.find_one({"_id": user_id}, PROFILE_PROJECTION)
+    )
+
+def get_business_settings(user_id):
+    """Returns the user's business settings (company name, logo, address...) from the cache."""
+    profile = get_user_profile(user_id)
+    return (profile or {}).get('business_settings') or {}
+
+def get_sender_name(user_id):
+    """Returns the first name used to sign outgoing emails."""
+    profile = get_user_profile(user_id)
+    return (profile or {}).get('first_name') or ''
+
+def notifications_enabled(user_id, notification_type):
+    """Whether the user wants in-app notifications of this type ('invoice_paid', 'overdue_reminder', ...); on by default."""
+    profile = get_user_profile(user_id)
+    return (profile or {}).get('notification_preferences', {}).get(notification_type, True)
+
+def invalidate_user_profile(user_id):
+    """Drops a user's cached profile; call after any write to the cached fields."""
+    _get_cache().invalidate(ObjectId(user_id))
@@ -0,0 +1,98 @@
+import threading
+import time
+from collections import OrderedDict
+
+# name -> CacheStats, reported by the admin cache stats endpoint
+_stats_registry = {}
+
+class CacheStats:
+    """Thread-safe hit/miss/eviction counters for a named cache."""
+
+    def __init__(self, name):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        _stats_registry[name] = self
+
+    def record_hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def record_eviction(self, count=1):
+        with self._lock:
+            self.evictions += count
+
+    def to_dict(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+class TTLCache:
+    """
+    Bounded, process-local LRU cache whose entries also expire after `ttl` seconds.
+    Safe to share between request threads and APScheduler jobs.
+    """
+
+    def __init__(self, name, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = CacheStats(name)
+        self._data = OrderedDict() # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.stats.record_hit()
+                    return value
+                del self._data[key]
+            self.stats.record_miss()
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.stats.record_eviction()
+
+    def get_or_load(self, key, loader):
+        """Returns the cached value, calling `loader()` and caching its result on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+def get_cache_stats():
+    """Returns the counters of every registered cache, keyed by cache name."""
+    return {name: stats.to_dict() for name, stats in _stats_registry.items()}
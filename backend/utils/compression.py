@@ -0,0 +1,71 @@
+"""
+Compression of large text fields at rest.
+
+Values at or above the threshold are stored as BSON binary (user-defined
+subtype) holding a one-byte codec tag and the compressed UTF-8 text; shorter
+values stay plain strings. decompress_text accepts either form, so readers
+work before, during and after a migration.
+
+zstd (the optional `zstandard` package) compresses faster at a similar ratio;
+zlib is always available and is the default. Data written with zstd needs the
+package installed on every process that reads it.
+"""
+import zlib
+from bson.binary import Binary
+
+try:
+    import zstandard
+except ImportError: # Optional dependency
+    zstandard = None
+
+COMPRESSED_SUBTYPE = 0x80
+CODEC_TAGS = {"zlib": b"z", "zstd": b"s"}
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 6
+
+_settings = {"threshold": 2048, "codec": "zlib"}
+
+def configure_compression(threshold, codec):
+    """Applies the app's settings (called once by create_app)."""
+    if codec not in CODEC_TAGS:
+        raise ValueError(f"Unknown compression codec: {codec}")
+    if codec == "zstd" and zstandard is None:
+        raise ValueError("TEXT_COMPRESSION_CODEC=zstd requires the zstandard package")
+    _settings.update(threshold=threshold, codec=codec)
+
+def compress_bytes(data, codec):
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return zlib.compress(data, ZLIB_LEVEL)
+
+def decompress_bytes(data, codec):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd-compressed field found but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+def is_compressed(value):
+    return isinstance(value, bytes) and getattr(value, "subtype", None) == COMPRESSED_SUBTYPE
+
+def compress_text(text, threshold=None, codec=None):
+    """Returns text as stored: compressed Binary when it is large enough (and it pays off), else unchanged."""
+    threshold = _settings["threshold"] if threshold is None else threshold
+    codec = codec or _settings["codec"]
+    if not isinstance(text, str) or len(text) < threshold:
+        return text
+    raw = text.encode("utf-8")
+    packed = compress_bytes(raw, codec)
+    if len(packed) >= len(raw):
+        return text
+    return Binary(CODEC_TAGS[codec] + packed, COMPRESSED_SUBTYPE)
+
+def decompress_text(value):
+    """Returns the plain text of a stored value (compressed or not)."""
+    if not is_compressed(value):
+        return value
+    tag, packed = bytes(value[:1]), bytes(value[1:])
+    codec = next((name for name, t in CODEC_TAGS.items() if t == tag), None)
+    if codec is None:
+        raise ValueError(f"Unknown compression tag: {tag!r}")
+    return decompress_bytes(packed, codec).decode("utf-8")
@@ -0,0 +1,18 @@
+# Currencies Stripe takes in whole units rather than hundredths
+# (https://stripe.com/docs/currencies#zero-decimal)
+ZERO_DECIMAL_CURRENCIES = frozenset({
+    "bif", "clp", "djf", "gnf", "jpy", "kmf", "krw", "mga",
+    "pyg", "rwf", "ugx", "vnd", "vuv", "xaf", "xof", "xpf",
+})
+
+def currency_exponent(currency):
+    """Number of decimal places in the smallest unit Stripe uses for the currency."""
+    return 0 if (currency or "").lower() in ZERO_DECIMAL_CURRENCIES else 2
+
+def to_minor_units(amount, currency):
+    """Converts an amount in major units (e.g. 12.50 USD) to Stripe's integer amount (1250)."""
+    return int(round(amount * 10 ** currency_exponent(currency)))
+
+def from_minor_units(amount, currency):
+    """Converts a Stripe integer amount back to major units (1250 USD -> 12.5, 1250 JPY -> 1250)."""
+    return amount / 10 ** currency_exponent(currency)
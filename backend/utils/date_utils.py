@@ -0,0 +1,89 @@
+from datetime import datetime, date, timezone
+
+# Formats accepted from clients in addition to ISO 8601
+# (e.g., what older frontend builds and CSV imports send).
+FALLBACK_DATE_FORMATS = (
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y/%m/%d",
+    "%m/%d/%Y",
+    "%d.%m.%Y",
+    "%b %d, %Y",
+    "%B %d, %Y",
+)
+
+def parse_datetime(value):
+    """
+    Parses a client-supplied date value into a naive UTC datetime so it is
+    stored as a native BSON date. Returns None for empty values and raises
+    ValueError for anything that cannot be interpreted as a date.
+    """
+    if value is None or value == "":
+        return None
+
+    if isinstance(value, datetime):
+        dt = value
+    elif isinstance(value, date):
+        dt = datetime(value.year, value.month, value.day)
+    elif isinstance(value, str):
+        dt = _parse_date_string(value.strip())
+    else:
+        raise ValueError(f"Unsupported date value: {value!r}")
+
+    # Store everything as naive UTC, matching datetime.utcnow() used elsewhere
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+def _parse_date_string(value):
+    # fromisoformat on Python < 3.11 does not accept a trailing 'Z'
+    iso_value = value[:-1] + "+00:00" if value.endswith(("Z", "z")) else value
+    try:
+        return datetime.fromisoformat(iso_value)
+    except ValueError:
+        pass
+
+    for fmt in FALLBACK_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+
+    raise ValueError(f"Invalid date format: {value!r}")
+
+def parse_stored_datetime(value):
+    """
+    Lenient variant of parse_datetime for values read back from MongoDB.
+    Legacy rows holding an unparseable string yield None instead of failing
+    the whole read; the migration command reports those rows.
+    """
+    try:
+        return parse_datetime(value)
+    except ValueError:
+        return None
+
+def normalize_date_fields(data, fields):
+    """Parses the given date fields of a dict in place (used for partial updates)."""
+    for field in fields:
+        if field in data:
+            data[field] = parse_datetime(data[field])
+    return data
+
+def format_date(value):
+    """Serializes a date-only field (e.g., due dates) as YYYY-MM-DD."""
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+def format_datetime(value):
+    """Serializes a date-time field (e.g., event start/end) as an ISO 8601 string."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def start_of_day(value=None):
+    """Returns midnight (naive UTC) of the given day, defaulting to today."""
+    value = value or datetime.utcnow()
+    return datetime(value.year, value.month, value.day)
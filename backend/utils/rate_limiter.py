@@ -0,0 +1,82 @@
+import threading
+import time
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: allows `rate` operations per second on average,
+    with bursts of up to `capacity`. acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated_at
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    def try_acquire(self, tokens=1):
+        """Takes `tokens` if available right now; returns False instead of waiting."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1, timeout=None):
+        """Blocks until `tokens` are available. Returns False if `timeout` seconds pass first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if deadline is not None:
+                if now + wait > deadline:
+                    return False
+            time.sleep(wait)
+
+class ConcurrencyLimiter:
+    """
+    Caps in-flight operations at `max_concurrent`. Up to `max_queued` further
+    callers wait (at most `queue_timeout` seconds) for a slot; beyond that,
+    acquire() fails immediately so the caller can shed load instead of piling up.
+    """
+
+    def __init__(self, max_concurrent, max_queued=0, queue_timeout=None):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._waiting = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Takes a slot, waiting in the queue if needed. Returns False when the queue is full or the wait times out."""
+        if self._slots.acquire(blocking=False):
+            return True
+        with self._lock:
+            if self._waiting >= self.max_queued:
+                return False
+            self._waiting += 1
+        try:
+            return self._slots.acquire(timeout=self.queue_timeout)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def release(self):
+        self._slots.release()
+
+    @property
+    def waiting(self):
+        with self._lock:
+            return self._waiting